@@ -50,6 +50,8 @@
 # For Generate template, do not choose a default template from the list. Instead, enter the following command: Action=SendMessage&MessageBody=$input.body in a box.
 # Choose Save.
 
+import os
+import logging
 import boto3, sys
 import json
 import time
@@ -57,6 +59,12 @@ from datetime import date, datetime
 from poc_sqs import get_sqs_queue_arn
 from poc_iam_role import get_arn_by_role_name
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+from Recorder import Recorder
+import StructLog
+
+
+logger = logging.getLogger(__name__)
 
 api_gateway_definitions = {
     "POC1-API": {
@@ -123,7 +131,7 @@ def create_api_gateway():
             if path == '/':
                 resourceId = rest_api['rootResourceId']
             else:
-                print (f"creating resource for {api_gateway_id}, under root resource {rest_api['rootResourceId']}")
+                logger.info("creating resource for %s, under root resource %s", api_gateway_id, rest_api['rootResourceId'])
                 response = api_gateway_client.create_resource(
                     restApiId=api_gateway_id,
                     parentId=rest_api['rootResourceId'],
@@ -131,7 +139,7 @@ def create_api_gateway():
                 )
                 resourceId = resourceId = response['id']
 
-            print (f"resourceId = {resourceId}")
+            logger.info("resourceId = %s", resourceId)
             # create api_gateway method integration
             for method, method_definition in resource.items():
                 response = api_gateway_client.put_method(
@@ -146,8 +154,8 @@ def create_api_gateway():
                 # service URI needs to be synthesized.....from the below template ...
                 service_uri = (f"arn:aws:apigateway:{method_definition['integration_request']['region']}:{method_definition['integration_request']['service']}:path/{'/'.join(method_definition['integration_request']['service_path'])}")
                 # first print the content of the method_definition[integration_request]
-                print (f"method_definition[integration_request] = {method_definition['integration_request']}")
-                print (f"service_uri = {service_uri}")
+                logger.info("method_definition[integration_request] = %s", StructLog.compact(method_definition['integration_request']))
+                logger.info("service_uri = %s", service_uri)
 
                 response = api_gateway_client.put_integration(
                     restApiId=api_gateway_id,
@@ -198,14 +206,14 @@ def delete_api_gateway():
         # find the item inside apis that match the api_name
         api_gateway = [api for api in apis if api['name'] == api_name]
         for item in api_gateway:
-            print(f'deleting {item}')
+            logger.info('deleting %s', StructLog.compact(item))
             api_gateway_id = item['id']
 
             # delete api_gateway
             response = api_gateway_client.delete_rest_api(
                 restApiId=api_gateway_id
             )
-            print(f"Deleted API Gateway {api_name} with response: {response}")
+            logger.info("Deleted API Gateway %s with response: %s", api_name, StructLog.compact(response))
             # delete all of the associated resources
             for path in definition['resources']:
                 # get api_gateway resource id
@@ -219,7 +227,7 @@ def delete_api_gateway():
                         restApiId=api_gateway_id,
                         resourceId=resourceId
                     )
-                    print(f"Deleted resource {path} with response: {response}")
+                    logger.info("Deleted resource %s with response: %s", path, StructLog.compact(response))
     return
 
 #
@@ -301,12 +309,15 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_api_gateway()
-        elif action == "delete":
-            delete_api_gateway()
-        elif action == "list":
-            list_api_gateway()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_api_gateway()
+            elif action == "delete":
+                delete_api_gateway()
+            elif action == "list":
+                list_api_gateway()
 
 
 if __name__ == "__main__":
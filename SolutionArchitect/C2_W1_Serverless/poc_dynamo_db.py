@@ -8,10 +8,16 @@
 #     Partition key: orderID
 #     Data type: String
 
+import os
 import boto3
 import json
 import sys
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+import Arn
+from Config import Config
+from Recorder import Recorder
+
 dynamodb_definitions = {
     "POC1_orders": {
         "PartitionKey":{
@@ -113,22 +119,12 @@ def list_tables():
         print(table.latest_stream_label)
 
 
+# table ARN is synthesized from account, region and name - no describe_table round trip
 def get_dynamodb_table_arn(table_name):
-    # create the DynamoDB resource
-    dynamodb = boto3.resource('dynamodb')
-
-    # get the DynamoDB table
-    table = dynamodb.Table(table_name)
-
-    # check if the table result is valid  
-    if not table:
-        print(f"DynamoDB Table {table_name} not found")
-        return None
-
-    # return the table arn
-    return table.table_arn
+    return Arn.dynamodbTable(Config.accountId(), Config.region(), table_name)
 
 
+# stream ARN contains the stream label (creation timestamp) and can only be resolved by lookup
 def get_dynamodb_stream_arn(table_name):
     # create the DynamoDB resource
     dynamodb = boto3.resource('dynamodb')
@@ -161,12 +157,14 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_tables()
-        elif action == "delete":
-            delete_tables()
-        elif action == "list":
-            list_tables()
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_tables()
+            elif action == "delete":
+                delete_tables()
+            elif action == "list":
+                list_tables()
 
 
 if __name__ == "__main__":
@@ -9,10 +9,20 @@
 #       * Lambda-DynamoDBStreams-Read
 #       * Lambda-Read-SQS
 
+import os
+import logging
 import boto3
 import sys
 import json
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+import Arn
+from Config import Config
+from Recorder import Recorder
+import StructLog
+
+
+logger = logging.getLogger(__name__)
 
 policy_definitions = {
     "POC1-Lambda-Write-DynamoDB": {
@@ -94,12 +104,12 @@ def create_policies():
         )
 
         # print the policy ARN
-        print(f"Created policy {policy_name} with ARN {response['Policy']['Arn']}")
+        logger.info("Created policy %s with ARN %s", policy_name, response['Policy']['Arn'])
 
 def delete_policies():
     # create a client for IAM
     iam = boto3.client('iam')
-    account_id = boto3.client('sts').get_caller_identity().get('Account')
+    account_id = Config.accountId()
 
     # iterate through the policy definitions and delete the policies
     for policy_name, policy_definition in policy_definitions.items():
@@ -107,13 +117,13 @@ def delete_policies():
         # catch exception while deleting policy
         try:
             response = iam.delete_policy(
-                PolicyArn=f"arn:aws:iam::{account_id}:policy/{policy_name}"
+                PolicyArn=Arn.iamPolicy(account_id, policy_name)
             )
-            print(f"Deleted policy {policy_name} with response: {response}")
+            logger.info("Deleted policy %s with response: %s", policy_name, StructLog.compact(response))
         except iam.exceptions.DeleteConflictException:
-            print(f"Policy {policy_name} is in use and cannot be deleted")
+            logger.warning("Policy %s is in use and cannot be deleted", policy_name)
         except iam.exceptions.NoSuchEntityException:
-            print(f"Policy {policy_name} does not exist")
+            logger.warning("Policy %s does not exist", policy_name)
             
 
 def list_policies():
@@ -145,14 +155,17 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_policies()
-            #print("Policies created successfully")
-        elif action == "delete":
-            delete_policies()
-            #print("Policies deleted successfully")
-        elif action == "list":
-            list_policies()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_policies()
+                #print("Policies created successfully")
+            elif action == "delete":
+                delete_policies()
+                #print("Policies deleted successfully")
+            elif action == "list":
+                list_policies()
 
 
 if __name__ == "__main__":
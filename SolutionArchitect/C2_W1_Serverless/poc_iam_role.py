@@ -8,10 +8,20 @@
 #       * Lambda-DynamoDBStreams-SNS
 #       * APIGateway-SQS
 
+import os
+import logging
 import boto3
 import json
 import sys
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+import Arn
+from Config import Config
+from Recorder import Recorder
+import StructLog
+
+logger = logging.getLogger(__name__)
+
 role_definitions = {
     "POC1-Lambda-SQS-DynamoDB": {
         "Service" : "lambda.amazonaws.com",
@@ -33,9 +43,9 @@ role_definitions = {
 # Create IAM roles and attach the defined policies in role_definitions 
 def create_roles():
     iam = boto3.client("iam")
-    account_id = boto3.client('sts').get_caller_identity().get('Account')
+    account_id = Config.accountId()
     for role_name, role_definition in role_definitions.items():
-        print(f"Creating role {role_name}...")
+        logger.info("Creating role %s...", role_name)
         iam.create_role(
             RoleName=role_name,
             AssumeRolePolicyDocument=json.dumps({
@@ -52,16 +62,16 @@ def create_roles():
             })
         )
         for policy_name in role_definition["UserPolices"]:
-            print(f"Attaching policy {policy_name} to role {role_name}...")
+            logger.info("Attaching policy %s to role %s...", policy_name, role_name)
             iam.attach_role_policy(
                 RoleName=role_name,
-                PolicyArn=f"arn:aws:iam::{account_id}:policy/{policy_name}"
+                PolicyArn=Arn.iamPolicy(account_id, policy_name)
             )
         for policy_name in role_definition["AWSPolices"]:
-            print(f"Attaching arn {policy_name} to role {role_name}...")
+            logger.info("Attaching arn %s to role %s...", policy_name, role_name)
             iam.attach_role_policy(
                 RoleName=role_name,
-                PolicyArn=f"arn:aws:iam::aws:policy/{policy_name}"
+                PolicyArn=Arn.awsManagedPolicy(policy_name)
             )
 
         
@@ -74,9 +84,9 @@ def delete_roles():
             iam.get_role(RoleName=role_name)
             role_policies = iam.list_attached_role_policies(RoleName=role_name)["AttachedPolicies"]
             for policy in role_policies:
-                print(f"Detaching policy {policy['PolicyName']} from role {role_name}...")
+                logger.info("Detaching policy %s from role %s...", policy['PolicyName'], role_name)
                 iam.detach_role_policy(RoleName=role_name, PolicyArn=policy["PolicyArn"])   
-            print(f"Deleting role {role_name}...")
+            logger.info("Deleting role %s...", role_name)
             iam.delete_role(RoleName=role_name)
         except iam.exceptions.NoSuchEntityException:
             #role_name does not exist, print error message and continue to next role_name
@@ -100,9 +110,9 @@ def list_roles():
             print(f"Role {role_name} does not exist")
             continue
 
+# roles are created under the default path, so the ARN is synthesized w/o calling iam.get_role
 def get_arn_by_role_name(role_name):
-    iam = boto3.client("iam")
-    return iam.get_role(RoleName=role_name)["Role"]["Arn"]
+    return Arn.iamRole(Config.accountId(), role_name)
 
 
 #if this .py is executed directly on the command line
@@ -118,12 +128,15 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_roles()
-        elif action == "delete":
-            delete_roles()
-        elif action == "list":
-            list_roles()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_roles()
+            elif action == "delete":
+                delete_roles()
+            elif action == "list":
+                list_roles()
 
 
 if __name__ == "__main__":
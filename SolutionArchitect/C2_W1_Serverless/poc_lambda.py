@@ -36,6 +36,8 @@
 
 # The Lambda code passes arguments to a function call. As a result, when a trigger invokes a function, Lambda runs the code that you specify.
 
+import os
+import logging
 import boto3
 import sys
 from poc_iam_role import get_arn_by_role_name
@@ -44,6 +46,13 @@ from poc_dynamo_db import get_dynamodb_stream_arn
 from poc_sns import get_sns_topic_arn
 from utils.zip import create_zip_content
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+from Recorder import Recorder
+import Retry
+import StructLog
+
+logger = logging.getLogger(__name__)
+
 lambda_definitions = {
     "POC-Lambda-1": {  
         "FunctionName": "POC-Lambda-1",
@@ -124,14 +133,15 @@ def create_lambda():
         role_arn = get_arn_by_role_name(lambda_definitions[lambda_def]["Role"])
         zip_content = create_zip_content(lambda_definitions[lambda_def]["zip_content"])
 
-        lambda_client.create_function(
+        # a role created moments ago can't be assumed by Lambda yet, retry until it has propagated
+        Retry.untilPropagated(lambda: lambda_client.create_function(
             FunctionName=lambda_def,
             Runtime=lambda_definitions[lambda_def]["Runtime"],
             Role=role_arn,
             Handler=lambda_definitions[lambda_def]["Handler"],
             Code={ "ZipFile" : zip_content }
-        )
-        print(f"Lambda function {lambda_def} created")
+        ), description=f"create function {lambda_def}")
+        logger.info("Lambda function %s created", lambda_def)
 
         # Now add triggers to the lambda function
         for trigger, trigger_param in lambda_definitions[lambda_def]["Trigger"].items():
@@ -148,8 +158,10 @@ def create_lambda():
             # remove Principal from local_trigger_param
             local_trigger_param.pop('Principal')
             
-            lambda_client.create_event_source_mapping(**local_trigger_param)
-            print(f"     Event source mapping created for {trigger}:{trigger_param["EventSourceArn"]} to Lambda function {lambda_def}")
+            # the role's policies may still be propagating (execution role lacks permissions)
+            Retry.untilPropagated(lambda: lambda_client.create_event_source_mapping(**local_trigger_param),
+                                  description=f"create event source mapping {trigger}")
+            logger.info("     Event source mapping created for %s:%s to Lambda function %s", trigger, trigger_param["EventSourceArn"], lambda_def)
 
 
 # Rapid creation and deletion may throw this annoying error
@@ -167,10 +179,10 @@ def delete_lambda():
                 lambda_client.delete_event_source_mapping(UUID=m['UUID'])
 
             lambda_client.delete_function(FunctionName=lambda_def)
-            print(f"Lambda function {lambda_def} deleted")
+            logger.info("Lambda function %s deleted", lambda_def)
         # if lambda function does not exist, print error message and continue to next lambda function
         except lambda_client.exceptions.ResourceNotFoundException:
-            print(f"Lambda function {lambda_def} does not exist, skipping...")
+            logger.info("Lambda function %s does not exist, skipping...", lambda_def)
             continue
       
 
@@ -204,12 +216,15 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_lambda()
-        elif action == "delete":
-            delete_lambda()
-        elif action == "list":
-            list_lambda()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_lambda()
+            elif action == "delete":
+                delete_lambda()
+            elif action == "list":
+                list_lambda()
 
 
 if __name__ == "__main__":
@@ -18,9 +18,19 @@
 
 # After you receive the confirmation email message, confirm the subscription. If you don’t receive an email message within a few minutes, check the spam folder.
 
+import os
+import logging
 import boto3
 import sys
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+import Arn
+from Config import Config
+from Recorder import Recorder
+import StructLog
+
+logger = logging.getLogger(__name__)
+
 notification_email = "your.email@gmail.com"  # replace with your email address
 
 
@@ -52,21 +62,20 @@ def create_sns():
 
     # iterate through the sns_definitions, create the topic, set the attributes, subscribe to the subscription lists
     for topic_name, topic_definition in sns_definitions.items():
-        print(f"Creating topic {topic_name}...")
+        logger.info("Creating topic %s...", topic_name)
         
         topic = sns_client.create_topic(Name=topic_name,
                                         Attributes=topic_definition["Attributes"])
-        print(f"Topic created: ARN: {topic['TopicArn']}")
+        logger.info("Topic created: ARN: %s", topic['TopicArn'])
 
         for key, subscription in topic_definition["Subscriptions"].items():
-            print(key, subscription)
-            print(f"Creating subscription {key} for {subscription['Protocol']}:{subscription['Endpoint']}")
+            logger.info("Creating subscription %s for %s:%s", key, subscription['Protocol'], subscription['Endpoint'])
             sns_client.subscribe(
                 TopicArn=topic['TopicArn'],
                 Protocol=subscription['Protocol'],
                 Endpoint=subscription["Endpoint"]
             )
-            print(f"Subscription created for {key}:{subscription['Endpoint']}")
+            logger.info("Subscription created for %s:%s", key, subscription['Endpoint'])
 
 
 
@@ -79,7 +88,7 @@ def delete_sns():
     
     # iterate through the topics, identify the subscriptions, remove the subscriptions then delete the topic
     for topic in topics:
-        print(f"Deleting topic {topic['TopicArn']}...")
+        logger.info("Deleting topic %s...", topic['TopicArn'])
         subscriptions = sns_client.list_subscriptions_by_topic(TopicArn=topic['TopicArn'])['Subscriptions']
         for subscription in subscriptions:
             subscriptionArn = subscription['SubscriptionArn']
@@ -87,14 +96,14 @@ def delete_sns():
             subscriptionEndpoint = subscription['Endpoint']
             # if the subscription arn is "PendingConfirmation", skip as unsubscribe would fail on pending confirmation
             if subscriptionArn.split(':')[-1] == "PendingConfirmation":
-                print(f"Skipping subscription {subscriptionProtocol}:{subscriptionEndpoint} {subscription['SubscriptionArn']} as it is pending confirmation")
+                logger.info("Skipping subscription %s:%s %s as it is pending confirmation", subscriptionProtocol, subscriptionEndpoint, subscriptionArn)
                 continue
             else:
-                print(f"unsubscribe {subscriptionProtocol}:{subscriptionEndpoint} {subscription['SubscriptionArn']}")
+                logger.info("unsubscribe %s:%s %s", subscriptionProtocol, subscriptionEndpoint, subscriptionArn)
                 sns_client.unsubscribe(SubscriptionArn=subscription['SubscriptionArn'])
 
         sns_client.delete_topic(TopicArn=topic['TopicArn'])
-        print(f"Topic deleted: {topic['TopicArn']}") 
+        logger.info("Topic deleted: %s", topic['TopicArn'])
 
 
 def list_sns():
@@ -117,15 +126,9 @@ def list_sns():
                 # print(f"Subscription Attributes: {sns_client.get_subscription_attributes(SubscriptionArn=subscription['SubscriptionArn'])}")
 
 # get SNS topic arn by topic name
+# topic ARN is synthesized from account, region and name instead of listing all the topics
 def get_sns_topic_arn(topic_name):
-    sns_client = boto3.client('sns')
-    sns_topics = sns_client.list_topics()['Topics']
-    topics = [t for t in sns_topics if t['TopicArn'].split(':')[-1] == topic_name]
-    if len(topics) == 0:
-        print(f"Topic {topic_name} not found")
-        return None
-    else:
-        return topics[0]['TopicArn']
+    return Arn.snsTopic(Config.accountId(), Config.region(), topic_name)
 
 
 
@@ -143,12 +146,15 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_sns()
-        elif action == "delete":
-            delete_sns()
-        elif action == "list":
-            list_sns()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_sns()
+            elif action == "delete":
+                delete_sns()
+            elif action == "list":
+                list_sns()
 
 
 if __name__ == "__main__":
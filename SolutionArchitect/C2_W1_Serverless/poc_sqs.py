@@ -5,11 +5,21 @@
 #
 # In this python script, it will use boto3 to achieve the creation and cleanup of the required resources
 #
+import os
+import logging
 import sys
 import boto3
 import json
 from poc_iam_role import get_arn_by_role_name
 
+# common utilities from SolutionArchitect/utils (PYTHONPATH)
+import Arn
+from Config import Config
+from Recorder import Recorder
+import StructLog
+
+logger = logging.getLogger(__name__)
+
 sqs_definitions = {
     "POC1-Queue": {
         "SendRoles" : ["POC1-APIGateway-SQS"],
@@ -32,7 +42,7 @@ def create_sqs():
                 'MessageRetentionPeriod': '86400'
             }
         )
-        print(response)
+        logger.info("Created queue %s: %s", sqs_queue, StructLog.compact(response))
         
         # get the queue ARN from the response
         queue_url = response['QueueUrl']
@@ -93,8 +103,8 @@ def delete_sqs():
             QueueUrl=queue_url['QueueUrl']
         )
 
-        # print the response
-        print(response)
+        # log the response
+        logger.info("Deleted queue %s: %s", sqs_queue, StructLog.compact(response))
 
 
 # list the SQS queues
@@ -111,8 +121,8 @@ def list_sqs():
     
     # print the queue URLs
     for queue_url in response['QueueUrls']:
-        # map the queue_url to the queue name
-        queue_name = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn'].split(':')[-1]
+        # map the queue_url to the queue name - the name is the last component of the url
+        queue_name = queue_url.split('/')[-1]
         if queue_name in sqs_definitions.keys():
             print(f"{queue_name}: {queue_url}")
             num_queues+=1
@@ -131,11 +141,9 @@ def get_sqs_queue_url(queue_name):
     queue_url = sqs.get_queue_url(QueueName=queue_name)
     return queue_url['QueueUrl']
 
+# queue ARN is synthesized from account, region and name - no get_queue_url/get_queue_attributes round trips
 def get_sqs_queue_arn(queue_name):
-    # create an SQS client
-    sqs = boto3.client('sqs')
-    queue_url = get_sqs_queue_url(queue_name)
-    return sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+    return Arn.sqsQueue(Config.accountId(), Config.region(), queue_name)
 
 
 #if this .py is executed directly on the command line
@@ -151,12 +159,15 @@ def main(argv):
     else:
         # if additional arguments are passed, proceed with the action
         action = argv[1]
-        if action == "create":
-            create_sqs()
-        elif action == "delete":
-            delete_sqs()
-        elif action == "list":
-            list_sqs()
+        StructLog.configure(fmt="%(asctime)s %(levelname)s %(message)s")
+        # RECORDER_MODE=record|replay to capture/replay the AWS calls of this run
+        with Recorder.fromEnvironment(f"recordings/{os.path.basename(argv[0])}.{action}.jsonl.gz", default=Recorder.OFF):
+            if action == "create":
+                create_sqs()
+            elif action == "delete":
+                delete_sqs()
+            elif action == "list":
+                list_sqs()
 
 
 if __name__ == "__main__":
@@ -1,3 +1,23 @@
+#
+# KeyEncrypt.py
+#
+# KMS encrypt / decrypt / re-encrypt demo, based on the AWS code examples
+#
+# Batch mode, for bulk data & benchmarks of the KMS paths from the shell:
+#
+#   python3 KeyEncrypt.py batch <encrypt|decrypt|re-encrypt> <key id> [--destination-key <key id>]
+#                         [--input <file>] [--output <file>] [--framed] [--workers <n>] [--rate <requests per second>]
+#
+# Records are read from stdin (or --input) and written to stdout (or --output) in the input order, as they complete.
+# Line mode: one record per line, the ciphertexts are base64 encoded. Framed mode (--framed): each record is a 4 bytes
+# big-endian length followed by the raw bytes. A failed record is written empty. The throughput & latency stats of
+# the run are printed to stderr. PYTHONPATH must include ../utils for the batch mode.
+#
+
+import sys
+import time
+import base64
+import struct
 import logging
 import boto3
 from botocore.exceptions import ClientError
@@ -56,7 +76,7 @@ class KeyEncrypt:
             print("Skipping decryption demo.")
 
 
-    def re_encrypt(self, source_key_id, cipher_text):
+    def re_encrypt(self, source_key_id, cipher_text, destination_key_id=None):
         """
         Takes ciphertext previously encrypted with one key and reencrypt it by using
         another key.
@@ -64,14 +84,20 @@ class KeyEncrypt:
         :param source_key_id: The ARN or ID of the original key used to encrypt the
                               ciphertext.
         :param cipher_text: The encrypted ciphertext.
+        :param destination_key_id: The ARN or ID of the key to reencrypt with. When
+                                   given, nothing is prompted or printed, for
+                                   non-interactive (bulk) use.
         :return: The ciphertext encrypted by the second key.
         """
-        destination_key_id = input(
-            f"Your ciphertext is currently encrypted with key {source_key_id}. "
-            f"Enter another key ID or ARN to reencrypt it: "
-        )
+        interactive = destination_key_id is None
+        if interactive:
+            destination_key_id = input(
+                f"Your ciphertext is currently encrypted with key {source_key_id}. "
+                f"Enter another key ID or ARN to reencrypt it: "
+            )
         if destination_key_id != "":
             try:
+                # the plaintext never leaves KMS
                 cipher_text = self.kms_client.re_encrypt(
                     SourceKeyId=source_key_id,
                     DestinationKeyId=destination_key_id,
@@ -83,7 +109,8 @@ class KeyEncrypt:
                     err.response["Error"]["Message"],
                 )
             else:
-                print(f"Reencrypted your ciphertext as: {cipher_text}")
+                if interactive:
+                    print(f"Reencrypted your ciphertext as: {cipher_text}")
                 return cipher_text
         else:
             print("Skipping reencryption demo.")
@@ -91,6 +118,163 @@ class KeyEncrypt:
 
 
 
+def read_records(stream, framed):
+    """
+    Records of a binary stream, lazily: lines w/o the line ending, or length prefixed frames
+    """
+    if not framed:
+        for line in stream:
+            yield line.rstrip(b"\r\n")
+        return
+    while True:
+        prefix = stream.read(4)
+        if not prefix:
+            return
+        if len(prefix) < 4:
+            raise ValueError("Truncated record length")
+        (length,) = struct.unpack(">I", prefix)
+        record = stream.read(length)
+        if len(record) < length:
+            raise ValueError("Truncated record")
+        yield record
+
+
+def write_record(stream, record, framed):
+    if framed:
+        stream.write(struct.pack(">I", len(record)) + record)
+    else:
+        stream.write(record + b"\n")
+
+
+class BatchStats:
+    def __init__(self):
+        self.records = 0
+        self.failed = 0
+        self.bytes = 0
+        self.latencies = []
+        self.start = time.perf_counter()
+
+    def add(self, size, latency, failed):
+        self.records += 1
+        self.bytes += size
+        self.latencies.append(latency)
+        if failed:
+            self.failed += 1
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+        return {
+            "Records": self.records,
+            "Failed": self.failed,
+            "Bytes": self.bytes,
+            "Seconds": round(elapsed, 3),
+            "RecordsPerSecond": round(self.records / elapsed, 1) if elapsed > 0 else 0.0,
+            "LatencyMs": {"p50": percentile(0.50), "p90": percentile(0.90), "p99": percentile(0.99),
+                          "max": percentile(1.0)},
+        }
+
+
+def batch(kms_client, operation, key_id, source, destination, framed=False, destination_key_id=None,
+          max_workers=None, rate=None):
+    """
+    Encrypts, decrypts or reencrypts a stream of records concurrently, the results
+    are written in the input order as they complete.
+
+    :param operation: "encrypt", "decrypt" or "re-encrypt".
+    :param key_id: The ARN or ID of the key (the source key to reencrypt).
+    :param source: Binary stream of the input records.
+    :param destination: Binary stream of the output records.
+    :param framed: Length prefixed records instead of lines.
+    :param destination_key_id: The key to reencrypt with.
+    :param max_workers: Requests in flight.
+    :param rate: Requests per second, default to the KMS request quota shared with the
+        other callers of the account & region of the key.
+    :return: The BatchStats of the run.
+    """
+    from Kms import Kms
+    from RateLimiter import RateLimiter
+    from Scheduler import orderedMap, DEFAULT_WORKERS
+
+    key_encrypt = KeyEncrypt(kms_client)
+    # a private limiter only for an explicit rate, the shared quota otherwise
+    limiter = RateLimiter(rate) if rate else Kms.keyLimiter(key_id, kms_client.meta.region_name)
+    # ciphertexts are binary, base64 encoded in line mode
+    decode_input = not framed and operation != "encrypt"
+    encode_output = not framed and operation != "decrypt"
+
+    def process(record):
+        start = time.perf_counter()
+        try:
+            if decode_input:
+                record = base64.b64decode(record)
+            limiter.acquire()
+            start = time.perf_counter()
+            if operation == "encrypt":
+                result = kms_client.encrypt(KeyId=key_id, Plaintext=record)["CiphertextBlob"]
+            elif operation == "decrypt":
+                result = kms_client.decrypt(KeyId=key_id, CiphertextBlob=record)["Plaintext"]
+            else:
+                result = key_encrypt.re_encrypt(key_id, record, destination_key_id)
+        except ClientError as err:
+            logger.error("Couldn't %s record. Here's why: %s", operation, err.response["Error"]["Message"])
+            result = None
+        except Exception as err:
+            # e.g. a malformed base64 line, only this record fails
+            logger.error("Couldn't %s record. Here's why: %s", operation, err)
+            result = None
+        return len(record), time.perf_counter() - start, result
+
+    stats = BatchStats()
+    for size, latency, result in orderedMap(process, read_records(source, framed), max_workers or DEFAULT_WORKERS):
+        stats.add(size, latency, result is None)
+        result = result or b""
+        write_record(destination, base64.b64encode(result) if encode_output else result, framed)
+    destination.flush()
+    return stats
+
+
+def batch_main(argv):
+    import json
+
+    usage = (f"Usage: python3 {argv[0]} batch <encrypt|decrypt|re-encrypt> <key id> [--destination-key <key id>] "
+             f"[--input <file>] [--output <file>] [--framed] [--workers <n>] [--rate <requests per second>]")
+    options = {"--destination-key": None, "--input": None, "--output": None, "--workers": None, "--rate": None}
+    framed = False
+    positional = []
+    arguments = iter(argv[2:])
+    for argument in arguments:
+        if argument == "--framed":
+            framed = True
+        elif argument in options:
+            options[argument] = next(arguments, None)
+        else:
+            positional.append(argument)
+    if (len(positional) != 2 or positional[0] not in ("encrypt", "decrypt", "re-encrypt")
+            or (positional[0] == "re-encrypt") != (options["--destination-key"] is not None)):
+        print(usage, file=sys.stderr)
+        return 1
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    operation, key_id = positional
+    source = open(options["--input"], "rb") if options["--input"] else sys.stdin.buffer
+    destination = open(options["--output"], "wb") if options["--output"] else sys.stdout.buffer
+    try:
+        stats = batch(boto3.client("kms"), operation, key_id, source, destination, framed=framed,
+                      destination_key_id=options["--destination-key"],
+                      max_workers=int(options["--workers"]) if options["--workers"] else None,
+                      rate=float(options["--rate"]) if options["--rate"] else None)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if destination is not sys.stdout.buffer:
+            destination.close()
+    print(json.dumps(stats.report(), indent=2), file=sys.stderr)
+    return 0 if stats.failed == 0 else 1
+
+
 def key_encryption(kms_client):
     logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -116,6 +300,8 @@ def key_encryption(kms_client):
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch_main(sys.argv))
     try:
         key_encryption(boto3.client("kms"))
     except Exception:
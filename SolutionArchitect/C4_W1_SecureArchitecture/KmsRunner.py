@@ -11,74 +11,30 @@
 # Setup using utils.config classes 
 #
 
-import boto3
+import os
+import sys
+import logging
 
 from Project import Project
-from IamPolicy import IamPolicy
-from IamRole import IamRole
 from Kms import Kms
-from Config import Config
+import ProjectDefinition
 from botocore.exceptions import ClientError
 
+logger = logging.getLogger(__name__)
 
-import sys
-import logging
+# The policy, role & kms definitions are stored in KmsLab.json, loading them doesn't make any API call
+# (the account id & key ARN are deferred references). Same as: python3 Project.py <create|delete|list|plan> KmsLab.json
+DEFINITION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "KmsLab.json")
 
-# The kms defintions can be stored in file, or in this, inline in runner
-policy_definitions = {
-    "C4W1-Kms-EncryptPolicy": {
-        "Version": "2012-10-17",
-        "Statement": [
-            {
-                "Sid": "VisualEditor0",
-                "Effect": "Allow",
-                "Action": [
-                    "kms:Encrypt",
-                    "kms:Descrypt",
-                    "kms:DescribeKey"
-                ],
-                "Resource": "*"
-            }
-        ]
-    },
-}
-
-role_definition = {
-    "C4W1-Kms-EncryptRole": {
-        "PrincipalType" : "AWS",
-        "AWS" : Config.accountId(),
-        #"Service" : "kms.amazonaws.com",
-        "UserPolicies": ["C4W1-Kms-EncryptPolicy"],
-        "AWSPolicies" : []
-    }
-}
-
-kms_definition = {
-    "C4W1-Kms-Key": {
-        "Description": "KMS Key for C4W1",
-        "KeyUsage": "ENCRYPT_DECRYPT",
-        "Origin" : "AWS_KMS",
-        "KeySpec": "SYMMETRIC_DEFAULT",
-        "Tags": [
-            { "TagKey" : "Context",
-              "TagValue" : "C4W1 Runner",
-            },
-            { "TagKey" : "Environment",
-              "TagValue" : "Development",
-            }
-        ],
-    }
-}
-                        
 
 def create(project):
-    project.addConfig(IamPolicy, policy_definitions)
-    project.addCofnig(IamRole, role_definition)
-    
-    project.list(IamPolicy)
+    return project.create()
+
+def delete(project):
+    return project.delete()
 
 def list(project):
-    project.list()
+    return project.list()
 
 
 def run(project):
@@ -118,36 +74,29 @@ def main(argv):
     # argv[0] is the script name, print remaining arguments separated by space without the bracket
     print("Running :", " ".join(argv[0:]))
     
-    project = Project(name="C4_W1_SecureArchitecture")
     # if no additonal arguments are passed, print usage help
     if len(argv) != 2 or argv[1] not in ["create", "delete", "list", "run"]:
-        print(f"Usage: python3 {argv[0]} <create|delete|list>")
-        print(f"account_id = {boto3.client('sts').get_caller_identity().get('Account')}")
+        print(f"Usage: python3 {argv[0]} <create|delete|list|run>")
         return
     else:
+        project = ProjectDefinition.fromFile(DEFINITION)
 
         # if additional arguments are passed, proceed with the action
         action = argv[1]
         if action == "create":
             create(project)
-            #print("Policies created successfully")
         elif action == "delete":
-            pass
-            #delete_policies()
-            #print("Policies deleted successfully")
+            delete(project)
         elif action == "list":
             list(project)
         elif action == "run":
-            # Create IAM Policy and IAM Role required for this run
-            project.addConfig(IamPolicy, policy_definitions)
-            project.addConfig(IamRole, role_definition)
-
-            project.create()
+            # Create the IAM Policy, IAM Role & KMS key required for this run
+            create(project)
 
             # Now that the role has been created, instantiate a seperate project which assume the role.
-            runProject = Project(name="C4_W1_SecureArchitecture_RunTime", role="C4W1-Kms-EncryptRole")
+            runProject = Project(name="C4_W1_SecureArchitecture_RunTime", roleName="C4W1-Kms-EncryptRole")
             runProject.addConfig(Kms)
-            list(runProject)
+            runProject.list(Kms)
             run(runProject)
 
 
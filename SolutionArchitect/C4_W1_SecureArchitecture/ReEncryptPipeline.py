@@ -0,0 +1,232 @@
+#
+# ReEncryptPipeline.py
+#
+# Bulk re-encryption of stored ciphertexts for a key rotation, built on KeyEncrypt.re_encrypt
+#
+# The ciphertexts are streamed from a store (a directory with one ciphertext per file, standing in for an object
+# store bucket) and re-encrypted under the destination key by kms.re_encrypt, so the plaintext never leaves KMS.
+# The calls run concurrently under the KMS request quota (the RateLimiter shared with the other KMS callers of the
+# account & region, or a private one with --rate), the results are written back in the listing
+# order and a checkpoint file records the progress: an interrupted run resumes after the last written object and
+# retries the objects that failed. In place, the objects rewritten after the last checkpoint save are recognized as
+# already encrypted with the destination key.
+#
+#   python3 ReEncryptPipeline.py <source key> <destination key> <directory> [--output <directory>]
+#                                [--checkpoint <file>] [--workers <n>] [--rate <requests per second>]
+#
+# Keys are ARNs, ids or aliases (alias/C4W1-Kms-Key). PYTHONPATH must include ../utils.
+#
+
+import os
+import sys
+import json
+import time
+import logging
+import boto3
+from botocore.exceptions import ClientError
+
+from KeyEncrypt import KeyEncrypt
+from Kms import Kms
+from RateLimiter import RateLimiter
+from Scheduler import orderedMap, DEFAULT_WORKERS
+import ClientHooks
+import StructLog
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_EVERY = 1000   # objects between two checkpoint saves
+TMP_SUFFIX = ".tmp"       # objects being written, see DirectoryStore.put()
+ALREADY_DONE = object()   # result of an object found already re-encrypted (in place)
+
+
+class DirectoryStore:
+    """
+    Stand-in object store: one object per file under the root directory, the key is the relative path
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def keys(self, directory=""):
+        # listing order: sorted by path components (see Checkpoint.remaining), streamed w/o listing the whole tree first
+        with os.scandir(os.path.join(self.root, directory)) as entries:
+            names = sorted((entry.name, entry.is_dir()) for entry in entries)
+        for name, isDirectory in names:
+            key = os.path.join(directory, name)
+            if not isDirectory and name.endswith(TMP_SUFFIX):
+                # left behind by a put() interrupted before its rename, not an object
+                continue
+            if isDirectory:
+                yield from self.keys(key)
+            else:
+                yield key
+
+    def get(self, key):
+        with open(os.path.join(self.root, key), "rb") as f:
+            return f.read()
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpPath = f"{path}.{os.getpid()}{TMP_SUFFIX}"
+        with open(tmpPath, "wb") as f:
+            f.write(data)
+        os.replace(tmpPath, path)
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.lastKey = None   # every object up to this key (in listing order) is done
+        self.failed = []      # objects to retry
+        self.done = 0
+        self.bytes = 0
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            self.lastKey = state.get("LastKey")
+            self.failed = state.get("Failed", [])
+            self.done = state.get("Done", 0)
+            self.bytes = state.get("Bytes", 0)
+
+    def save(self):
+        if self.path is None:
+            return
+        tmpPath = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmpPath, "w") as f:
+            json.dump({"LastKey": self.lastKey, "Failed": self.failed, "Done": self.done, "Bytes": self.bytes}, f)
+        os.replace(tmpPath, self.path)
+
+    def remaining(self, keys):
+        """
+        The failed objects of the previous run, then the keys after the last one done
+
+        :param keys: Keys in listing order, the last key done may not exist anymore
+        """
+        yield from ((key, True) for key in list(self.failed))
+        lastKey = None if self.lastKey is None else self.lastKey.split(os.sep)
+        for key in keys:
+            if lastKey is None or key.split(os.sep) > lastKey:
+                yield key, False
+
+
+class ReEncryptPipeline:
+    def __init__(self, kmsClient, sourceKeyId, destinationKeyId, source, destination=None, checkpointPath=None,
+                 maxWorkers=DEFAULT_WORKERS, limiter=None):
+        """
+        :param kmsClient: boto3 KMS client
+        :param sourceKeyId: Key the ciphertexts are encrypted with
+        :param destinationKeyId: Key to re-encrypt with
+        :param source: Store of the ciphertexts, e.g. DirectoryStore
+        :param destination: Store of the re-encrypted ciphertexts, default to source (in place)
+        :param checkpointPath: JSON file of the progress, None to always start over
+        :param limiter: RateLimiter of the KMS quota, default to the one shared by the callers of the account & region
+                        of the destination key - see Kms.keyLimiter()
+        """
+        self.keyEncrypt = KeyEncrypt(kmsClient)
+        self.sourceKeyId = sourceKeyId
+        self.destinationKeyId = destinationKeyId
+        self.source = source
+        self.destination = destination or source
+        self.checkpoint = Checkpoint(checkpointPath)
+        self.maxWorkers = maxWorkers
+        self.limiter = limiter or Kms.keyLimiter(destinationKeyId, kmsClient.meta.region_name)
+
+    # An in place run interrupted before its checkpoint already rewrote some objects under the destination key,
+    # the source key rejects them: a re-encryption from the destination key tells they are done
+    def isReEncrypted(self, cipherText):
+        self.limiter.acquire()
+        try:
+            self.keyEncrypt.kms_client.re_encrypt(SourceKeyId=self.destinationKeyId, DestinationKeyId=self.destinationKeyId,
+                                                  CiphertextBlob=cipherText)
+            return True
+        except ClientError:
+            return False
+
+    # runs in the worker threads: (key, retried, re-encrypted ciphertext / ALREADY_DONE / None, size)
+    def reEncryptOne(self, entry):
+        key, retried = entry
+        try:
+            cipherText = self.source.get(key)
+        except OSError as e:
+            logger.error("Couldn't read %s: %s", key, e)
+            return key, retried, None, 0
+        self.limiter.acquire()
+        result = self.keyEncrypt.re_encrypt(self.sourceKeyId, cipherText, self.destinationKeyId)
+        if result is None and self.destination is self.source and self.isReEncrypted(cipherText):
+            logger.info("%s is already encrypted with the destination key", key)
+            result = ALREADY_DONE
+        return key, retried, result, len(cipherText)
+
+    def run(self):
+        """
+        Re-encrypt the remaining objects of the source
+
+        :return: dictionary of Done, Failed, Bytes, Seconds & PerSecond of this run
+        """
+        checkpoint = self.checkpoint
+        previousDone, previousBytes = checkpoint.done, checkpoint.bytes
+        start = time.perf_counter()
+        done = failed = size = 0
+        for key, retried, cipherText, length in orderedMap(self.reEncryptOne, checkpoint.remaining(self.source.keys()),
+                                                           self.maxWorkers):
+            if cipherText is None:
+                failed += 1
+                if not retried:
+                    checkpoint.failed.append(key)
+            else:
+                if cipherText is not ALREADY_DONE:
+                    self.destination.put(key, cipherText)
+                done += 1
+                size += length
+                if retried:
+                    checkpoint.failed.remove(key)
+            if not retried:
+                checkpoint.lastKey = key
+            if (done + failed) % CHECKPOINT_EVERY == 0:
+                checkpoint.done, checkpoint.bytes = previousDone + done, previousBytes + size
+                checkpoint.save()
+                elapsed = time.perf_counter() - start
+                logger.info("Re-encrypted %d objects (%d failed), %.1f objects/s, %.1f KB/s", done, failed,
+                            done / elapsed, size / 1024 / elapsed)
+        elapsed = time.perf_counter() - start
+        checkpoint.done, checkpoint.bytes = previousDone + done, previousBytes + size
+        checkpoint.save()
+        report = {"Done": done, "Failed": failed, "Bytes": size, "Seconds": round(elapsed, 3),
+                  "PerSecond": round(done / elapsed, 1) if elapsed > 0 else 0.0}
+        logger.info("Re-encryption completed: %s", report)
+        return report
+
+
+def main(argv):
+    usage = (f"Usage: python3 {argv[0]} <source key> <destination key> <directory> [--output <directory>] "
+             f"[--checkpoint <file>] [--workers <n>] [--rate <requests per second>]")
+    options = {"--output": None, "--checkpoint": None, "--workers": str(DEFAULT_WORKERS), "--rate": None}
+    positional = []
+    arguments = iter(argv[1:])
+    for argument in arguments:
+        if argument in options:
+            options[argument] = next(arguments, None)
+            if options[argument] is None:
+                print(usage)
+                return 1
+        else:
+            positional.append(argument)
+    if len(positional) != 3:
+        print(usage)
+        return 1
+
+    StructLog.configure(level=logging.INFO, fmt='%(asctime)s %(levelname)s %(message)s')
+    sourceKeyId, destinationKeyId, directory = positional
+    kmsClient = ClientHooks.attach(boto3.client("kms"))
+    pipeline = ReEncryptPipeline(kmsClient, sourceKeyId, destinationKeyId, DirectoryStore(directory),
+                                 destination=DirectoryStore(options["--output"]) if options["--output"] else None,
+                                 checkpointPath=options["--checkpoint"], maxWorkers=int(options["--workers"]),
+                                 # the shared quota of the account & region unless a rate is given
+                                 limiter=RateLimiter(float(options["--rate"])) if options["--rate"] else None)
+    report = pipeline.run()
+    print(json.dumps(report, indent=2))
+    return 0 if report["Failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
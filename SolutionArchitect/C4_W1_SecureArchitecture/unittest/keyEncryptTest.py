@@ -0,0 +1,79 @@
+import io
+import base64
+import unittest
+from unittest import mock
+import boto3
+from botocore.stub import Stubber
+
+from Config import Config
+from KeyEncrypt import batch, read_records, write_record
+from RateLimiter import sharedLimiter
+
+ACCOUNT_ID = "123456789012"
+KEY_ID = "alias/C4W1-Kms-Key"
+NEW_KEY_ID = "alias/C4W1-Kms-Key-2"
+
+class keyEncryptTest(unittest.TestCase):
+    def setUp(self):
+        # the shared limiter of the key is looked up by account, w/o any STS call
+        self.account = mock.patch.object(Config, "_accountId", ACCOUNT_ID)
+        self.account.start()
+        self.client = boto3.client("kms", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+        self.account.stop()
+
+    # one worker, so the stubbed calls are made in the input order
+    def run_batch(self, operation, records, framed=False, **options):
+        source = io.BytesIO()
+        for record in records:
+            write_record(source, record, framed)
+        source.seek(0)
+        destination = io.BytesIO()
+        stats = batch(self.client, operation, KEY_ID, source, destination, framed=framed, max_workers=1, **options)
+        self.stubber.assert_no_pending_responses()
+        return stats, list(read_records(io.BytesIO(destination.getvalue()), framed))
+
+    def test_line_mode(self):
+        for value in [b"alpha", b"beta"]:
+            self.stubber.add_response("encrypt", {"CiphertextBlob": b"ct:" + value}, {"KeyId": KEY_ID, "Plaintext": value})
+        stats, output = self.run_batch("encrypt", [b"alpha", b"beta"])
+        self.assertEqual(output, [base64.b64encode(b"ct:alpha"), base64.b64encode(b"ct:beta")])
+        self.assertEqual((stats.records, stats.failed), (2, 0))
+
+    def test_shared_limiter(self):
+        # w/o a rate, the requests draw from the quota shared by the KMS callers of the account & region
+        limiter = sharedLimiter(ACCOUNT_ID, "us-east-1")
+        self.stubber.add_response("encrypt", {"CiphertextBlob": b"ct:alpha"}, {"KeyId": KEY_ID, "Plaintext": b"alpha"})
+        with mock.patch.object(limiter, "acquire", wraps=limiter.acquire) as acquire:
+            self.run_batch("encrypt", [b"alpha"])
+        self.assertEqual(acquire.call_count, 1)
+
+    def test_line_mode_malformed(self):
+        # the malformed line is written empty, the others go on
+        self.stubber.add_response("decrypt", {"Plaintext": b"alpha"}, {"KeyId": KEY_ID, "CiphertextBlob": b"ct:alpha"})
+        self.stubber.add_client_error("decrypt", "InvalidCiphertextException")
+        self.stubber.add_response("decrypt", {"Plaintext": b"gamma"}, {"KeyId": KEY_ID, "CiphertextBlob": b"ct:gamma"})
+        stats, output = self.run_batch("decrypt", [base64.b64encode(b"ct:alpha"), b"not-base64!",
+                                                   base64.b64encode(b"ct:beta"), base64.b64encode(b"ct:gamma")])
+        self.assertEqual(output, [b"alpha", b"", b"", b"gamma"])
+        self.assertEqual((stats.records, stats.failed), (4, 2))
+
+    def test_framed_mode(self):
+        records = [b"\x00\n\x01binary", b"\xff" * 300]
+        for record in records:
+            self.stubber.add_response("re_encrypt", {"CiphertextBlob": b"new:" + record},
+                                      {"SourceKeyId": KEY_ID, "DestinationKeyId": NEW_KEY_ID, "CiphertextBlob": record})
+        stats, output = self.run_batch("re-encrypt", records, framed=True, destination_key_id=NEW_KEY_ID)
+        self.assertEqual(output, [b"new:" + record for record in records])
+        self.assertEqual((stats.records, stats.failed, stats.bytes), (2, 0, 309))
+
+    def test_truncated_frame(self):
+        with self.assertRaises(ValueError):
+            list(read_records(io.BytesIO(b"\x00\x00\x00\x08short"), framed=True))
+
+if __name__ == "__main__":
+    unittest.main()
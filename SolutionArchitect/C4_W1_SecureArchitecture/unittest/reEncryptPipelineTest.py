@@ -0,0 +1,136 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import boto3
+from botocore.exceptions import ClientError
+
+import ReEncryptPipeline
+from ReEncryptPipeline import ReEncryptPipeline as Pipeline, DirectoryStore, Checkpoint
+from Config import Config
+from RateLimiter import RateLimiter, sharedLimiter
+
+OLD_KEY = "alias/Old-Key"
+NEW_KEY = "alias/New-Key"
+
+def clientError(code, operation="ReEncrypt"):
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+# kms.re_encrypt w/o any request: a ciphertext is "<key id>:<plaintext>"
+class FakeKms:
+    def __init__(self, failing=()):
+        self.failing = set(failing)   # plaintexts rejected once
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def re_encrypt(self, SourceKeyId, DestinationKeyId, CiphertextBlob):
+        keyId, _, plainText = CiphertextBlob.decode().partition(":")
+        with self.lock:
+            self.calls.append((SourceKeyId, plainText))
+            if plainText in self.failing:
+                self.failing.discard(plainText)
+                raise clientError("ThrottlingException")
+        if keyId != SourceKeyId:
+            raise clientError("IncorrectKeyException")
+        return {"CiphertextBlob": f"{DestinationKeyId}:{plainText}".encode()}
+
+# store interrupted (e.g. killed) after a number of writes
+class Interrupted(Exception):
+    pass
+
+class InterruptedStore(DirectoryStore):
+    def __init__(self, root, writes):
+        super().__init__(root)
+        self.writes = writes
+
+    def put(self, key, data):
+        if self.writes == 0:
+            raise Interrupted(key)
+        self.writes -= 1
+        super().put(key, data)
+
+class reEncryptPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, "objects")
+        self.checkpointPath = os.path.join(self.directory.name, "checkpoint.json")
+        self.keys = [os.path.join(folder, f"{index:03d}") for folder in ["a", "b", "c"] for index in range(10)]
+        store = DirectoryStore(self.root)
+        for key in self.keys:
+            store.put(key, f"{OLD_KEY}:{key}".encode())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def pipeline(self, kms, store=None):
+        store = store or DirectoryStore(self.root)
+        return Pipeline(kms, OLD_KEY, NEW_KEY, store, checkpointPath=self.checkpointPath, maxWorkers=4,
+                        limiter=RateLimiter(1000000))
+
+    def assertReEncrypted(self):
+        store = DirectoryStore(self.root)
+        self.assertEqual(list(store.keys()), self.keys)
+        for key in self.keys:
+            self.assertEqual(store.get(key), f"{NEW_KEY}:{key}".encode())
+
+    def test_listing_order(self):
+        DirectoryStore(self.root).put("a-b", b"")
+        keys = list(DirectoryStore(self.root).keys())
+        # sorted by path components, the order Checkpoint.remaining compares with
+        self.assertEqual(keys, sorted(keys, key=lambda key: key.split(os.sep)))
+
+    def test_interrupted_put(self):
+        # the temporary file of a write killed before its rename is not listed as an object
+        with open(os.path.join(self.root, "a", f"005.1234{ReEncryptPipeline.TMP_SUFFIX}"), "wb") as f:
+            f.write(b"partial")
+        self.assertEqual(list(DirectoryStore(self.root).keys()), self.keys)
+
+    @mock.patch.object(Config, "_accountId", "123456789012")
+    def test_shared_limiter(self):
+        # w/o an explicit rate, the quota is shared with the other KMS callers of the account & region
+        client = boto3.client("kms", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        pipeline = Pipeline(client, OLD_KEY, NEW_KEY, DirectoryStore(self.root))
+        self.assertIs(pipeline.limiter, sharedLimiter("123456789012", "us-east-1"))
+
+    @mock.patch.object(ReEncryptPipeline, "CHECKPOINT_EVERY", 10)
+    def test_resume_after_interrupt(self):
+        # in place, killed after 25 writes: the checkpoint is at 20, 21-25 are already under the new key
+        with self.assertRaises(Interrupted):
+            self.pipeline(FakeKms(), InterruptedStore(self.root, 25)).run()
+        self.assertEqual(Checkpoint(self.checkpointPath).lastKey, self.keys[19])
+
+        kms = FakeKms()
+        report = self.pipeline(kms).run()
+        self.assertEqual((report["Done"], report["Failed"]), (10, 0))
+        self.assertReEncrypted()
+        # the first 20 objects are not sent again
+        self.assertEqual(sorted({key for _, key in kms.calls}), self.keys[20:])
+        checkpoint = Checkpoint(self.checkpointPath)
+        self.assertEqual((checkpoint.lastKey, checkpoint.failed, checkpoint.done), (self.keys[-1], [], 30))
+
+    def test_retry_failures(self):
+        report = self.pipeline(FakeKms(failing=[self.keys[3], self.keys[17]])).run()
+        self.assertEqual((report["Done"], report["Failed"]), (28, 2))
+        self.assertEqual(Checkpoint(self.checkpointPath).failed, [self.keys[3], self.keys[17]])
+
+        # the next run retries only the failures
+        kms = FakeKms()
+        report = self.pipeline(kms).run()
+        self.assertEqual((report["Done"], report["Failed"]), (2, 0))
+        self.assertEqual([key for _, key in kms.calls], [self.keys[3], self.keys[17]])
+        self.assertEqual(Checkpoint(self.checkpointPath).failed, [])
+        self.assertReEncrypted()
+
+    def test_missing_last_key(self):
+        # the last key done was deleted since: resume with the keys after it
+        with open(self.checkpointPath, "w") as f:
+            json.dump({"LastKey": os.path.join("b", "004-deleted"), "Failed": [], "Done": 15, "Bytes": 0}, f)
+        kms = FakeKms()
+        report = self.pipeline(kms).run()
+        self.assertEqual((report["Done"], report["Failed"]), (15, 0))
+        self.assertEqual(sorted(key for _, key in kms.calls), self.keys[15:])
+
+if __name__ == "__main__":
+    unittest.main()
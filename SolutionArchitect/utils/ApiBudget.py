@@ -0,0 +1,153 @@
+#
+# ApiBudget.py
+#
+# Count the AWS API calls by service & operation, to pin the call complexity of the config operations
+#
+#   with api_budget(kms={"ListKeys": 1, "ListAliases": 1}):
+#       kms.list()
+#
+# A budget is a dictionary per service (boto3 client name) of operation -> max number of calls, the operation
+# can be given as API name ("ListAliases") or boto3 method name ("list_aliases"). "*" caps the total calls of
+# the service. Services w/o a budget are counted but not checked.
+#
+
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import ClientHooks
+
+
+class ApiBudgetExceeded(AssertionError):
+    pass
+
+
+def _operationName(name):
+    # boto3 method name to API operation name, e.g. list_aliases -> ListAliases
+    if name == "*" or not (name.islower() or "_" in name):
+        return name
+    return "".join(part.capitalize() for part in name.split("_"))
+
+
+#
+# ClientHooks listener counting the API calls issued while it is active
+#
+class ApiCounter:
+    def __init__(self, **tags):
+        """
+        :param tags: only count the calls of the clients attached with these tags (see ClientHooks.attach)
+        """
+        self.tags = tags
+        self.counts = Counter()   # (service, operation) -> number of calls
+        self.lock = threading.Lock()
+
+    def start(self):
+        ClientHooks.install()
+        ClientHooks.addListener(self)
+        return self
+
+    def stop(self):
+        ClientHooks.removeListener(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def onRequest(self, call):
+        if any(call.tags.get(k) != v for k, v in self.tags.items()):
+            return
+        with self.lock:
+            self.counts[(call.service, call.operation)] += 1
+
+    def count(self, service=None, operation=None):
+        operation = None if operation is None else _operationName(operation)
+        with self.lock:
+            return sum(n for (s, o), n in self.counts.items()
+                       if (service is None or s == service) and (operation is None or o == operation))
+
+    def total(self):
+        return self.count()
+
+    def byService(self):
+        result = {}
+        with self.lock:
+            for (service, operation), n in sorted(self.counts.items()):
+                result.setdefault(service, {})[operation] = n
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+    def check(self, budgets):
+        """
+        Compare the counts against the budgets
+
+        :param budgets: service -> {operation: max calls}
+        :return: list of violation messages, empty if within budget
+        """
+        violations = []
+        for service, operations in budgets.items():
+            for operation, limit in operations.items():
+                if operation == "*":
+                    actual = self.count(service)
+                else:
+                    actual = self.count(service, operation)
+                if actual > limit:
+                    violations.append(f"{service}.{_operationName(operation)}: {actual} calls, budget {limit}")
+        return violations
+
+    def __repr__(self):
+        return f"ApiCounter({self.byService()})"
+
+
+@contextmanager
+def api_budget(**budgets):
+    """
+    Context manager asserting the API calls made in the block stay within the budgets
+
+    :param budgets: one keyword per service, e.g. kms={"ListAliases": 1}, iam={"*": 0}
+    :return: The ApiCounter, to inspect the counts in the block
+    :raises ApiBudgetExceeded: if any budget is exceeded
+    """
+    with ApiCounter() as counter:
+        yield counter
+    violations = counter.check(budgets)
+    if len(violations) > 0:
+        raise ApiBudgetExceeded("API call budget exceeded: " + "; ".join(violations))
+
+
+#
+# Wall time & API calls per phase of an operation, e.g. refresh / apply of Project.create
+#
+class PhaseTimer:
+    def __init__(self):
+        self.phases = {}   # phase -> {"Seconds": ..., "ApiCalls": ..., "ByService": {service: {operation: count}}}
+
+    @contextmanager
+    def phase(self, name, **tags):
+        """
+        :param tags: only count the calls of the clients attached with these tags (see ApiCounter)
+        """
+        counter = ApiCounter(**tags).start()
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            counter.stop()
+            self.phases[name] = {"Seconds": time.perf_counter() - start, "ApiCalls": counter.total(),
+                                 "ByService": counter.byService()}
+
+    def reset(self):
+        self.phases.clear()
+
+    def report(self):
+        lines = [f"{'phase':<12}{'seconds':>10}{'api calls':>11}"]
+        for name, phase in self.phases.items():
+            services = ", ".join(f"{service}: {sum(ops.values())}" for service, ops in phase["ByService"].items())
+            lines.append(f"{name:<12}{phase['Seconds']:>10.3f}{phase['ApiCalls']:>11}  {services}".rstrip())
+        return "\n".join(lines)
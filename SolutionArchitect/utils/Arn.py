@@ -0,0 +1,133 @@
+#
+# Arn.py
+#
+# Central ARN builder for AWS resources managed by the config classes & poc scripts
+# https://docs.aws.amazon.com/IAM/latest/UserGuide/reference-arns.html
+#
+# Most ARNs are a pure function of partition, account, region and resource name. Building them locally
+# avoids the list/get round trips otherwise required to look them up (e.g. list_topics, get_queue_attributes).
+# Services with opaque identifiers (KMS key ids, DynamoDB stream labels, API Gateway ids) cannot be synthesized
+# and are resolved by API lookup in the caller.
+#
+
+PARTITION = "aws"
+
+# resource types that can be synthesized, keyed by "<service>:<resource-type>"
+# each entry is (regional, format string for the resource part of the ARN)
+_templates = {
+    "iam:role"        : (False, "role{path}{name}"),
+    "iam:policy"      : (False, "policy{path}{name}"),
+    "sns:topic"       : (True,  "{name}"),
+    "sqs:queue"       : (True,  "{name}"),
+    "dynamodb:table"  : (True,  "table/{name}"),
+    "kms:alias"       : (True,  "alias/{name}"),
+    "lambda:function" : (True,  "function:{name}"),
+    "s3:bucket"       : (False, "{name}"),
+    "ssm:parameter"   : (True,  "parameter/{name}"),
+}
+
+
+def supported(arnType):
+    """
+    Check if the ARN for the given resource type can be synthesized locally
+    """
+    return arnType in _templates
+
+
+def build(arnType, name, accountId, region=None, path="/"):
+    """
+    Synthesize the ARN for a resource
+
+    :param arnType: "<service>:<resource-type>", e.g. "iam:role"
+    :param name: The resource name
+    :param accountId: The account owning the resource ("aws" for AWS managed IAM policies)
+    :param region: The region of the resource, required for regional services
+    :param path: The IAM path, ignored by the other services
+    :return: The ARN string
+    """
+    if arnType not in _templates:
+        raise ValueError(f"ARN for {arnType} cannot be synthesized")
+    service, _ = arnType.split(":", 1)
+    regional, template = _templates[arnType]
+    if regional and region is None:
+        raise ValueError(f"Region is required to build the ARN for {arnType}")
+
+    # S3 bucket ARNs carry neither account nor region
+    if service == "s3":
+        return f"arn:{PARTITION}:s3:::{name}"
+
+    # strip 'alias/' so both forms of the KMS alias name are accepted
+    if arnType == "kms:alias" and name.startswith("alias/"):
+        name = name[len("alias/"):]
+
+    # hierarchical parameter names start with '/', which is part of the "parameter/" prefix of the ARN
+    if arnType == "ssm:parameter":
+        name = name.lstrip("/")
+
+    resource = template.format(name=name, path=path)
+    return f"arn:{PARTITION}:{service}:{region if regional else ''}:{accountId}:{resource}"
+
+
+# convenience wrappers for the commonly used ARNs
+def iamRole(accountId, name, path="/"):
+    return build("iam:role", name, accountId, path=path)
+
+def iamPolicy(accountId, name, path="/"):
+    return build("iam:policy", name, accountId, path=path)
+
+def awsManagedPolicy(name):
+    # AWS managed policies are owned by the "aws" account, name may contain the path (e.g. service-role/xxx)
+    return f"arn:{PARTITION}:iam::aws:policy/{name}"
+
+def snsTopic(accountId, region, name):
+    return build("sns:topic", name, accountId, region)
+
+def sqsQueue(accountId, region, name):
+    return build("sqs:queue", name, accountId, region)
+
+def sqsQueueUrl(accountId, region, name):
+    return f"https://sqs.{region}.amazonaws.com/{accountId}/{name}"
+
+def dynamodbTable(accountId, region, name):
+    return build("dynamodb:table", name, accountId, region)
+
+def kmsAlias(accountId, region, name):
+    return build("kms:alias", name, accountId, region)
+
+def ssmParameter(accountId, region, name):
+    return build("ssm:parameter", name, accountId, region)
+
+def lambdaFunction(accountId, region, name):
+    return build("lambda:function", name, accountId, region)
+
+
+def parse(arn):
+    """
+    Split an ARN into its components
+
+    :return: dictionary with Partition, Service, Region, AccountId, ResourceType and Name
+    """
+    parts = arn.split(":", 5)
+    if len(parts) != 6 or parts[0] != "arn":
+        raise ValueError(f"Invalid ARN: {arn}")
+    _, partition, service, region, accountId, resource = parts
+
+    # resource is either "type/name", "type:name" or a bare name (sns, sqs, s3)
+    resourceType = None
+    name = resource
+    for sep in ("/", ":"):
+        if sep in resource:
+            resourceType, name = resource.split(sep, 1)
+            break
+    # IAM resources may carry a path, the name is the last component
+    if service == "iam" and "/" in name:
+        name = name.split("/")[-1]
+
+    return {
+        "Partition" : partition,
+        "Service" : service,
+        "Region" : region,
+        "AccountId" : accountId,
+        "ResourceType" : resourceType,
+        "Name" : name,
+    }
@@ -0,0 +1,127 @@
+#
+# ClientHooks.py
+#
+# Shared botocore event hooks for the boto3 clients used by the config classes & poc scripts
+# https://boto3.amazonaws.com/v1/documentation/api/latest/guide/events.html
+#
+# A single set of handlers is registered per client (or on the boto3 default session so every client created
+# afterwards inherits them). The handlers dispatch to the active listeners, e.g. the Recorder for capture/replay
+# or the ApiCounter for call budgets, so the listeners can come and go w/o touching the clients again.
+#
+# Listener callbacks, all optional:
+#   onRequest(call)                 - API parameters are known, before validation & serialization
+#   onSend(call)                    - before the HTTP request, return (http_response, parsed) to short-circuit it
+#   onResponse(call, http, parsed)  - after the response has been parsed (including error responses)
+#
+
+import threading
+import time
+import functools
+import boto3
+
+_lock = threading.Lock()
+_listeners = ()   # copy-on-write tuple, safe to iterate from multiple threads
+
+_HOOK_ID = "solution-architect-client-hooks"
+
+
+#
+# Information of a single API call, shared between the hooks of the same request
+#
+class ApiCall:
+    def __init__(self, service, operation, params, tags, region=None):
+        self.service = service      # boto3 client name, e.g. "kms"
+        self.operation = operation  # API operation name, e.g. "ListAliases"
+        self.region = region        # region of the client
+        self.params = params        # API parameters as passed by the caller
+        self.tags = tags            # tags of the client - see attach()
+        self.start = time.perf_counter()
+        self.latency = None         # seconds, set once the response is received
+        self.replayed = False       # True if a listener short-circuited the HTTP request
+
+    def __repr__(self):
+        return f"ApiCall({self.service}.{self.operation})"
+
+
+def addListener(listener):
+    global _listeners
+    with _lock:
+        if listener not in _listeners:
+            _listeners = _listeners + (listener,)
+
+def removeListener(listener):
+    global _listeners
+    with _lock:
+        _listeners = tuple(l for l in _listeners if l is not listener)
+
+def listeners():
+    return _listeners
+
+
+def _beforeParameterBuild(params, model, context, tags=None, **kwargs):
+    call = ApiCall(model.service_model.service_name, model.name, params, tags or {}, context.get("client_region"))
+    context["api_call"] = call
+    for listener in _listeners:
+        if hasattr(listener, "onRequest"):
+            listener.onRequest(call)
+
+def _beforeCall(model, context, **kwargs):
+    call = context.get("api_call")
+    if call is None:
+        return None
+    call.start = time.perf_counter()
+    for listener in _listeners:
+        if hasattr(listener, "onSend"):
+            response = listener.onSend(call)
+            if response is not None:
+                call.replayed = True
+                return response
+    return None
+
+def _afterCall(http_response, parsed, model, context, **kwargs):
+    call = context.get("api_call")
+    if call is None:
+        return
+    call.latency = time.perf_counter() - call.start
+    for listener in _listeners:
+        if hasattr(listener, "onResponse"):
+            listener.onResponse(call, http_response, parsed)
+
+
+def _register(events, tags=None):
+    for event, handler in (("before-parameter-build", _beforeParameterBuild),
+                           ("before-call", _beforeCall),
+                           ("after-call", _afterCall)):
+        uniqueId = f"{_HOOK_ID}-{event}"
+        if tags:
+            # replace the untagged handler inherited from the session
+            events.unregister(event, unique_id=uniqueId)
+            if handler is _beforeParameterBuild:
+                handler = functools.partial(_beforeParameterBuild, tags=tags)
+        events.register(event, handler, unique_id=uniqueId)
+
+
+def attach(client, **tags):
+    """
+    Register the hooks on an existing client, the tags are passed along with every call of the client
+
+    :param client: boto3 client
+    :return: The client
+    """
+    _register(client.meta.events, tags)
+    return client
+
+
+def install(session=None):
+    """
+    Register the hooks on a boto3 session, every client created by the session afterwards inherits them
+
+    :param session: boto3 Session, default to the boto3 default session (used by boto3.client())
+    :return: The session
+    """
+    if session is None:
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        session = boto3.DEFAULT_SESSION
+    _register(session.events)
+    return session
@@ -8,6 +8,7 @@
 
 import sys
 import logging
+import threading
 import boto3
 from botocore.exceptions import ClientError
 import pandas as pd
@@ -15,6 +16,10 @@ import json
 import types
 
 from enum import Enum
+import Arn
+import ClientHooks
+import StructLog
+from StructLog import compact, fields, summaryMode
 
 # TODO: look into logger configurations & identify log locations
 logger = logging.getLogger(__name__)
@@ -31,6 +36,10 @@ class Action(Enum):
     CREATE = "create"
     DELETE = "delete"
 
+# Marker tags of the resources created by a Project, for the tag based discovery (see Project.discover)
+PROJECT_TAG = "Project"            # project name
+RESOURCE_TAG = "ProjectResource"   # key of the resource in the project definition
+
 
 #
 # JSON encoder class for configurations that requires special handling
@@ -38,11 +47,59 @@ class Action(Enum):
 #   
 class ConfigJsonEncoder(json.JSONEncoder):
     def default(self, o):
+        if isinstance(o, (ArnRef, Deferred)):
+            return o.resolve()
         if isinstance(o, types.GeneratorType):
             return next(o)
         return json.JSONEncoder.default(self, o)
+
+
+#
+# Deferred reference to the ARN of a resource managed by another config object (see Project.getConfigArn)
+# - resolved when the definition is converted to JSON
+# - identifies the dependency between the resources, for the Project to order the operations
+#
+class ArnRef:
+    def __init__(self, resolver, service, name):
+        self.resolver = resolver  # callable (service, name) -> ARN
+        self.service = service    # config class managing the referenced resource
+        self.name = name
+
+    def resolve(self):
+        return self.resolver(self.service, self.name)
+
+    def __repr__(self):
+        return f"ArnRef({self.service.__name__}, {self.name})"
+
+    # find all the references in a (nested) definition
+    @staticmethod
+    def find(obj):
+        if isinstance(obj, ArnRef):
+            yield obj
+        elif isinstance(obj, dict):
+            for value in obj.values():
+                yield from ArnRef.find(value)
+        elif isinstance(obj, (list, tuple)):
+            for value in obj:
+                yield from ArnRef.find(value)
     
 
+#
+# Deferred value other than an ARN, e.g. the account id of the project (see Project.getAccountIdRef)
+# - symbol is the form of the value in the definition files, e.g. {"$accountId": True}
+#
+class Deferred:
+    def __init__(self, resolver, symbol):
+        self.resolver = resolver  # callable () -> value
+        self.symbol = symbol
+
+    def resolve(self):
+        return self.resolver()
+
+    def __repr__(self):
+        return f"Deferred({self.symbol})"
+
+
 #
 # Base class for AWS config related functions via boto3
 # - Maintain internal resource map to determine the proper steps to setup the required AWS resources
@@ -53,27 +110,63 @@ class Config:
     _accountId = None
     _region = None
 
+    # "<service>:<resource-type>" of the managed resources, set by the child class when the ARN
+    # is a pure function of account, region and name (see Arn.py). None means lookup only
+    arnType = None
+
     def __init__(self, botoName, inputMap=None, session=None):
+        self.botoName = botoName
         self.session = session
         self.botoClient = boto3.client(botoName) if session is None else session.client(botoName)
+        ClientHooks.attach(self.botoClient)  # allow capture/replay & metrics on the client
         self.configMap = inputMap
         self.resourceMap = {}
         self.dirty = True  # set dirty to true to refresh the resource map on the next op
+        self.lock = threading.RLock()  # serialize the listings when keys are processed concurrently
+        self.resolver = None           # project scoped account/region/ARN cache, see Resolver.py
+        self.projectTags = {}          # marker tags of the owning project, see resourceTags()
         
     # class static function to get accountId()
     @staticmethod
     def accountId():
         if Config._accountId is None:
-            Config._accountId = boto3.client('sts').get_caller_identity().get('Account')
+            Config._accountId = ClientHooks.attach(boto3.client('sts')).get_caller_identity().get('Account')
         return Config._accountId
     
     # class static function to get region()
     @staticmethod
     def region():
         if Config._region is None:
-            Config._region = boto3.session.Session().region_name
+            # prefer the default session, it may have been setup with an explicit region (e.g. replay)
+            Config._region = (boto3.DEFAULT_SESSION or boto3.session.Session()).region_name
         return Config._region
     
+    # account & region of the resources managed by this object: the ones of the project session (e.g. one of the
+    # targets of a multi-account/region Project), the process-wide accountId()/region() otherwise
+    def getAccountId(self):
+        if self.resolver is None:
+            return Config.accountId()
+        return self.resolver.accountId()
+
+    def getRegion(self):
+        if self.resolver is not None:
+            return self.resolver.region()
+        if self.session is None or self.session.region_name is None:
+            return Config.region()
+        return self.session.region_name
+
+    # ARN of a resource of another config of the project if already known, w/o any lookup
+    def lookupArn(self, configClass, name):
+        return None if self.resolver is None else self.resolver.get(configClass, name)
+
+    # ARN of the resource in a create response, e.g. {"Role": {"Arn": ...}} or {"KeyMetadata": {"Arn": ...}}
+    @staticmethod
+    def responseArn(response):
+        for value in (response or {}).values():
+            if isinstance(value, dict) and "Arn" in value:
+                return value["Arn"]
+        return None
+
     @staticmethod
     def convertJson(obj):
         return json.dumps(obj, cls=ConfigJsonEncoder)
@@ -81,14 +174,56 @@ class Config:
     # Add the list of attributes assoicated with names to the internal resource map
     def addResource(self, name, attributes):
         self.resourceMap[name] = attributes
+        if self.resolver is not None:
+            self.resolver.put(type(self), name, attributes.get('Arn'))
+
+    # Add a resource found by the tag based discovery, only the ARN is known
+    def addTaggedResource(self, name, arn):
+        self.addResource(name, {'Arn': arn})
+
+    def resourceTags(self, key, tags=None, keyField="Key", valueField="Value"):
+        """
+        Tags of a new resource: the given tags + the marker tags of the project, in the format of the service
+
+        :param key: Name of the resource in the definition
+        :param tags: Tags of the definition, as a list of {keyField: ..., valueField: ...}
+        :return: list of {keyField: ..., valueField: ...}
+        """
+        merged = {tag[keyField]: tag[valueField] for tag in (tags or [])}
+        if self.projectTags:
+            merged.update(self.projectTags)
+            merged[RESOURCE_TAG] = key
+        return [{keyField: name, valueField: value} for name, value in merged.items()]
+
+    # Determine if the Arn for the given name can be built locally instead of looked up
+    # child classes can narrow this down, e.g. to the resources defined in the configMap
+    def canSynthesizeArn(self, name):
+        return self.arnType is not None and Arn.supported(self.arnType)
+
+    def synthesizeArn(self, name):
+        return Arn.build(self.arnType, name, self.getAccountId(), self.getRegion())
 
     # retreive the Arn for the input resource name from the internal resource map
     def getArn(self, name):
-        # or if the resource map is empty
-        if name not in self.resourceMap.keys():
-            print(f"Resource name not found: {name}, re-populating list")
-            self.list()
-        return self.resourceMap[name]['Arn']
+        if name in self.resourceMap.keys():
+            return self.resourceMap[name]['Arn']
+
+        # build the Arn locally when it's safe to do so, avoid a full re-list of the service
+        if self.canSynthesizeArn(name):
+            return self.synthesizeArn(name)
+
+        # fall back to a lookup for opaque ids (e.g. KMS key ids), or if the resource map is empty
+        # under the lock: the keys of the config may be processed concurrently (see Project.buildSchedule)
+        with self.lock:
+            if name not in self.resourceMap:
+                logger.info("Resource name not found: %s, re-populating list", name)
+                self.list()
+            return self.resourceMap[name]['Arn']
+
+    # Resources the given key depends on, as a list of (config class, name)
+    # Default to the ArnRef found in the definition, child classes add the references by name (e.g. IamRole policies)
+    def getDependencies(self, key, config):
+        return [(ref.service, ref.name) for ref in ArnRef.find(config)]
 
     def do_list(self):
         logger.info("Calling Config.do_list")
@@ -111,19 +246,21 @@ class Config:
         else:
             filtered_list = None
 
-        status, resources = self.do_list()
-        if status == Status.FAILED:
-            #logger.error(resources)
-            return status, resources
+        # one listing at a time, the resource map is updated in place
+        with self.lock:
+            status, resources = self.do_list()
+            if status == Status.FAILED:
+                #logger.error(resources)
+                return status, resources
 
-        # Delegate to the child class to select the attributes for the given resource to be included in the resource map
-        # Once this is more mature we can have the child class to identify the list of tags to extract from the response structure
-        # i.e. once we have implemented and observed similarity with the extraction logic
-        self.dirty = False
-        ret = resources
+            # Delegate to the child class to select the attributes for the given resource to be included in the resource map
+            # Once this is more mature we can have the child class to identify the list of tags to extract from the response structure
+            # i.e. once we have implemented and observed similarity with the extraction logic
+            self.dirty = False
+            ret = resources
 
-        if filtered_list is not None:
-            ret = [item for item in resources if item in filtered_list]
+            if filtered_list is not None:
+                ret = [item for item in resources if item in filtered_list]
 
         # return the internal resource map 
         return status, ret
@@ -150,17 +287,12 @@ class Config:
         if self.configMap is None:
             warnMsg = "No input resource definition"
             logger.warning(warnMsg)
-            return Status.No_OP, warnMsg
+            return Status.NO_OP, warnMsg
         
         # Refresh the internal map if dirty
-        if self.dirty:
-            status, result = self.list()
-            # handle error here, since self.configMap is not in sync w/ backend
-            if status == Status.FAILED:
-                resultMap = {}
-                resultMap['ErrorKey'] = "*"
-                resultMap['ErrorMessage'] = "Failure in refreshing resource list"
-                return status, resultMap
+        status, resultMap = self.refresh()
+        if status == Status.FAILED:
+            return status, resultMap
 
         overall_status = Status.NO_OP
         successKeys = []
@@ -170,53 +302,88 @@ class Config:
     
         # Iterate through the configMap and call do_action for each item in the configMap
         for key, config in self.configMap.items():
-
-            proceed = key in self.resourceMap.keys()
-            if action==Action.CREATE:
-                proceed = not proceed  # create only if the key doesn't exist in the resource map
-            elif action==Action.DELETE:
-                pass
-            else:
-                errorMsg = f"Unknown action {action}"
-                logger.error(errorMsg)
+            status, result = self.actionKey(action, do_action, key, config)
+            if status == Status.FAILED:
                 overall_status = Status.FAILED
                 resultMap["ErrorKey"] = key
-                resultMap["ErrorMessage"] = errorMsg
-                return overall_status, resultMap
-
-            if proceed:
-                status, result = do_action(self.botoClient, key, config)
-                if status == Status.FAILED:
-                    logger.error(f"Failed to {action.value} resource {key} with message {result}")
-                    overall_status = Status.FAILED
-                    resultMap["ErrorKey"] = key
-                    resultMap["ErrorMessage"] = result
-                    break
-                elif status == Status.SUCCESS:
-                    logger.info(f"Successfully {action.value}d resource {key}")
-                    successKeys.append(key)
-                    successResponses.append(result)
-                    self.dirty = True  # set dirty to true to refresh the resource map on the next op
-                else:
-                    logger.error(f"Unknown status for resource {key} with message {result}")
-                    overall_status = Status.FAILED
-                    resultMap["ErrorKey"] = key
-                    resultMap["ErrorMessage"] = result
-                    break
-            else:  # key already exists in the resource map
-                logger.info(f"No-op for resource {key}")
+                resultMap["ErrorMessage"] = result
+                break
+            elif status == Status.SUCCESS:
+                overall_status = Status.SUCCESS
+                successKeys.append(key)
+                successResponses.append(result)
+            else:  # key already in the expected state
                 noopKeys.append(key)
             
         if overall_status == Status.SUCCESS or overall_status == Status.NO_OP:
-            logger.info(f"executed {action.value} resources for {successKeys}")
+            if summaryMode():
+                # one line per action instead of the full key lists
+                logger.info("%s", fields(action=action.value, service=type(self).__name__, success=len(successKeys), noop=len(noopKeys)))
+            else:
+                logger.info("executed %s resources for %s", action.value, successKeys)
             resultMap["SuccessKeys"] = successKeys
             resultMap["SuccessResponses"] = successResponses
             resultMap["NoopKeys"] = noopKeys
 
         return overall_status, resultMap
+
+    def refresh(self):
+        """
+        Refresh the internal resource map if dirty, required before acting on individual keys
+
+        :return: Status.SUCCESS, or Status.FAILED with the error result map
+        """
+        with self.lock:
+            if self.dirty:
+                status, result = self.list()
+                # handle error here, since self.configMap is not in sync w/ backend
+                if status == Status.FAILED:
+                    resultMap = {}
+                    resultMap['ErrorKey'] = "*"
+                    resultMap['ErrorMessage'] = "Failure in refreshing resource list"
+                    return status, resultMap
+        return Status.SUCCESS, {}
+
+    def actionKey(self, action, do_action, key, config):
+        """
+        Action on a single resource of the configMap, w/o refreshing the resource map (see refresh())
+        Keys can be processed concurrently by the Project scheduler
+
+        :return: Status.SUCCESS with the response, Status.NO_OP if the resource is already in the expected state,
+                 or Status.FAILED with the error
+        """
+        exists = key in self.resourceMap.keys()
+        if action == Action.CREATE:
+            proceed = not exists  # create only if the key doesn't exist in the resource map
+        elif action == Action.DELETE:
+            proceed = exists
+        else:
+            errorMsg = f"Unknown action {action}"
+            logger.error(errorMsg)
+            return Status.FAILED, errorMsg
+
+        if not proceed:
+            logger.info("No-op for resource %s", key)
+            return Status.NO_OP, None
+
+        status, result = do_action(self.botoClient, key, config)
+        if status == Status.FAILED:
+            logger.error("Failed to %s resource %s with message %s", action.value, key, compact(result))
+        elif status == Status.SUCCESS:
+            logger.info("Successfully %sd resource %s", action.value, key)
+            self.dirty = True  # set dirty to true to refresh the resource map on the next op
+            if action == Action.CREATE and self.responseArn(result) is not None:
+                # known right away for the dependent resources, w/o waiting for the next listing
+                self.addResource(key, {'Arn': self.responseArn(result)})
+            elif action == Action.DELETE and self.resolver is not None:
+                self.resolver.forget(type(self), key)
+        else:
+            logger.error("Unknown status for resource %s with message %s", key, compact(result))
+            status = Status.FAILED
+        return status, result
         
     def do_create(self, client, key, config):
-        logger.info(f"Calling Config.do_create with {key}, {config}")
+        logger.info("Calling Config.do_create with %s, %s", key, compact(config))
         warnMsg = "Config.do_create not implemented for the base class"
         logger.warning(warnMsg)
         status = Status.FAILED
@@ -231,7 +398,7 @@ class Config:
 
     
     def do_delete(self, botoClient, key, config):
-        logger.info(f"Calling Config.do_delete with {key}, {config}")
+        logger.info("Calling Config.do_delete with %s, %s", key, compact(config))
         warnMsg = "Config.do_delete not implemented for the base class"
         logger.warning(warnMsg)
         status = Status.FAILED
@@ -246,7 +413,7 @@ class Config:
 
 
 def unitTest():
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    StructLog.configure(level=logging.INFO, fmt='%(asctime)s %(levelname)s %(message)s')
 
     std_definition = {
         "key1" : {
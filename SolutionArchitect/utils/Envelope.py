@@ -0,0 +1,310 @@
+#
+# Envelope.py
+#
+# Envelope encryption with KMS data keys & local AES-GCM, in the spirit of the AWS Encryption SDK
+# https://docs.aws.amazon.com/kms/latest/developerguide/concepts.html#enveloping
+#
+# Instead of sending every plaintext to kms.encrypt (one round trip per message, 4 KB max, KMS request quota),
+# a data key from kms.generate_data_key encrypts the messages locally. The data keys are cached on both sides and
+# re-used within limits (max age, max messages, max bytes), so a million small records cost a handful of KMS calls.
+#
+# Message format:
+#   magic (4) | length of the encrypted data key (2) | encrypted data key | nonce (12) | AES-GCM ciphertext & tag
+# The header (magic & encrypted data key) and the encryption context are authenticated as AES-GCM associated data.
+#
+# Streams (files of any size) are encrypted in frames under a single data key, with a constant memory footprint:
+#   magic "SAF1" (4) | length of the encrypted data key (2) | encrypted data key | frame size (4) | base nonce (12)
+#   frames: final flag (1) | length (4) | AES-GCM ciphertext & tag of at most frame size bytes
+# The nonce of a frame is the base nonce + its sequence number, the associated data carries the header, the context,
+# the sequence number & the final flag, so reordered, dropped or truncated frames fail authentication. Data after the
+# final frame is rejected.
+#
+# Requires the cryptography package (pip install cryptography), imported by Kms on first use of the envelope mode.
+#
+
+import os
+import json
+import time
+import struct
+import threading
+import contextlib
+from collections import OrderedDict
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"SAE1"
+STREAM_MAGIC = b"SAF1"
+NONCE_SIZE = 12
+TAG_SIZE = 16
+DEFAULT_FRAME_SIZE = 64 * 1024
+
+# defaults of the data key cache, the message limit stays well below the 2^32 random nonces per key of AES-GCM
+DEFAULT_MAX_AGE = 300            # seconds
+DEFAULT_MAX_MESSAGES = 2 ** 20
+DEFAULT_MAX_BYTES = 2 ** 32
+DEFAULT_CAPACITY = 64            # data keys per cache
+
+
+class EnvelopeError(ValueError):
+    pass
+
+
+class DataKeyCache:
+    def __init__(self, maxAge=DEFAULT_MAX_AGE, maxMessages=DEFAULT_MAX_MESSAGES, maxBytes=DEFAULT_MAX_BYTES,
+                 capacity=DEFAULT_CAPACITY):
+        """
+        :param maxAge: Seconds a data key is used after it was obtained from KMS
+        :param maxMessages: Messages processed with a data key before it is retired
+        :param maxBytes: Bytes processed with a data key before it is retired
+        :param capacity: Data keys kept, the least recently used are evicted
+        """
+        self.maxAge = maxAge
+        self.maxMessages = maxMessages
+        self.maxBytes = maxBytes
+        self.capacity = capacity
+        self.entries = OrderedDict()   # cache key -> {"Key", "EncryptedKey", "Created", "Messages", "Bytes"}
+        self.lock = threading.Lock()
+
+    def acquire(self, cacheKey, size):
+        """
+        Entry of the cache key if it can process one more message of the given size, the usage is accounted
+
+        :return: The entry, or None if absent or retired
+        """
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is None:
+                return None
+            if (time.monotonic() - entry["Created"] > self.maxAge or entry["Messages"] + 1 > self.maxMessages
+                    or entry["Bytes"] + size > self.maxBytes):
+                del self.entries[cacheKey]
+                return None
+            entry["Messages"] += 1
+            entry["Bytes"] += size
+            self.entries.move_to_end(cacheKey)
+            return entry
+
+    def put(self, cacheKey, key, encryptedKey, size):
+        with self.lock:
+            self.entries[cacheKey] = {"Key": key, "EncryptedKey": encryptedKey, "Created": time.monotonic(),
+                                      "Messages": 1, "Bytes": size}
+            self.entries.move_to_end(cacheKey)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _canonicalContext(context):
+    return json.dumps(context or {}, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _header(encryptedKey):
+    return MAGIC + struct.pack(">H", len(encryptedKey)) + encryptedKey
+
+
+def parseHeader(message):
+    """
+    Split a message into (header, encrypted data key, body) where body is nonce & ciphertext
+    """
+    if len(message) < 6 or message[:4] != MAGIC:
+        raise EnvelopeError("Not an envelope encrypted message")
+    (length,) = struct.unpack(">H", message[4:6])
+    if len(message) < 6 + length + NONCE_SIZE:
+        raise EnvelopeError("Truncated envelope encrypted message")
+    return message[:6 + length], message[6:6 + length], message[6 + length:]
+
+
+def _frameNonce(baseNonce, sequence):
+    counter = (int.from_bytes(baseNonce[4:], "big") + sequence) % (1 << 64)
+    return baseNonce[:4] + counter.to_bytes(8, "big")
+
+
+def _frameAad(header, context, sequence, final):
+    return header + context + struct.pack(">QB", sequence, final)
+
+
+def _readExactly(f, size):
+    data = f.read(size)
+    while data is not None and 0 < len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data or b""
+
+
+@contextlib.contextmanager
+def _openSource(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        yield source
+
+
+# a path destination is written to a temporary file, renamed once the whole stream is processed
+@contextlib.contextmanager
+def _openDestination(destination):
+    if not isinstance(destination, (str, os.PathLike)):
+        yield destination
+        return
+    tmpPath = f"{destination}.{os.getpid()}.tmp"
+    try:
+        with open(tmpPath, "wb") as f:
+            yield f
+        os.replace(tmpPath, destination)
+    finally:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+
+class Envelope:
+    def __init__(self, kmsClient, maxAge=DEFAULT_MAX_AGE, maxMessages=DEFAULT_MAX_MESSAGES,
+                 maxBytes=DEFAULT_MAX_BYTES, capacity=DEFAULT_CAPACITY):
+        """
+        :param kmsClient: boto3 KMS client
+        :param maxAge, maxMessages, maxBytes, capacity: Limits of the data key caches - see DataKeyCache
+        """
+        self.kmsClient = kmsClient
+        self.encryptCache = DataKeyCache(maxAge, maxMessages, maxBytes, capacity)
+        self.decryptCache = DataKeyCache(maxAge, maxMessages, maxBytes, capacity)
+
+    # data key of the encrypting side: (plaintext key, encrypted key)
+    def dataKey(self, keyId, context, size):
+        cacheKey = (keyId, _canonicalContext(context))
+        entry = self.encryptCache.acquire(cacheKey, size)
+        if entry is not None:
+            return entry["Key"], entry["EncryptedKey"]
+        response = self.kmsClient.generate_data_key(KeyId=keyId, KeySpec="AES_256", EncryptionContext=context or {})
+        self.encryptCache.put(cacheKey, response["Plaintext"], response["CiphertextBlob"], size)
+        return response["Plaintext"], response["CiphertextBlob"]
+
+    # plaintext data key of the decrypting side
+    def plainKey(self, encryptedKey, context, size):
+        cacheKey = (encryptedKey, _canonicalContext(context))
+        entry = self.decryptCache.acquire(cacheKey, size)
+        if entry is not None:
+            return entry["Key"]
+        # the key id is embedded in the encrypted data key of a symmetric KMS key
+        key = self.kmsClient.decrypt(CiphertextBlob=encryptedKey, EncryptionContext=context or {})["Plaintext"]
+        self.decryptCache.put(cacheKey, key, encryptedKey, size)
+        return key
+
+    def encrypt(self, keyId, plainText, context=None):
+        """
+        :param keyId: ARN (preferred, resolved once by the caller), id or alias of the KMS key
+        :param plainText: bytes or str, no size limit
+        :param context: Encryption context, a dictionary of str, required again to decrypt
+        :return: The message as bytes
+        """
+        if isinstance(plainText, str):
+            plainText = plainText.encode()
+        key, encryptedKey = self.dataKey(keyId, context, len(plainText))
+        header = _header(encryptedKey)
+        nonce = os.urandom(NONCE_SIZE)
+        return header + nonce + AESGCM(key).encrypt(nonce, plainText, header + _canonicalContext(context))
+
+    def decrypt(self, message, context=None):
+        """
+        :param message: Message of encrypt()
+        :param context: Encryption context given to encrypt()
+        :return: The plaintext as bytes
+        :raises EnvelopeError: if the message is malformed or fails authentication
+        """
+        header, encryptedKey, body = parseHeader(message)
+        key = self.plainKey(encryptedKey, context, len(body) - NONCE_SIZE)
+        try:
+            return AESGCM(key).decrypt(body[:NONCE_SIZE], body[NONCE_SIZE:], header + _canonicalContext(context))
+        except InvalidTag:
+            raise EnvelopeError("Envelope encrypted message failed authentication")
+
+    def encryptStream(self, keyId, source, destination, context=None, frameSize=DEFAULT_FRAME_SIZE):
+        """
+        Encrypt a stream in frames under a new data key (not cached, one per stream)
+
+        :param source: Path or binary file-like object, read frame by frame
+        :param destination: Path or binary file-like object
+        :param context: Encryption context, required again to decrypt
+        :param frameSize: Plaintext bytes per frame
+        :return: Number of plaintext bytes encrypted
+        """
+        response = self.kmsClient.generate_data_key(KeyId=keyId, KeySpec="AES_256", EncryptionContext=context or {})
+        aesgcm = AESGCM(response["Plaintext"])
+        baseNonce = os.urandom(NONCE_SIZE)
+        header = (STREAM_MAGIC + struct.pack(">H", len(response["CiphertextBlob"])) + response["CiphertextBlob"]
+                  + struct.pack(">I", frameSize) + baseNonce)
+        canonical = _canonicalContext(context)
+        total = 0
+        with _openSource(source) as src, _openDestination(destination) as dst:
+            dst.write(header)
+            frame = _readExactly(src, frameSize)
+            sequence = 0
+            while True:
+                # read ahead one frame to flag the last one
+                following = _readExactly(src, frameSize) if len(frame) == frameSize else b""
+                final = 0 if following else 1
+                cipherText = aesgcm.encrypt(_frameNonce(baseNonce, sequence), frame,
+                                            _frameAad(header, canonical, sequence, final))
+                dst.write(struct.pack(">BI", final, len(cipherText)) + cipherText)
+                total += len(frame)
+                if final:
+                    return total
+                frame = following
+                sequence += 1
+
+    def decryptStream(self, source, destination, context=None):
+        """
+        Decrypt a stream of encryptStream(), a frame is written once authenticated
+
+        A path destination is only created if the whole stream is valid, a file-like destination may have received
+        the frames preceding an invalid one and must be discarded on error.
+
+        :return: Number of plaintext bytes decrypted
+        :raises EnvelopeError: if the stream is malformed, truncated, followed by extra data or fails authentication
+        """
+        with _openSource(source) as src, _openDestination(destination) as dst:
+            prefix = _readExactly(src, 6)
+            if len(prefix) < 6 or prefix[:4] != STREAM_MAGIC:
+                raise EnvelopeError("Not an envelope encrypted stream")
+            (length,) = struct.unpack(">H", prefix[4:6])
+            rest = _readExactly(src, length + 4 + NONCE_SIZE)
+            if len(rest) < length + 4 + NONCE_SIZE:
+                raise EnvelopeError("Truncated envelope encrypted stream")
+            header = prefix + rest
+            encryptedKey = rest[:length]
+            (frameSize,) = struct.unpack(">I", rest[length:length + 4])
+            baseNonce = rest[length + 4:]
+            aesgcm = AESGCM(self.plainKey(encryptedKey, context, 0))
+            canonical = _canonicalContext(context)
+            total = 0
+            sequence = 0
+            while True:
+                frameHeader = _readExactly(src, 5)
+                if len(frameHeader) < 5:
+                    raise EnvelopeError("Truncated envelope encrypted stream")
+                final, size = struct.unpack(">BI", frameHeader)
+                if size > frameSize + TAG_SIZE:
+                    raise EnvelopeError("Invalid frame size in envelope encrypted stream")
+                cipherText = _readExactly(src, size)
+                if len(cipherText) < size:
+                    raise EnvelopeError("Truncated envelope encrypted stream")
+                try:
+                    plainText = aesgcm.decrypt(_frameNonce(baseNonce, sequence), cipherText,
+                                               _frameAad(header, canonical, sequence, final))
+                except InvalidTag:
+                    raise EnvelopeError(f"Frame {sequence} of the envelope encrypted stream failed authentication")
+                dst.write(plainText)
+                total += len(plainText)
+                if final:
+                    # nothing may follow the final frame, e.g. the frames of another stream appended to this one
+                    if src.read(1):
+                        raise EnvelopeError("Unexpected data after the final frame of the envelope encrypted stream")
+                    return total
+                sequence += 1
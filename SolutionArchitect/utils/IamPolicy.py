@@ -29,15 +29,23 @@ import boto3
 from botocore.exceptions import ClientError
 
 from Config import Config, Status
+import StructLog
+from StructLog import compact
 
 # TODO: look into logger configurations & identify log locations
 logger = logging.getLogger(__name__)
 
 class IamPolicy(Config):
+    arnType = "iam:policy"
 
     def __init__(self, inputMap=None, session=None):
         super().__init__("iam", inputMap=inputMap, session=session)
 
+    # Only the policies defined in the configMap are known to be customer managed under the default path,
+    # AWS managed policies (e.g. AdministratorAccess) live under the "aws" account and require a lookup
+    def canSynthesizeArn(self, name):
+        return self.configMap is not None and name in self.configMap
+
     # List all the IAM policies defined with the account
     def do_list(self):
         try:
@@ -57,13 +65,16 @@ class IamPolicy(Config):
         
     def do_create(self, client, key, keyConfig):
         try:
-            logger.info(f"do_create polices: {key}, {keyConfig}")
+            logger.info("do_create polices: %s, %s", key, compact(keyConfig))
+            # the definition is the policy document, only the project marker tags apply
+            tags = self.resourceTags(key)
             response = client.create_policy(
                 PolicyName=key,
-                PolicyDocument=Config.convertJson(keyConfig)
+                PolicyDocument=Config.convertJson(keyConfig),
+                **({"Tags": tags} if tags else {})
             )
             # log the policy ARN
-            logger.info(f"Created policy {key} with ARN {response['Policy']['Arn']}")
+            logger.info("Created policy %s with ARN %s", key, response['Policy']['Arn'])
             return Status.SUCCESS, response
         except ClientError as e:
             logger.error(e)
@@ -78,7 +89,7 @@ class IamPolicy(Config):
                 return Config.Status.FAILED, errorMsg
 
             response = client.delete_policy(PolicyArn=key_arn)
-            logger.info(f"Deleted policy {key} with ARN {key_arn}")
+            logger.info("Deleted policy %s with ARN %s", key, key_arn)
             return Status.SUCCESS, response
         except client.exceptions.DeleteConflictException as dce:
             errorMsg = f"Policy {key} is in use and cannot be deleted : {dce}"
@@ -93,7 +104,7 @@ class IamPolicy(Config):
             return Status.FAILED, e
         
 def unitTest():
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    StructLog.configure(level=logging.INFO, fmt='%(asctime)s %(levelname)s %(message)s')
 
     policy_definition = {
         "Common-UnitTest-IamPolicy-001" : {
@@ -8,22 +8,36 @@
 #  
 
 import sys
-import json
 
 import logging
 import boto3
 from botocore.exceptions import ClientError
 from Config import Config, Status
 from IamPolicy import IamPolicy
+import StructLog
+from StructLog import compact
+import Arn
+import ClientHooks
+import Retry
 
 # TODO: look into logger configurations & identify log locations
 logger = logging.getLogger(__name__)
 
 class IamRole(Config):
+    arnType = "iam:role"
 
     def __init__(self, inputMap=None, session=None):
         super().__init__("iam", inputMap=inputMap, session=session)
 
+    # Only the roles defined in the configMap are known to be created under the default path, other roles may not
+    # exist or live under a path (e.g. service-role/, aws-service-role/) and require a lookup
+    def canSynthesizeArn(self, name):
+        return self.configMap is not None and name in self.configMap
+
+    # the role depends on the user defined policies attached to it
+    def getDependencies(self, key, config):
+        return super().getDependencies(key, config) + [(IamPolicy, name) for name in config.get("UserPolicies", [])]
+
     def do_list(self):
         try:
             response = self.botoClient.list_roles()
@@ -47,12 +61,13 @@ class IamRole(Config):
         
     def do_create(self, client, key, keyConfig):
         try:
-            accountId = self.accountId()
-            logger.info(f"do_create role: {key}, {keyConfig}")
+            accountId = self.getAccountId()
+            logger.info("do_create role: %s, %s", key, compact(keyConfig))
 
+            tags = self.resourceTags(key, keyConfig.get("Tags"))
             response = client.create_role(
                 RoleName=key,
-                AssumeRolePolicyDocument=json.dumps({
+                AssumeRolePolicyDocument=Config.convertJson({
                     "Version": "2012-10-17",
                     "Statement": [
                         {
@@ -63,29 +78,51 @@ class IamRole(Config):
                             "Action": "sts:AssumeRole"
                         }
                     ]
-                })
+                }),
+                **({"Tags": tags} if tags else {})
             )
             for policy_name in keyConfig["UserPolicies"]:
-                print(f"Attaching policy {policy_name} to role {key}...")
+                logger.info("Attaching policy %s to role %s...", policy_name, key)
                 client.attach_role_policy(
                     RoleName=key,
-                    # It would have been nice to get Arn from IamPolicy, but there isn't a link to IamPolicy at this time
-                    PolicyArn=f"arn:aws:iam::{accountId}:policy/{policy_name}" #iamPolicy.getArn(policy_name)
+                    # policies of the project are resolved already, user defined policies are created under the
+                    # default path so the Arn is synthesized w/o lookup otherwise
+                    PolicyArn=self.lookupArn(IamPolicy, policy_name) or Arn.iamPolicy(accountId, policy_name)
             )
                 
-            # If there is a way to get Arn directly from IamPolicy, then we
-            # can handle both UserPolicies & AWSPolices in one-go and don't
-            # need to differentiate them
+            # AWS managed policies are owned by the "aws" account instead of the running account
             for policy_name in keyConfig["AWSPolicies"]:
-                print(f"Attaching arn {policy_name} to role {key}...")
+                logger.info("Attaching arn %s to role %s...", policy_name, key)
                 client.attach_role_policy(
                     RoleName=key,
-                    PolicyArn=f"arn:aws:iam::aws:policy/{policy_name}"
+                    PolicyArn=Arn.awsManagedPolicy(policy_name)
                 )    
+
+            # optionally hold the create until the role can be assumed, for dependent steps in the same run
+            if keyConfig.get("WaitForPropagation", False) and keyConfig["PrincipalType"] == "AWS":
+                if self.waitUntilAssumable(key) is None:
+                    return Status.FAILED, f"Role {key} did not become assumable"
             return Status.SUCCESS, response
         except ClientError as e:
             logger.error(e)
             return Status.FAILED, e
+
+    # Wait for a newly created role to be usable, by probing with a short lived sts.assume_role
+    # (the probe only works for roles trusting an AWS principal, service roles such as lambda.amazonaws.com
+    # are probed by the dependent call itself - see Retry.untilPropagated)
+    def waitUntilAssumable(self, key, sessionName="PropagationProbe", timeout=60):
+        sts = boto3.client('sts') if self.session is None else self.session.client('sts')
+        ClientHooks.attach(sts)
+        roleArn = self.getArn(key)
+        try:
+            return Retry.untilPropagated(
+                lambda: sts.assume_role(RoleArn=roleArn, RoleSessionName=sessionName, DurationSeconds=900),
+                timeout=timeout,
+                description=f"assume role {key}",
+                retryable=Retry.newRolePropagation)
+        except ClientError as e:
+            logger.error(e)
+            return None
         
     # do_delete
     def do_delete(self, client, key, keyConfig):
@@ -93,9 +130,9 @@ class IamRole(Config):
             # role name (key) existence check has already been validated in base Config class
             role_policies = client.list_attached_role_policies(RoleName=key)["AttachedPolicies"]
             for policy in role_policies:
-                print(f"Detaching policy {policy['PolicyName']} from role {key}...")
+                logger.info("Detaching policy %s from role %s...", policy['PolicyName'], key)
                 client.detach_role_policy(RoleName=key, PolicyArn=policy["PolicyArn"])   
-            print(f"Deleting role {key}...")
+            logger.info("Deleting role %s...", key)
             response = client.delete_role(RoleName=key)
             return Status.SUCCESS, response
         except client.exceptions.NoSuchEntityException:
@@ -109,7 +146,7 @@ class IamRole(Config):
 
 
 def unitTest():
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    StructLog.configure(level=logging.INFO, fmt='%(asctime)s %(levelname)s %(message)s')
 
     # Test IAM Policy along with IAM Role
     policy_definition = {
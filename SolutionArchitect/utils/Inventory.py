@@ -0,0 +1,109 @@
+#
+# Inventory.py
+#
+# Aggregated result of Project.list: the resources of every config with the status & time of its listing
+#
+# Rendered as a table (pandas) or as JSON, with one row per service and one row per resource
+#
+
+import json
+import pandas as pd
+
+from Config import Status
+
+
+class Inventory:
+    def __init__(self):
+        self.services = {}   # (target, service) -> {"Status", "Seconds", "Resources": {name: attributes}, "Error"}
+
+    def add(self, service, status, seconds, resources=None, error=None, target=None):
+        """
+        :param service: Config class name, e.g. "Kms"
+        :param status: Status of the listing
+        :param seconds: Wall time of the listing
+        :param resources: dictionary of name -> resource attributes
+        :param error: Error of a failed listing
+        :param target: Target of a multi-account/region project, None otherwise
+        """
+        self.services[(target, service)] = {
+            "Status": status,
+            "Seconds": seconds,
+            "Resources": resources or {},
+            "Error": error,
+        }
+
+    @property
+    def status(self):
+        if any(entry["Status"] == Status.FAILED for entry in self.services.values()):
+            return Status.FAILED
+        return Status.SUCCESS
+
+    def resources(self, service, target=None):
+        return self.services[(target, service)]["Resources"]
+
+    # the per target inventories of a multi-account/region project as one inventory
+    @staticmethod
+    def merge(inventories):
+        merged = Inventory()
+        for target, inventory in inventories.items():
+            if not isinstance(inventory, Inventory):
+                # the listing of the target failed as a whole
+                merged.add("*", Status.FAILED, 0, error=inventory, target=target)
+                continue
+            for (_, service), entry in inventory.services.items():
+                merged.services[(target, service)] = entry
+        return merged
+
+    def _hasTargets(self):
+        return any(target is not None for target, _ in self.services)
+
+    def summary(self):
+        """
+        DataFrame with one row per service: Status, Seconds, number of Resources & Error
+        """
+        rows = []
+        for (target, service), entry in self.services.items():
+            row = {"Target": target} if self._hasTargets() else {}
+            row.update({"Service": service, "Status": entry["Status"].name, "Seconds": round(entry["Seconds"], 3),
+                        "Resources": len(entry["Resources"]), "Error": "" if entry["Error"] is None else str(entry["Error"])})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def toDataFrame(self):
+        """
+        DataFrame with one row per resource: Service, Name, Arn & the other attributes of the resource map
+        """
+        rows = []
+        for (target, service), entry in self.services.items():
+            for name, attributes in entry["Resources"].items():
+                row = {"Target": target} if self._hasTargets() else {}
+                row.update({"Service": service, "Name": name})
+                row.update(attributes)
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def table(self):
+        resources = self.toDataFrame()
+        text = self.summary().to_string(index=False)
+        if not resources.empty:
+            text += "\n\n" + resources.fillna("").to_string(index=False)
+        return text
+
+    def toDict(self):
+        result = {}
+        for (target, service), entry in self.services.items():
+            services = result.setdefault(target, {}) if self._hasTargets() else result
+            services[service] = {
+                "Status": entry["Status"].name,
+                "Seconds": entry["Seconds"],
+                "Resources": entry["Resources"],
+                "Error": None if entry["Error"] is None else str(entry["Error"]),
+            }
+        return result
+
+    def toJson(self, indent=2):
+        return json.dumps(self.toDict(), indent=indent, default=str)
+
+    def __repr__(self):
+        counts = ", ".join(f"{service}: {len(entry['Resources'])}" for (_, service), entry in self.services.items())
+        return f"Inventory({counts})"
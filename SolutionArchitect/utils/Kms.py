@@ -7,68 +7,226 @@
 # Define the encryption keys and the options assoicated with each key 
 # 
 
+import os
 import sys
 import json
+import time
 import logging
 import boto3
 from botocore.exceptions import ClientError
 
 from Config import Config, Status
+import Arn
+import ClientHooks
+import Retry
+import StructLog
+from RateLimiter import sharedLimiter
+from Scheduler import orderedMap, DEFAULT_WORKERS
+from StructLog import compact
 
 # TODO: look into logger configurations & identify log locations
 logger = logging.getLogger(__name__)
 
+KEY_METADATA_TTL = 300   # seconds the describe_key metadata of a key is trusted
+# key states rejected locally, without a cryptographic call bound to fail
+UNUSABLE_KEY_STATES = {"Disabled", "PendingDeletion", "PendingReplicaDeletion", "Unavailable", "PendingImport"}
+# errors of a cryptographic call meaning the cached metadata is stale
+KEY_STATE_ERRORS = {"DisabledException", "KMSInvalidStateException", "NotFoundException"}
+
 class Kms(Config):
+    # The key ARN contains the opaque key id and can only be resolved by lookup (arnType stays None),
+    # the alias ARN however is a pure function of the alias name - see getAliasArn()
     def __init__(self, inputMap=None, session=None):
         super().__init__("kms", inputMap=inputMap, session=session)
+        self.envelopes = {}   # region -> envelope encryption of the regional client, see getEnvelope()
+        self.envelopeLimits = {}   # data key cache limits of the envelopes
+        # key ARN -> (KeyMetadata, time fetched), kept across the re-listings of the resource map
+        self.keyMetadata = {}
+        self.metadataTtl = KEY_METADATA_TTL
+        self.publicKeys = {}   # key ARN -> PublicKey of the asymmetric keys, see getPublicKey()
+        self.regionalClients = {}   # region -> client, for the replicas of the multi-region keys
+        self.routingRegion = None   # region the crypto calls are routed to, see localRegion()
+
+    # Alias ARN can be used in place of the key ARN for the cryptographic operations
+    def getAliasArn(self, name):
+        return Arn.kmsAlias(self.getAccountId(), self.getRegion(), name)
+
+    # Keys found by the tag based discovery, the key id is the last part of the key ARN
+    def addTaggedResource(self, name, arn):
+        self.addResource(name, {'Arn': arn, 'KeyId': Arn.parse(arn)['Name']})
 
     # List all the keys defined in KMS
+    # All the aliases are fetched in one paginated sweep and joined to the keys in memory, instead of a
+    # list_aliases call per key (N+1 round trips & KMS throttling in accounts with many keys)
     def do_list(self):
         try:
-            response = self.botoClient.list_keys()
-            for key in response['Keys']:
-                #print(key['KeyId'])
-                aliasResponse = self.botoClient.list_aliases(KeyId=key['KeyId'])
-                #print(aliasResponse)
-                aliases = aliasResponse['Aliases']
-                if len(aliases) == 0:
-                    #print("No aliases defined for this key")
-                    attribute = {'Arn': key['KeyArn'],
-                                 'KeyId': key['KeyId'],}
-                    self.addResource(key['KeyId'], attribute)
-                    continue
-                for alias in aliases:
-                    #print(alias)
-                    attribute = {'Arn': key['KeyArn'],
-                                 'KeyId': alias['TargetKeyId'],
-                                 'AliasName': alias['AliasName'],
-                                 'AliasArn': alias['AliasArn'],
-                                }
-                    aliasName = alias['AliasName']
-                    # remove 'alias/' prefix from aliasName
-                    if aliasName.startswith('alias/'):
-                        aliasName = aliasName[len('alias/'):]
-                    self.addResource(aliasName, attribute)
+            aliases = {}   # key id -> aliases of the key
+            for page in self.botoClient.get_paginator('list_aliases').paginate():
+                for alias in page['Aliases']:
+                    # aliases w/o target, e.g. AWS managed aliases of keys not created yet
+                    if 'TargetKeyId' in alias:
+                        aliases.setdefault(alias['TargetKeyId'], []).append(alias)
+
+            for page in self.botoClient.get_paginator('list_keys').paginate():
+                for key in page['Keys']:
+                    keyAliases = aliases.get(key['KeyId'], [])
+                    if len(keyAliases) == 0:
+                        attribute = {'Arn': key['KeyArn'],
+                                     'KeyId': key['KeyId'],}
+                        self.addResource(key['KeyId'], attribute)
+                        continue
+                    for alias in keyAliases:
+                        attribute = {'Arn': key['KeyArn'],
+                                     'KeyId': alias['TargetKeyId'],
+                                     'AliasName': alias['AliasName'],
+                                     'AliasArn': alias['AliasArn'],
+                                    }
+                        aliasName = alias['AliasName']
+                        # remove 'alias/' prefix from aliasName
+                        if aliasName.startswith('alias/'):
+                            aliasName = aliasName[len('alias/'):]
+                        self.addResource(aliasName, attribute)
             return Status.SUCCESS, self.resourceMap
         except ClientError as e:
             logger.error(e)
             return Status.FAILED, e
-        
+
+    def getKeyMetadata(self, name):
+        """
+        KeyMetadata of describe_key (KeySpec, KeyUsage, KeyState, MultiRegion...), fetched on first use only for
+        the keys the caller cares about (the listing doesn't describe every key of the account) & cached for the TTL
+        """
+        keyArn = self.getArn(name)
+        if keyArn is None:
+            raise KeyError(f"Key {name} not found")
+        with self.lock:
+            cached = self.keyMetadata.get(keyArn)
+            if cached is not None and time.monotonic() - cached[1] < self.metadataTtl:
+                return cached[0]
+        metadata = self.botoClient.describe_key(KeyId=keyArn)['KeyMetadata']
+        self.cacheKeyMetadata(keyArn, metadata)
+        return metadata
+
+    def cacheKeyMetadata(self, keyArn, metadata):
+        with self.lock:
+            self.keyMetadata[keyArn] = (metadata, time.monotonic())
+
+    def invalidateKeyMetadata(self, keyArn):
+        with self.lock:
+            self.keyMetadata.pop(keyArn, None)
+
+    def resolveKey(self, name):
+        """
+        ARN of the key for a cryptographic operation, from the resource map & the metadata cache (no API call
+        within the TTL). Disabled keys & keys pending deletion are rejected locally.
+
+        :return: The key ARN, or None if the key is unknown or not usable
+        """
+        try:
+            metadata = self.getKeyMetadata(name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'AccessDeniedException':
+                logger.error("Unable to resolve key %s: %s", name, e)
+                return None
+            # least privilege roles may only be granted the cryptographic operations, not kms:DescribeKey: use the key
+            # w/o the local state check, the unknown metadata is cached so describe_key isn't denied on every call
+            logger.warning("Unable to describe key %s, its state is not checked locally: %s", name, e)
+            keyArn = self.getArn(name)
+            self.cacheKeyMetadata(keyArn, {})
+            return keyArn
+        except KeyError as e:
+            logger.error("Unable to resolve key %s: %s", name, e)
+            return None
+        if metadata.get('KeyState') in UNUSABLE_KEY_STATES or not metadata.get('Enabled', True):
+            logger.error("Key %s is not usable, state %s", name, metadata.get('KeyState'))
+            return None
+        return self.getArn(name)
+
+    # the key changed state behind the cache (e.g. disabled from the console), re-describe it on next use
+    # the replicas of a multi-region key share the key id, the key is invalidated whichever replica was called
+    def keyStateError(self, keyArn, error):
+        if isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in KEY_STATE_ERRORS:
+            keyId = keyArn.rsplit('/', 1)[-1]
+            with self.lock:
+                for arn in [arn for arn in self.keyMetadata if arn.rsplit('/', 1)[-1] == keyId]:
+                    self.invalidateKeyMetadata(arn)
+
+    # Region the crypto calls of the multi-region keys are routed to: the region the code runs in (AWS_REGION is set
+    # by Lambda & ECS), default to the region of the config
+    def localRegion(self):
+        return self.routingRegion or os.environ.get('AWS_REGION') or self.getRegion()
+
+    def regionalClient(self, region):
+        if region == self.getRegion():
+            return self.botoClient
+        with self.lock:
+            client = self.regionalClients.get(region)
+            if client is None:
+                client = boto3.client('kms', region_name=region) if self.session is None \
+                    else self.session.client('kms', region_name=region)
+                ClientHooks.attach(client)
+                self.regionalClients[region] = client
+            return client
+
+    def routeKey(self, name):
+        """
+        Client & key ARN of a cryptographic operation: the replica in the local region of a multi-region key if there
+        is one, the key itself otherwise. Resolved from the cached metadata - see resolveKey()
+
+        :return: (client, key ARN), or (None, None) if the key is unknown or not usable
+        """
+        keyArn = self.resolveKey(name)
+        if keyArn is None:
+            return None, None
+        metadata = self.getKeyMetadata(name)
+        local = self.localRegion()
+        if metadata.get('MultiRegion') and Arn.parse(keyArn)['Region'] != local:
+            configuration = metadata.get('MultiRegionConfiguration', {})
+            for replica in [configuration.get('PrimaryKey', {})] + configuration.get('ReplicaKeys', []):
+                if replica.get('Region') == local:
+                    return self.regionalClient(local), replica['Arn']
+        return self.botoClient, keyArn
+
+    # Multi-region key of the definition: "MultiRegion": true, or implied by "Replicas": ["us-west-2", ...]
+    @staticmethod
+    def isMultiRegion(keyConfig):
+        return keyConfig.get('MultiRegion', False) or len(keyConfig.get('Replicas', [])) > 0
 
     # Create a new key in KMS    
     def do_create(self, client, key, keyConfig):
         try:
-            logger.info(f"do_create kms key: {key}, {keyConfig}")
+            logger.info("do_create kms key: %s, %s", key, compact(keyConfig))
             
+            tags = self.resourceTags(key, keyConfig.get('Tags'), keyField='TagKey', valueField='TagValue')
             response = client.create_key(
-                Alias=key,
                 Description=keyConfig['Description'],
                 KeyUsage=keyConfig['KeyUsage'],
                 Origin=keyConfig['Origin'],
-                Tags=keyConfig['Tags']
+                # RSA_2048 ... / ECC_NIST_P256 ... for asymmetric keys, see getPublicKey()
+                KeySpec=keyConfig.get('KeySpec', 'SYMMETRIC_DEFAULT'),
+                Tags=tags,
+                **({'MultiRegion': True} if self.isMultiRegion(keyConfig) else {})
             )
-            # log the policy ARN
-            logger.info(f"Created Key {key} with ARN {response['KeyMetadata']['Arn']}")
+            metadata = response['KeyMetadata']
+            # create_key has no alias parameter, the key is named through its alias (see do_list)
+            client.create_alias(AliasName=f"alias/{key}", TargetKeyId=metadata['KeyId'])
+
+            # replicas of a multi-region key share the key id & material, each region has its own alias
+            for region in keyConfig.get('Replicas', []):
+                replica = client.replicate_key(KeyId=metadata['Arn'], ReplicaRegion=region,
+                                               Description=keyConfig['Description'], Tags=tags)['ReplicaKeyMetadata']
+                # the replica is "Creating" for a short while
+                Retry.retry(lambda: self.regionalClient(region).create_alias(AliasName=f"alias/{key}",
+                                                                             TargetKeyId=replica['KeyId']),
+                            Retry.isClientError("KMSInvalidStateException", "NotFoundException"),
+                            description=f"alias of the {region} replica of {key}")
+                metadata.setdefault('MultiRegionConfiguration', {}).setdefault('ReplicaKeys', []).append(
+                    {'Arn': replica['Arn'], 'Region': region})
+                logger.info("Replicated Key %s to %s", key, region)
+
+            # the create response is the metadata of the new key, no describe_key needed
+            self.cacheKeyMetadata(metadata['Arn'], metadata)
+            logger.info("Created Key %s with ARN %s", key, metadata['Arn'])
             return Status.SUCCESS, response 
         except ClientError as e:
             logger.error(e)
@@ -82,11 +240,27 @@ class Kms(Config):
                 logger.error(errorMsg)
                 return Config.Status.FAILED, errorMsg
 
+            # the primary of a multi-region key can't be deleted before its replicas (current ones, not the cache)
+            if self.isMultiRegion(keyConfig):
+                self.invalidateKeyMetadata(key_arn)
+                configuration = self.getKeyMetadata(key).get('MultiRegionConfiguration', {})
+                for replica in configuration.get('ReplicaKeys', []):
+                    self.regionalClient(replica['Region']).schedule_key_deletion(KeyId=replica['Arn'],
+                                                                                 PendingWindowInDays=7)
+                    logger.info("Deleted the %s replica of key %s", replica['Region'], key)
+
             response = client.schedule_key_deletion(
                 KeyId=key_arn,
                 PendingWindowInDays=7
             )
-            logger.info(f"Deleted key {key} with ARN {key_arn}")
+            # keep rejecting the key locally while it is pending deletion
+            with self.lock:
+                cached = self.keyMetadata.pop(key_arn, None)
+                self.publicKeys.pop(key_arn, None)
+            if cached is not None:
+                self.cacheKeyMetadata(key_arn, dict(cached[0], KeyState=response['KeyState'], Enabled=False,
+                                                    DeletionDate=response.get('DeletionDate')))
+            logger.info("Deleted key %s with ARN %s", key, key_arn)
             return Status.SUCCESS, response
         except ClientError as e:
             logger.error(e)
@@ -94,11 +268,13 @@ class Kms(Config):
 
     def encrypt(self, keyName, plainText):
         try:
-            # get the key ARN
-            key_arn = self.getArn(keyName)
+            # get the key ARN (local replica of a multi-region key), None if the key can't be used
+            client, key_arn = self.routeKey(keyName)
+            if key_arn is None:
+                return None
 
             # encrypt the plaintext with the key
-            ciphertext = self.botoClient.encrypt(
+            ciphertext = client.encrypt(
                 KeyId=key_arn,
                 Plaintext=plainText,
                 #EncryptionAlgorithm="RSAES_OAEP_SHA_1"
@@ -107,21 +283,248 @@ class Kms(Config):
             return ciphertext
         except ClientError as e:
             logger.error(e)
+            self.keyStateError(key_arn, e)
             return None
 
-    def decrypt(self, keyName, cipherText):
+    def decrypt(self, keyName, cipherText, algorithm=None):
         try:
-            # get the key ARN
-            key_arn = self.getArn(keyName)
+            # get the key ARN (local replica of a multi-region key), None if the key can't be used
+            client, key_arn = self.routeKey(keyName)
+            if key_arn is None:
+                return None
 
             # decrypt the ciphertext with the key
-            plaintext = self.botoClient.decrypt(
+            plaintext = client.decrypt(
                 KeyId=key_arn,
                 CiphertextBlob=cipherText,
-                #EncryptionAlgorithm="RSAES_OAEP_SHA_1"
+                # RSAES_OAEP_SHA_1 / RSAES_OAEP_SHA_256 for the ciphertexts of encryptPublic()
+                **({"EncryptionAlgorithm": algorithm} if algorithm else {})
             )["Plaintext"]
             # return the plaintext
             return plaintext
+        except ClientError as e:
+            logger.error(e)
+            self.keyStateError(key_arn, e)
+            return None
+
+    def getPublicKey(self, name):
+        """
+        PublicKey of an asymmetric key, fetched once with get_public_key (a public key never changes)
+
+        :return: The PublicKey, or None on error
+        """
+        keyArn = self.resolveKey(name)
+        if keyArn is None:
+            return None
+        with self.lock:
+            if keyArn in self.publicKeys:
+                return self.publicKeys[keyArn]
+        try:
+            response = self.botoClient.get_public_key(KeyId=keyArn)
+        except ClientError as e:
+            logger.error(e)
+            self.keyStateError(keyArn, e)
+            return None
+        # optional dependency (cryptography), only required for the local public key operations
+        from PublicKey import PublicKey
+        publicKey = PublicKey(response)
+        with self.lock:
+            self.publicKeys[keyArn] = publicKey
+        return publicKey
+
+    def encryptPublic(self, keyName, plainText, algorithm=None):
+        """
+        Encrypt locally with the public key of an RSA key (ENCRYPT_DECRYPT), no API call once the key is cached.
+        Decrypt with decrypt(keyName, cipherText, algorithm).
+
+        :param algorithm: RSAES_OAEP_SHA_1 or RSAES_OAEP_SHA_256, default to the first one supported by the key
+        :return: The ciphertext, or None on error
+        """
+        publicKey = self.getPublicKey(keyName)
+        if publicKey is None:
+            return None
+        try:
+            return publicKey.encrypt(plainText, algorithm)
+        except ValueError as e:
+            # e.g. a SIGN_VERIFY or ECC key, or an algorithm the key doesn't support
+            logger.error("Unable to encrypt with the public key of %s: %s", keyName, e)
+            return None
+
+    def sign(self, keyName, message, algorithm=None):
+        """
+        Sign with the private key of a SIGN_VERIFY key, in KMS
+
+        :param algorithm: Signing algorithm, default to the first one supported by the key
+        :return: The signature, or None on error
+        """
+        client, keyArn = self.routeKey(keyName)
+        if keyArn is None:
+            return None
+        try:
+            if algorithm is None:
+                algorithm = self.getKeyMetadata(keyName)['SigningAlgorithms'][0]
+            return client.sign(KeyId=keyArn, Message=message.encode() if isinstance(message, str) else message,
+                                        MessageType='RAW', SigningAlgorithm=algorithm)['Signature']
+        except (KeyError, IndexError):
+            # symmetric or ENCRYPT_DECRYPT key, or metadata unknown w/o kms:DescribeKey
+            logger.error("Key %s has no signing algorithm", keyName)
+            return None
+        except ClientError as e:
+            logger.error(e)
+            self.keyStateError(keyArn, e)
+            return None
+
+    def verify(self, keyName, message, signature, algorithm=None):
+        """
+        Verify locally with the public key of a SIGN_VERIFY key, no API call once the key is cached
+
+        :return: True if the signature is valid, False if not (or the public key is not available)
+        """
+        publicKey = self.getPublicKey(keyName)
+        if publicKey is None:
+            return False
+        try:
+            return publicKey.verify(message, signature, algorithm)
+        except ValueError as e:
+            logger.error("Unable to verify with the public key of %s: %s", keyName, e)
+            return False
+
+    # limiter of the quota the requests on the key count against: the account & region of the (routed) key. A key id
+    # or alias name (e.g. of the scripts using a bare client) counts against the caller's account in the given region
+    @staticmethod
+    def keyLimiter(keyId, region=None):
+        if keyId.startswith("arn:"):
+            arn = Arn.parse(keyId)
+            return sharedLimiter(arn['AccountId'], arn['Region'])
+        return sharedLimiter(Config.accountId(), region or Config.region())
+
+    # one cryptographic request of a bulk operation, under the rate limiter
+    def _limitedCall(self, limiter, operation, resultField, **params):
+        limiter.acquire()
+        try:
+            return operation(**params)[resultField]
+        except ClientError as e:
+            logger.error(e)
+            self.keyStateError(params['KeyId'], e)
+            return None
+
+    def encryptMany(self, keyName, plainTexts, maxWorkers=DEFAULT_WORKERS, limiter=None):
+        """
+        Encrypt a stream of values (up to 4 KB each) with concurrent requests, the key ARN is resolved once
+
+        :param plainTexts: Iterable of bytes/str, consumed lazily - e.g. the values of a column
+        :param maxWorkers: Requests in flight
+        :param limiter: RateLimiter shared with the other callers of the KMS quota, default to the one of the account &
+                        region of the key - see RateLimiter.sharedLimiter()
+        :return: Generator of the ciphertexts in the input order, None for a value that failed
+        """
+        client, keyArn = self.routeKey(keyName)
+        if keyArn is not None:
+            limiter = limiter or self.keyLimiter(keyArn)
+        def encryptOne(plainText):
+            if keyArn is None:
+                return None
+            return self._limitedCall(limiter, client.encrypt, "CiphertextBlob", KeyId=keyArn,
+                                     Plaintext=plainText.encode() if isinstance(plainText, str) else plainText)
+        return orderedMap(encryptOne, plainTexts, maxWorkers)
+
+    def decryptMany(self, keyName, cipherTexts, maxWorkers=DEFAULT_WORKERS, limiter=None):
+        """
+        Decrypt a stream of ciphertexts of encrypt()/encryptMany() - see encryptMany()
+
+        :return: Generator of the plaintexts (bytes) in the input order, None for a ciphertext that failed
+        """
+        client, keyArn = self.routeKey(keyName)
+        if keyArn is not None:
+            limiter = limiter or self.keyLimiter(keyArn)
+        def decryptOne(cipherText):
+            if keyArn is None:
+                return None
+            return self._limitedCall(limiter, client.decrypt, "Plaintext", KeyId=keyArn,
+                                     CiphertextBlob=cipherText)
+        return orderedMap(decryptOne, cipherTexts, maxWorkers)
+
+    def getEnvelope(self, region=None, **cacheLimits):
+        """
+        Envelope encryption (data keys & local AES-GCM) through the client of a region, created on first use
+
+        :param region: Region of the KMS calls, default to the one of the config - see routeKey()
+        :param cacheLimits: maxAge, maxMessages, maxBytes & capacity of the data key caches - see Envelope.DataKeyCache,
+                            applied to the envelopes of all the regions
+        """
+        region = region or self.getRegion()
+        client = self.regionalClient(region)
+        with self.lock:
+            if cacheLimits:
+                self.envelopeLimits = cacheLimits
+                self.envelopes.clear()
+            envelope = self.envelopes.get(region)
+            if envelope is None:
+                # optional dependency (cryptography), only required for the envelope mode
+                from Envelope import Envelope
+                envelope = self.envelopes[region] = Envelope(client, **self.envelopeLimits)
+            return envelope
+
+    # envelope & key ARN of the local replica of the key, see routeKey()
+    def routeEnvelope(self, keyName):
+        client, keyArn = self.routeKey(keyName)
+        if keyArn is None:
+            return None, None
+        return self.getEnvelope(client.meta.region_name), keyArn
+
+    def encryptEnvelope(self, keyName, plainText, context=None):
+        """
+        Encrypt locally with a cached data key of the key, w/o the 4 KB limit & the round trip per message of encrypt()
+
+        :param context: Encryption context, required again by decryptEnvelope()
+        :return: The envelope encrypted message, or None on error
+        """
+        try:
+            envelope, keyArn = self.routeEnvelope(keyName)
+            return None if keyArn is None else envelope.encrypt(keyArn, plainText, context)
+        except ClientError as e:
+            logger.error(e)
+            return None
+
+    def decryptEnvelope(self, cipherText, context=None, keyName=None):
+        """
+        :param keyName: Key of the message, to decrypt the data key with its local replica - default to the config region
+        :return: The plaintext, or None on error
+        """
+        try:
+            envelope = self.getEnvelope() if keyName is None else self.routeEnvelope(keyName)[0]
+            return None if envelope is None else envelope.decrypt(cipherText, context)
+        except ClientError as e:
+            logger.error(e)
+            return None
+
+    def encryptStream(self, keyName, source, destination, context=None, frameSize=None):
+        """
+        Encrypt a file or file-like object of any size in frames under one data key, in constant memory
+
+        :param source, destination: Paths or binary file-like objects
+        :param frameSize: Plaintext bytes per frame, default to Envelope.DEFAULT_FRAME_SIZE
+        :return: Number of bytes encrypted, or None on error
+        """
+        try:
+            envelope, keyArn = self.routeEnvelope(keyName)
+            if keyArn is None:
+                return None
+            return envelope.encryptStream(keyArn, source, destination, context,
+                                          **({"frameSize": frameSize} if frameSize else {}))
+        except ClientError as e:
+            logger.error(e)
+            return None
+
+    def decryptStream(self, source, destination, context=None, keyName=None):
+        """
+        :param keyName: Key of the stream, to decrypt the data key with its local replica - default to the config region
+        :return: Number of bytes decrypted, or None on error
+        :raises EnvelopeError: if the stream was tampered with or truncated
+        """
+        try:
+            envelope = self.getEnvelope() if keyName is None else self.routeEnvelope(keyName)[0]
+            return None if envelope is None else envelope.decryptStream(source, destination, context)
         except ClientError as e:
             logger.error(e)
             return None
@@ -147,7 +550,7 @@ class Kms(Config):
 
 
 def unitTest():
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    StructLog.configure(level=logging.INFO, fmt='%(asctime)s %(levelname)s %(message)s')
 
     kms_definition = {
         "Common-UnitTest-Kms-001": {
@@ -155,6 +558,7 @@ def unitTest():
             "KeyUsage": "ENCRYPT_DECRYPT",
             "Origin": "AWS_KMS",  # AWS_KMS, EXTERNAL, or AWS_CLOUDHSM
             "KeySpec": "SYMMETRIC_DEFAULT",  # RSA_2048, RSA_3072, RSA_4096, ECC_NIST_P256, ECC_NIST_P384, ECC_NIST_P521, or SYMMETRIC_DEFAULT
+            # "Replicas": ["us-west-2"],  # optional, multi-region key replicated to the regions, see routeKey()
             "Tags" : [
                 {   "TagKey"  : "Context",
                     "TagValue": "Common-UnitTest-Kms"},
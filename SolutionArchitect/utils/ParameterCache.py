@@ -0,0 +1,180 @@
+#
+# ParameterCache.py
+#
+# In-process cache of SSM parameters & Secrets Manager secrets, so hot paths (e.g. Lambda handlers) read them from
+# memory instead of a network call per read
+#
+#   cache = ParameterCache()                          # module level, shared by the invocations of a Lambda container
+#   password = cache.get("/c4w1/db/password")         # SecureString, decrypted
+#   apiKey = cache.get("/aws/reference/secretsmanager/c4w1-api-key")   # Secrets Manager secret through SSM
+#
+# - Values are trusted for the TTL, a read of an expired value fetches it again
+# - A background thread refreshes the values before they expire (REFRESH_AHEAD of the TTL), so steady state reads
+#   never wait on the network. Values not read for IDLE_TTLS x TTL are dropped instead of being refreshed forever.
+# - Misses & refreshes are batched with get_parameters (up to 10 names per request)
+# - invalidate() wins over a background refresh in flight, the value fetched before the update isn't stored back
+#
+# Only depends on boto3, the module can be shipped in a Lambda zip next to the handler.
+#
+
+import time
+import logging
+import threading
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300          # seconds
+REFRESH_AHEAD = 0.75       # refresh once this fraction of the TTL has elapsed
+IDLE_TTLS = 10             # stop refreshing a value not read for this many TTLs
+BATCH_SIZE = 10            # names per get_parameters request (API limit)
+SECRETS_PREFIX = "/aws/reference/secretsmanager/"
+
+
+class ParameterNotFound(KeyError):
+    pass
+
+
+class ParameterCache:
+    def __init__(self, client=None, ttl=DEFAULT_TTL, background=True):
+        """
+        :param client: boto3 SSM client, default to boto3.client("ssm")
+        :param ttl: Seconds a value is trusted
+        :param background: Refresh the values in a daemon thread before they expire
+        """
+        self.client = client or boto3.client("ssm")
+        self.ttl = ttl
+        self.background = background
+        self.entries = {}   # name -> {"Value", "Version", "Fetched", "Used", "Generation"} (monotonic times)
+        self.generation = 0   # bumped on each store, a refresh only replaces the entries it saw
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _fetch(self, names):
+        """
+        Fetch the names from SSM in batches, decrypted
+
+        :return: (dictionary of name -> parameter, list of invalid names)
+        """
+        parameters = {}
+        invalid = []
+        # Secrets Manager references are fetched one by one with get_parameter
+        references = [name for name in names if name.startswith(SECRETS_PREFIX)]
+        plain = [name for name in names if not name.startswith(SECRETS_PREFIX)]
+        for start in range(0, len(plain), BATCH_SIZE):
+            response = self.client.get_parameters(Names=plain[start:start + BATCH_SIZE], WithDecryption=True)
+            for parameter in response["Parameters"]:
+                parameters[parameter["Name"]] = parameter
+            invalid += response.get("InvalidParameters", [])
+        for name in references:
+            try:
+                parameters[name] = self.client.get_parameter(Name=name, WithDecryption=True)["Parameter"]
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ParameterNotFound":
+                    raise
+                invalid.append(name)
+        return parameters, invalid
+
+    def _store(self, parameters, used=False, generations=None):
+        """
+        :param generations: name -> generation of the entry when the fetch started, the names invalidated or stored
+                            again meanwhile are skipped
+        """
+        now = time.monotonic()
+        with self.lock:
+            for name, parameter in parameters.items():
+                if generations is not None and self.entries.get(name, {}).get("Generation") != generations.get(name):
+                    continue
+                self.generation += 1
+                entry = self.entries.setdefault(name, {"Used": now})
+                entry.update({"Value": parameter["Value"], "Version": parameter.get("Version"), "Fetched": now,
+                              "Generation": self.generation})
+                if used:
+                    entry["Used"] = now
+        if self.background and parameters:
+            self._startRefresh()
+
+    def getMany(self, names):
+        """
+        Values of the names, from memory if fresh, the others fetched in batches
+
+        :return: dictionary of name -> value
+        :raises ParameterNotFound: if a name doesn't exist
+        """
+        now = time.monotonic()
+        values = {}
+        missing = []
+        with self.lock:
+            for name in names:
+                entry = self.entries.get(name)
+                if entry is not None and now - entry["Fetched"] < self.ttl:
+                    entry["Used"] = now
+                    values[name] = entry["Value"]
+                else:
+                    missing.append(name)
+        if missing:
+            parameters, invalid = self._fetch(missing)
+            if invalid:
+                raise ParameterNotFound(f"Parameters not found: {invalid}")
+            self._store(parameters, used=True)
+            values.update({name: parameter["Value"] for name, parameter in parameters.items()})
+        return values
+
+    def get(self, name):
+        return self.getMany([name])[name]
+
+    def invalidate(self, name=None):
+        """
+        Drop a value (e.g. after it was updated), or all the values
+        """
+        with self.lock:
+            if name is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(name, None)
+
+    def refreshDue(self):
+        """
+        Refresh the values close to expiry in one batched fetch, drop the idle ones
+
+        :return: Number of values refreshed
+        """
+        now = time.monotonic()
+        with self.lock:
+            for name in [n for n, e in self.entries.items() if now - e["Used"] > IDLE_TTLS * self.ttl]:
+                del self.entries[name]
+            due = {n: e["Generation"] for n, e in self.entries.items() if now - e["Fetched"] >= REFRESH_AHEAD * self.ttl}
+        if not due:
+            return 0
+        parameters, invalid = self._fetch(list(due))
+        # not stored over an invalidate() (or a read) that happened during the fetch
+        self._store(parameters, generations=due)
+        # deleted meanwhile: the next read raises ParameterNotFound
+        with self.lock:
+            for name in invalid:
+                if self.entries.get(name, {}).get("Generation") == due[name]:
+                    del self.entries[name]
+        return len(parameters)
+
+    def _startRefresh(self):
+        with self.lock:
+            if self.thread is not None or self.stopped.is_set():
+                return
+            self.thread = threading.Thread(target=self._refreshLoop, name="parameter-cache", daemon=True)
+        self.thread.start()
+
+    def _refreshLoop(self):
+        # wake up often enough to refresh each value between REFRESH_AHEAD & 1 x TTL
+        interval = max((1 - REFRESH_AHEAD) * self.ttl / 2, 0.01)
+        while not self.stopped.wait(interval):
+            try:
+                self.refreshDue()
+            except (ClientError, BotoCoreError) as e:
+                # API or network error (e.g. EndpointConnectionError): keep serving the cached values and retry on the
+                # next wake up, the reads fetch them again once expired
+                logger.warning("Parameter refresh failed: %s", e)
+
+    def stop(self):
+        self.stopped.set()
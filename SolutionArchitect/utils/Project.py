@@ -7,120 +7,506 @@
 
 import sys
 import os
+import time
+import logging
+import functools
 import boto3
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 
-from Config import Config, Status
+import ClientHooks
+from ApiBudget import ApiCounter, PhaseTimer
+import Arn
+from Config import Config, Status, Action, ArnRef, Deferred, PROJECT_TAG, RESOURCE_TAG
 from IamRole import IamRole
+from Inventory import Inventory
+from ProjectState import ProjectState, DEFAULT_TTL
+from Recorder import Recorder
+from Resolver import Resolver
+from RoleCredentials import RoleCredentials
+from Scheduler import Scheduler, DEFAULT_WORKERS
 
 # additional classes required for unit test
 from IamPolicy import IamPolicy
 from Kms import Kms
 
+logger = logging.getLogger(__name__)
+
+# services not covered by the Resource Groups Tagging API (IAM is global), discovered by listing the service
+UNTAGGED_SERVICES = {"iam"}
+
 
 class Project:
 
-    def __init__(self, name, roleName=None):
+    def __init__(self, name, roleName=None, maxWorkers=DEFAULT_WORKERS, region=None, targets=None,
+                 statePath=None, stateTtl=DEFAULT_TTL):
+        """
+        :param name: Project name, also the session name of the assumed roles
+        :param roleName: Role to assume (name or ARN), None for the default credentials
+        :param region: Region of the project, None for the default region
+        :param targets: list of (roleName, region) to run the project operations across accounts/regions concurrently,
+                        each target has its own session, config objects (caches) & metrics
+        :param statePath: State file of the applied resources (see ProjectState.py), None to always list the services
+        :param stateTtl: Seconds the state of a resource is trusted before it is listed again
+        """
         self.name = name
-        self.session = None if roleName is None else self.getSessionByRole(roleName)
+        self.maxWorkers = maxWorkers  # number of concurrent operations across the configs
+        self.region = region
+        self.credentials = None
+        self.tags = {}      # client tags of a target project, see ClientHooks.attach
+        self.session = self.getSession(roleName, region)
         self.configs = {}   ## dictionary to maintain the list of AWS configuration objects - as it usally tracks additional information & cache objects
+        self.state = None if statePath is None or targets else ProjectState(statePath, stateTtl)
+        self.taggingClient = None
+        self.phases = PhaseTimer()   # timings & API calls per phase of the last create/delete/plan
+        # account, region & ARN of the project resources, shared by all the configs
+        self.resolver = Resolver(self.session, None if self.credentials is None else self.credentials.accountId, region)
+
+        # one child project per target, the sessions are setup concurrently (assume role per target)
+        self.targets = {}
+        self.metrics = {}   # target -> {"Seconds": ..., "ApiCalls": {service: {operation: count}}} of the last operation
+        if targets:
+            with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="target") as executor:
+                futures = {Project.targetLabel(targetRole, targetRegion):
+                               executor.submit(Project, name, targetRole, maxWorkers, targetRegion,
+                                               statePath=Project.targetStatePath(statePath, targetRole, targetRegion),
+                                               stateTtl=stateTtl)
+                           for targetRole, targetRegion in targets}
+            for label, future in futures.items():
+                self.targets[label] = future.result()
+                self.targets[label].tags = {"target": label}
 
+    @staticmethod
+    def targetLabel(roleName, region):
+        return f"{roleName or 'default'}@{region or Config.region()}"
 
-    def getSessionByRole(self, roleName):
-        # get the session object for the role
-        roleArn = IamRole().getArn(roleName)
-
-        # Do something simple for now
-        if roleArn is None:
-            print(f"Role {roleName} not found")
+    # one state file per target, next to the given one
+    @staticmethod
+    def targetStatePath(statePath, roleName, region):
+        if statePath is None:
             return None
-        
-        # Create STS client
-        sts_client = boto3.client('sts')
-
-        # Call the assume_role method 
-        response = sts_client.assume_role(
-            RoleArn=roleArn,
-            RoleSessionName=self.name
-        )
+        root, ext = os.path.splitext(statePath)
+        label = Project.targetLabel(roleName, region).replace("/", "_").replace(":", "_")
+        return f"{root}.{label}{ext}"
 
-        # Get the temporary credentials
-        credentials = response['Credentials']
+    def getSession(self, roleName, region):
+        if roleName is not None:
+            return self.getSessionByRole(roleName)
+        if region is not None:
+            return boto3.Session(region_name=region)
+        return None
 
-        # Pass the temporary credentials to the boto3 session
-        session = boto3.Session(
-            aws_access_key_id=credentials['AccessKeyId'],
-            aws_secret_access_key=credentials['SecretAccessKey'],
-            aws_session_token=credentials['SessionToken']
-        )
-        return session
+    def getSessionByRole(self, roleName):
+        # session of the assumed role, the credentials are cached on disk & renewed in the background
+        # so a warm start doesn't make any STS/IAM call
+        self.credentials = RoleCredentials(roleName, self.name, region=self.region)
+        try:
+            return self.credentials.session()
+        except ClientError as e:
+            print(f"Unable to assume role {roleName}: {e}")
+            return None
 
 
     def addConfig(self, config_class, config_dict=None):
-        self.configs[config_class] = (config_class(inputMap=config_dict, session=self.session), config_dict)
+        if self.targets:
+            # each target gets its own config object, with the references bound to the target's configs
+            for target in self.targets.values():
+                target.addConfig(config_class, Project.bindReferences(config_dict, target))
+            return
+        config_object = config_class(inputMap=config_dict, session=self.session)
+        config_object.projectTags = {PROJECT_TAG: self.name}   # mark the created resources for discover()
+        if self.tags:
+            ClientHooks.attach(config_object.botoClient, **self.tags)
+        config_object.resolver = self.resolver
+        self.configs[config_class] = (config_object, config_dict)
         return
-    
-    def create(self, config_class=None):
-        # get the config object from the 1st of the tuple
+
+    # Copy of the definition with the ArnRef re-bound to the given project
+    @staticmethod
+    def bindReferences(obj, project):
+        if isinstance(obj, ArnRef):
+            return Project.getConfigArn(project, obj.service, obj.name)
+        if isinstance(obj, Deferred):
+            return Project.getAccountIdRef(project)
+        if isinstance(obj, dict):
+            return {key: Project.bindReferences(value, project) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [Project.bindReferences(value, project) for value in obj]
+        return obj
+
+    def fanOut(self, operation, *args):
+        """
+        Run the operation on all the targets concurrently, with the API calls & time counted per target
+
+        :return: (Status, dictionary of target -> result of the operation)
+        """
+        def run(label, target):
+            counter = ApiCounter(target=label).start()
+            start = time.perf_counter()
+            try:
+                return getattr(target, operation)(*args)
+            finally:
+                counter.stop()
+                self.metrics[label] = {"Seconds": time.perf_counter() - start, "ApiCalls": counter.byService()}
+
+        with ThreadPoolExecutor(max_workers=len(self.targets), thread_name_prefix="target") as executor:
+            futures = {label: executor.submit(run, label, target) for label, target in self.targets.items()}
+
         status = Status.NO_OP
         result_map = {}
-        if config_class is None:
-            #size of the config dietionary
-            print(f"Number of Config classes in project : {len(self.configs)}")
-            for key in self.configs:
-                config_object, config_dictionary = self.configs[key]
-                sub_status, sub_results = config_object.create()
-                if sub_status == Status.FAILED:
-                    status = Status.FAILED
-                    result_map[key] = sub_results
-                    print(f"Error creating config {key}")
-                    print(sub_results)
-                elif sub_status == Status.NO_OP:
+        for label, future in futures.items():
+            try:
+                sub_status, result_map[label] = future.result()
+            except Exception as e:
+                logger.exception("%s failed on target %s", operation, label)
+                sub_status, result_map[label] = Status.FAILED, e
+            if sub_status == Status.FAILED:
+                status = Status.FAILED
+            elif sub_status == Status.SUCCESS and status != Status.FAILED:
+                status = Status.SUCCESS
+        return status, result_map
+
+    # Refresh the resource maps of all configs (or the given config classes) in parallel - one listing per service
+    def refresh(self, config_classes=None):
+        if self.targets:
+            return self.fanOut("refresh", config_classes)
+        status = Status.SUCCESS
+        result_map = {}
+        with ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix="refresh") as executor:
+            futures = {key: executor.submit(config_object.refresh)
+                       for key, (config_object, config_dictionary) in self.configs.items()
+                       if config_dictionary is not None and (config_classes is None or key in config_classes)}
+        for key, future in futures.items():
+            sub_status, sub_results = future.result()
+            if sub_status == Status.FAILED:
+                status = Status.FAILED
+                result_map[key] = sub_results
+                print(f"Error refreshing config {key}")
+        return status, result_map
+
+    def buildSchedule(self, action, skip=()):
+        """
+        Dependency graph of the project at key granularity, nodes are (config class, key)
+        The dependencies are inferred from the definitions - see Config.getDependencies()
+
+        :param skip: nodes left out of the graph, they count as satisfied dependencies (e.g. unchanged per the state)
+        """
+        scheduler = Scheduler(self.maxWorkers)
+        for key in self.configs:
+            config_object, config_dictionary = self.configs[key]
+            if config_dictionary is None:
+                continue
+            do_action = config_object.do_create if action == Action.CREATE else config_object.do_delete
+            for name, config in config_dictionary.items():
+                if (key, name) in skip:
                     continue
-                elif sub_status == Status.SUCCESS:
-                    status = Status.SUCCESS
-                    result_map[key] = sub_results
-                    print(f"Success creating config {key}")
-                else:
-                    status = Status.FAILED
-                    result_map[key] = sub_results
-                    print(f"Unknown status while creating config {key}")
-                
-                # break if any of the config subclass creation failed
-                if status == Status.FAILED:
-                    break
+                scheduler.add((key, name),
+                              functools.partial(config_object.actionKey, action, do_action, name, config),
+                              config_object.getDependencies(name, config))
+        return scheduler
 
+    # Fold the per key results of the scheduler into the per config result maps, same layout as Config.action()
+    def collectResults(self, action, results):
+        status = Status.NO_OP
+        result_map = {}
+        for key in self.configs:
+            config_object, config_dictionary = self.configs[key]
+            if config_dictionary is None:
+                continue
+            sub_status = Status.NO_OP
+            sub_results = {"SuccessKeys": [], "SuccessResponses": [], "NoopKeys": []}
+            for name in config_dictionary:
+                if (key, name) not in results:
+                    # not started due to a failure
+                    sub_results.setdefault("SkippedKeys", []).append(name)
+                    continue
+                key_status, key_result = results[(key, name)]
+                if key_status == Status.FAILED:
+                    sub_status = Status.FAILED
+                    sub_results["ErrorKey"] = name
+                    sub_results["ErrorMessage"] = key_result
+                elif key_status == Status.SUCCESS:
+                    sub_status = Status.SUCCESS if sub_status != Status.FAILED else sub_status
+                    sub_results["SuccessKeys"].append(name)
+                    sub_results["SuccessResponses"].append(key_result)
+                else:
+                    sub_results["NoopKeys"].append(name)
+
+            if sub_status == Status.FAILED:
+                status = Status.FAILED
+                result_map[key] = sub_results
+                print(f"Error {action.value[:-1]}ing config {key}")
+                print(sub_results)
+            elif sub_status == Status.SUCCESS:
+                status = Status.SUCCESS if status != Status.FAILED else status
+                result_map[key] = sub_results
+                print(f"Success {action.value[:-1]}ing config {key}")
+        return status, result_map
+
+    # Seed the resource maps from the state, return the nodes applied from an unchanged definition
+    def loadState(self):
+        unchanged = set()
+        for key in self.configs:
+            config_object, config_dictionary = self.configs[key]
+            for name, config in (config_dictionary or {}).items():
+                if self.state.isFresh(key, name, config):
+                    config_object.addResource(name, self.state.get(key, name)["Resource"])
+                    unchanged.add((key, name))
+        return unchanged
+
+    # Record the outcome of the scheduled keys in the state file
+    def saveState(self, action, results):
+        if action == Action.CREATE:
+            # pick up the identifiers of the new resources, one listing per service that changed
+            self.refresh({key for (key, _), (key_status, _) in results.items() if key_status == Status.SUCCESS})
+        for (key, name), (key_status, _) in results.items():
+            if key_status == Status.FAILED:
+                continue
+            config_object, config_dictionary = self.configs[key]
+            if action == Action.DELETE:
+                self.state.remove(key, name)
+            elif name not in config_object.resourceMap:
+                continue
+            elif key_status == Status.SUCCESS or self.state.get(key, name) is None:
+                # created, or found by the listing w/o any state yet (existed before the first apply): recorded with
+                # the definition so the next apply skips the listing
+                self.state.record(key, name, config_dictionary[name], config_object.resourceMap[name])
+            else:
+                # exists already, the definition was not applied: keep the hash of the applied one so the drift shows
+                self.state.touch(key, name, config_object.resourceMap[name])
+        self.state.save()
+
+    def reconcile(self):
+        """
+        List all the services & re-sync the state with the resources that actually exist
+        """
+        if self.targets:
+            return self.fanOut("reconcile")
+        for config_object, _ in self.configs.values():
+            config_object.dirty = True
+        status, result_map = self.refresh()
+        if status == Status.FAILED or self.state is None:
+            return status, result_map
+        for key in self.configs:
+            config_object, config_dictionary = self.configs[key]
+            for name in (config_dictionary or {}):
+                if name in config_object.resourceMap:
+                    self.state.touch(key, name, config_object.resourceMap[name])
+                else:
+                    self.state.remove(key, name)
+        self.state.save()
+        return status, result_map
+
+    # Time & count the API calls of a phase of the current operation, see PhaseTimer
+    def phase(self, name):
+        return self.phases.phase(name, **self.tags)
+
+    # Load the state & list the services with pending keys, common to create() & plan()
+    def prepare(self, refresh=False):
+        # keys applied from the same definition are skipped w/o any API call
+        with self.phase("state"):
+            unchanged = self.loadState() if self.state is not None and not refresh else set()
+        pending = [key for key, (_, config_dictionary) in self.configs.items()
+                   if any((key, name) not in unchanged for name in (config_dictionary or {}))]
+        with self.phase("refresh"):
+            status, result_map = self.refresh(pending)
+        return status, result_map, unchanged
+
+    def plan(self, refresh=False):
+        """
+        Changes create() would make, w/o making them
+
+        :return: (Status, {"Create": [...], "Exists": [...], "Unchanged": [...]}) with the (config class, key)
+                 to create in dependency order, the existing ones & the ones unchanged per the state file
+        """
+        if self.targets:
+            return self.fanOut("plan", refresh)
+        self.phases.reset()
+        status, result_map, unchanged = self.prepare(refresh)
+        if status == Status.FAILED:
             return status, result_map
+        plan = {"Create": [], "Exists": [], "Unchanged": sorted(unchanged, key=lambda node: (node[0].__name__, node[1]))}
+        for key, name in self.buildSchedule(Action.CREATE, unchanged).order():
+            config_object, _ = self.configs[key]
+            plan["Exists" if name in config_object.resourceMap else "Create"].append((key, name))
+        return Status.SUCCESS, plan
+
+    def create(self, config_class=None, refresh=False):
+        """
+        :param refresh: Ignore the state file and list the services to find the existing resources
+        """
+        if self.targets:
+            return self.fanOut("create", config_class, refresh)
+        # get the config object from the 1st of the tuple
+        if config_class is None:
+            #size of the config dietionary
+            print(f"Number of Config classes in project : {len(self.configs)}")
+            self.phases.reset()
+            status, result_map, unchanged = self.prepare(refresh)
+            if status == Status.FAILED:
+                return status, result_map
+
+            # create the resources as soon as their dependencies are created, independent ones in parallel
+            with self.phase("apply"):
+                results = self.buildSchedule(Action.CREATE, unchanged).run()
+            if self.state is not None:
+                with self.phase("save"):
+                    self.saveState(Action.CREATE, results)
+            results.update({node: (Status.NO_OP, None) for node in unchanged})
+            return self.collectResults(Action.CREATE, results)
         else:
             config_object, config_dictionary = self.configs[config_class]
             return config_object.create()
 
     def delete(self, config_class=None):
+        if self.targets:
+            return self.fanOut("delete", config_class)
         # get the config object from the 1st of the tuple
         if config_class is None:
             #size of the config dietionary
             print(f"Number of Config classes in project : {len(self.configs)}")
-            for key in self.configs:
-                config_object, config_dictionary = self.configs[key]
-                config_object.delete()
-            return
+            self.phases.reset()
+            with self.phase("refresh"):
+                status, result_map = self.refresh()
+            if status == Status.FAILED:
+                return status, result_map
+
+            # tear down in reverse dependency order: a resource is deleted once everything depending on it
+            # is gone (e.g. roles detached before their policies), independent ones in parallel
+            with self.phase("apply"):
+                results = self.buildSchedule(Action.DELETE).reversed().run()
+            if self.state is not None:
+                with self.phase("save"):
+                    self.saveState(Action.DELETE, results)
+            return self.collectResults(Action.DELETE, results)
         else:
             config_object, config_dictionary = self.configs[config_class]
-            config_object.delete()
-        return
+            return config_object.delete()
+
+
+    def getTaggingClient(self):
+        if self.taggingClient is None:
+            client = boto3.client("resourcegroupstaggingapi") if self.session is None \
+                else self.session.client("resourcegroupstaggingapi")
+            self.taggingClient = ClientHooks.attach(client, **self.tags)
+        return self.taggingClient
+
+    # Single sweep of the Resource Groups Tagging API for the resources with the project marker tags
+    def sweep(self, services):
+        paginator = self.getTaggingClient().get_paginator("get_resources")
+        for page in paginator.paginate(TagFilters=[{"Key": PROJECT_TAG, "Values": [self.name]}],
+                                       ResourceTypeFilters=sorted(services)):
+            for mapping in page["ResourceTagMappingList"]:
+                arn = mapping["ResourceARN"]
+                tags = {tag["Key"]: tag["Value"] for tag in mapping.get("Tags", [])}
+                service = Arn.parse(arn)["Service"]
+                if service in services and RESOURCE_TAG in tags:
+                    services[service].addTaggedResource(tags[RESOURCE_TAG], arn)
+
+    # State, tag sweep & IAM listing of the configs with a definition, shared by discover() & list()
+    def discoverDefined(self):
+        unchanged = self.loadState() if self.state is not None else set()
+        swept = {}    # service -> config object
+        listed = []   # config classes listed instead
+        for key, (config_object, config_dictionary) in self.configs.items():
+            if config_dictionary is None or all((key, name) in unchanged for name in config_dictionary):
+                continue
+            if config_object.botoName in UNTAGGED_SERVICES:
+                listed.append(key)
+            else:
+                swept[config_object.botoName] = config_object
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="discover") as executor:
+            listing = executor.submit(self.refresh, listed)
+            status, result_map = Status.SUCCESS, {}
+            if swept:
+                try:
+                    self.sweep(swept)
+                except ClientError as e:
+                    logger.error("Tag based discovery failed: %s", e)
+                    status = Status.FAILED
+                    result_map.update({type(config_object): e for config_object in swept.values()})
+            list_status, list_results = listing.result()
+        if list_status == Status.FAILED:
+            status = Status.FAILED
+            result_map.update(list_results)
+
+        for key, (config_object, config_dictionary) in self.configs.items():
+            if config_dictionary is not None and key not in result_map:
+                result_map[key] = [name for name in config_dictionary if name in config_object.resourceMap]
+        return status, result_map
+
+    def discover(self):
+        """
+        Find the resources of the project across all services at once: the state file when fresh, then a single
+        tag based sweep for the services supported by the tagging API, in parallel with the listing of the others
+
+        :return: (Status, dictionary of config class -> the names of the definition found, or the error)
+        """
+        if self.targets:
+            return self.fanOut("discover")
+        status, result_map = self.discoverDefined()
+        for key, (config_object, config_dictionary) in self.configs.items():
+            if config_dictionary is None:
+                # no definition to scope the discovery: inspect all the resources of the service
+                sub_status, result_map[key] = config_object.list()
+                if sub_status == Status.FAILED:
+                    status = Status.FAILED
+        return status, result_map
 
+    # Run a listing, timed for the inventory
+    @staticmethod
+    def timed(listing):
+        start = time.perf_counter()
+        status, result = listing()
+        return status, result, time.perf_counter() - start
 
     def list(self, config_class=None):
+        """
+        Inventory of all the configs in parallel: the resources of the definitions are found like discover() (state,
+        one tag sweep), the configs w/o definition are listed in full - or the list of the given config class
+
+        :return: (Status, Inventory) with the resources, status & time per service - or the result of the config list
+        """
+        if self.targets:
+            status, results = self.fanOut("list", config_class)
+            return status, (Inventory.merge(results) if config_class is None else results)
         # get the config object from the 1st of the tuple
         if config_class is None:
             #size of the config dietionary
             print(f"Number of Config classes in project : {len(self.configs)}")
-            for key in self.configs:
-                config_object, config_dictionary = self.configs[key]
-                config_object.list()
-            return
+            self.phases.reset()
+            inventory = Inventory()
+            with self.phase("list"), ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix="list") as executor:
+                discovery = executor.submit(Project.timed, self.discoverDefined)
+                futures = {key: executor.submit(Project.timed, config_object.list)
+                           for key, (config_object, config_dictionary) in self.configs.items() if config_dictionary is None}
+            try:
+                _, discovered, discoverySeconds = discovery.result()
+            except Exception as e:
+                logger.exception("Discovery failed")
+                discovered, discoverySeconds = {key: e for key in self.configs}, 0
+            for key, (config_object, config_dictionary) in self.configs.items():
+                if config_dictionary is not None:
+                    # the configs with a definition share the time of the discovery
+                    result, seconds = discovered[key], discoverySeconds
+                    status = Status.SUCCESS if isinstance(result, list) else Status.FAILED
+                else:
+                    try:
+                        status, result, seconds = futures[key].result()
+                    except Exception as e:
+                        logger.exception("Listing %s failed", key.__name__)
+                        status, result, seconds = Status.FAILED, e, 0
+                if status == Status.FAILED:
+                    inventory.add(key.__name__, status, seconds, error=result)
+                    continue
+                # the resources of the definition, or all the resources of the service w/o definition
+                names = config_object.resourceMap.keys() if config_dictionary is None else result
+                inventory.add(key.__name__, status, seconds, {name: config_object.resourceMap[name] for name in names})
+            return inventory.status, inventory
         else:
             config_object, config_dictionary = self.configs[config_class]
-            config_object.list()
+            return config_object.list()
     
     
 
@@ -141,10 +527,20 @@ class Project:
         return configObj
     
 
+    # ARN of a resource of the project, through the project resolution cache
+    def getArn(self, service, name):
+        return self.resolver.arn(self.getConfig(service), name)
+
+    # Deferred ARN of a resource defined in another config of the project, resolved when the definition
+    # is converted to JSON. The reference also makes the referencing key depend on the referenced one
     @staticmethod
     def getConfigArn(project, service, name):
-        configObj = project.getConfig(service)
-        yield configObj.getArn(name)
+        return ArnRef(project.getArn, service, name)
+
+    # Deferred account id of the project session, e.g. for the principal of a role definition
+    @staticmethod
+    def getAccountIdRef(project):
+        return Deferred(lambda: project.resolver.accountId(), {"$accountId": True})
     
 
 def unitTest():
@@ -194,7 +590,8 @@ def unitTest():
         },
     }
 
-    # Now add the config objects
+    # Now add the config objects - in any order, the creation order is inferred from the references
+    # (getConfigArn, UserPolicies) and the independent resources are created in parallel
     project.addConfig(IamPolicy, policy_definition)
     project.addConfig(IamRole, role_definition)
     project.addConfig(Kms, kms_definition)
@@ -213,30 +610,89 @@ def unitTest():
     
     
 
+# Print the outcome of an operation on a definition file, with the timings & API calls per phase
+def printOutcome(project, action, status, result):
+    def nodeName(node):
+        return f"{node[0].__name__}/{node[1]}"
+    def printResult(result):
+        if action == "plan" and status != Status.FAILED:
+            for change, marker in (("Create", "+"), ("Exists", "="), ("Unchanged", " ")):
+                for node in result[change]:
+                    print(f"  {marker} {nodeName(node)}")
+        elif isinstance(result, dict):
+            for key, value in result.items():
+                print(f"  {getattr(key, '__name__', key)}: {value}")
+        else:
+            print(f"  {result}")
+
+    print(f"{action} {project.name}: {status.name}")
+    if isinstance(result, Inventory):
+        print(result.table())
+        for label, target in project.targets.items():
+            print(f"[{label}]")
+            print(target.phases.report())
+        if not project.targets:
+            print(project.phases.report())
+    elif project.targets:
+        for label, target in project.targets.items():
+            print(f"[{label}]")
+            printResult(result.get(label) if isinstance(result, dict) else result)
+            print(target.phases.report())
+    else:
+        printResult(result)
+        print(project.phases.report())
+
+
+def runDefinition(action, path, asJson=False):
+    # ProjectDefinition imports this module, import it on demand
+    import ProjectDefinition
+
+    timer = PhaseTimer()
+    with timer.phase("load"):
+        project = ProjectDefinition.fromFile(path)
+    print(timer.report())
+    status, result = getattr(project, action)()
+    if asJson and isinstance(result, Inventory):
+        print(result.toJson())
+    else:
+        printOutcome(project, action, status, result)
+    return status
+
+
 #if this .py is executed directly on the command line
 def main(argv):
     # argv[0] is the script name, print remaining arguments separated by space without the bracket
     print("Running :", " ".join(argv[0:]))
     
     # if no additonal arguments are passed, print usage help
-    if len(argv) != 2 or argv[1] not in ["create", "delete", "list", "unit"]:
-        print(f"Usage: python3 {argv[0]} <create|delete|list|unit> ")
+    if not ((len(argv) == 3 and argv[1] in ["create", "delete", "list", "plan"]) or argv[1:] == ["unit"]
+            or (len(argv) == 4 and argv[1] == "list" and argv[3] == "--json")):
+        print(f"Usage: python3 {argv[0]} <create|delete|list|plan> <definition.json|yaml>")
+        print(f"       python3 {argv[0]} list <definition.json|yaml> --json")
+        print(f"       python3 {argv[0]} unit")
         return
     else:
         # if additional arguments are passed, proceed with the action
         
         action = argv[1]
-        if action == "create":
-            pass 
-        elif action == "delete":
-            pass
-        elif action == "list":
-            pass
+        if action in ["create", "delete", "list", "plan"]:
+            # RECORDER_MODE=record|replay to capture/replay the run, off by default
+            recording = f"{os.path.splitext(argv[2])[0]}.{action}.jsonl.gz"
+            with Recorder.fromEnvironment(recording, default=Recorder.OFF):
+                status = runDefinition(action, argv[2], asJson=argv[3:] == ["--json"])
+            return 0 if status != Status.FAILED else 1
         elif action == "unit":
-            unitTest()
-
+            # RECORDER_MODE=record captures the AWS calls of the unit flow (run live once), replay re-runs the flow
+            # offline from the recording with the dummy credentials session of the Recorder
+            recorder = Recorder.fromEnvironment(os.path.join("recordings", "projectUnit.jsonl.gz"), default=Recorder.OFF)
+            if recorder.mode == Recorder.REPLAY and not os.path.exists(recorder.path):
+                print(f"No recording {recorder.path}, run once with RECORDER_MODE=record")
+                return 1
+            with recorder:
+                status = unitTest()
+            return 0 if status != Status.FAILED else 1
 
 if __name__ == "__main__":
-    main(sys.argv)
+    sys.exit(main(sys.argv))
 
     
@@ -0,0 +1,90 @@
+#
+# ProjectDefinition.py
+#
+# Project definitions in JSON / YAML files, instead of dicts hardcoded in the lab runners
+#
+# Loading a definition doesn't make any API call: the references are kept deferred until the definitions are used
+#
+#   {
+#       "Project": "C4_W1_SecureArchitecture",
+#       "Role": null,                         # optional, role to assume (name or ARN)
+#       "Region": null,                       # optional, default to the configured region
+#       "Targets": [["Role", "us-west-2"]],   # optional, run across accounts/regions - see Project(targets=...)
+#       "State": true,                        # optional, state file under ~/.aws/solution-architect/state,
+#                                             # or a path relative to the definition file
+#       "Configs": {                          # config class -> definitions, in any order
+#           "IamPolicy": {"Policy-001": {... "Resource": [{"$arn": "Kms/Key-001"}]}},
+#           "IamRole": {"Role-001": {"PrincipalType": "AWS", "AWS": {"$accountId": true}, ...}},
+#           "Kms": {"Key-001": {...}}
+#       }
+#   }
+#
+#   {"$arn": "<config class>/<name>"}  ARN of a resource of the project - see Project.getConfigArn
+#   {"$accountId": true}               account id of the project session - see Project.getAccountIdRef
+#
+
+import os
+import json
+import importlib
+
+from Project import Project
+import ProjectState
+
+
+def load(path):
+    """
+    Read a definition file, YAML if the extension is .yaml/.yml (requires PyYAML), JSON otherwise
+    """
+    with open(path, "r") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f"PyYAML is required to load {path}, pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def configClass(name):
+    # the config classes live in the module of the same name, e.g. Kms.Kms
+    return getattr(importlib.import_module(name), name)
+
+
+# Replace the reference markers by the deferred references of the project
+def resolveReferences(obj, project):
+    if isinstance(obj, dict):
+        if set(obj.keys()) == {"$arn"}:
+            service, name = obj["$arn"].split("/", 1)
+            return Project.getConfigArn(project, configClass(service), name)
+        if set(obj.keys()) == {"$accountId"}:
+            return Project.getAccountIdRef(project)
+        return {key: resolveReferences(value, project) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [resolveReferences(value, project) for value in obj]
+    return obj
+
+
+def build(definition, basePath="."):
+    """
+    Project of the definition, with the config objects added
+
+    :param definition: The definition as loaded by load()
+    :param basePath: Directory the relative paths of the definition (State) are based on
+    """
+    statePath = definition.get("State")
+    if statePath is True:
+        statePath = ProjectState.defaultPath(definition["Project"])
+    elif statePath:
+        statePath = os.path.join(basePath, statePath)
+    else:
+        statePath = None
+    targets = [tuple(target) for target in definition.get("Targets", [])] or None
+    project = Project(definition["Project"], roleName=definition.get("Role"), region=definition.get("Region"),
+                      targets=targets, statePath=statePath)
+    for name, configs in definition.get("Configs", {}).items():
+        project.addConfig(configClass(name), resolveReferences(configs, project))
+    return project
+
+
+def fromFile(path):
+    return build(load(path), os.path.dirname(os.path.abspath(path)))
@@ -0,0 +1,124 @@
+#
+# ProjectState.py
+#
+# Local state of the resources applied by a Project
+#
+# Each created resource (or existing one found on the first apply) is recorded with its identifiers (the resource map
+# attributes, e.g. Arn / KeyId) and a hash of the definition it was applied from. A re-apply skips the keys with an
+# unchanged definition and fresh state w/o any API call, and seeds the resource maps from the state so the references
+# (getArn) resolve locally.
+# Entries older than the TTL are treated as unknown, Project.reconcile() (or create(refresh=True)) lists the
+# services again and re-syncs the state with what actually exists.
+#
+# {"version": 1, "resources": {"<config class>/<key>": {"Hash": ..., "Resource": {...}, "Updated": <epoch>}}}
+#
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from Config import ArnRef, Deferred
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_TTL = 24 * 3600   # seconds before the state of a resource is re-checked against AWS
+# default location of the state files, out of the source tree
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".aws", "solution-architect", "state")
+
+
+def defaultPath(projectName):
+    return os.path.join(STATE_DIR, f"{projectName}.json")
+
+
+# references are hashed by what they point to, not by the ARN they resolve to (which may need an API call)
+def _symbolic(o):
+    if isinstance(o, ArnRef):
+        return {"$arn": f"{o.service.__name__}/{o.name}"}
+    if isinstance(o, Deferred):
+        return o.symbol
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def definitionHash(config):
+    """
+    Stable hash of a key definition, w/o resolving the references
+    """
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), default=_symbolic)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def stateKey(configClass, key):
+    return f"{configClass.__name__}/{key}"
+
+
+class ProjectState:
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        """
+        :param path: JSON state file, created on the first save
+        :param ttl: Seconds an entry is trusted w/o checking AWS, None to trust it until reconciled
+        """
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.resources = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning("Ignoring unreadable state file %s: %s", self.path, e)
+            return
+        if state.get("version") != FORMAT_VERSION:
+            logger.warning("Ignoring state file %s with version %s", self.path, state.get("version"))
+            return
+        self.resources = state.get("resources", {})
+
+    def save(self):
+        with self.lock:
+            state = {"version": FORMAT_VERSION, "resources": self.resources}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmpPath = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmpPath, "w") as f:
+                json.dump(state, f, indent=1, sort_keys=True, default=str)
+            os.replace(tmpPath, self.path)
+
+    def get(self, configClass, key):
+        return self.resources.get(stateKey(configClass, key))
+
+    def isFresh(self, configClass, key, config):
+        """
+        True if the key was applied from the same definition within the TTL
+        """
+        entry = self.get(configClass, key)
+        if entry is None or entry.get("Hash") != definitionHash(config):
+            return False
+        return self.ttl is None or time.time() - entry.get("Updated", 0) < self.ttl
+
+    def record(self, configClass, key, config, resource):
+        with self.lock:
+            self.resources[stateKey(configClass, key)] = {
+                "Hash": definitionHash(config),
+                "Resource": resource,
+                "Updated": time.time(),
+            }
+
+    def touch(self, configClass, key, resource):
+        # the resource still exists (e.g. seen by a listing), keep the hash of the definition it was applied from
+        with self.lock:
+            entry = self.resources.get(stateKey(configClass, key))
+            if entry is not None:
+                entry["Resource"] = resource
+                entry["Updated"] = time.time()
+
+    def remove(self, configClass, key):
+        with self.lock:
+            self.resources.pop(stateKey(configClass, key), None)
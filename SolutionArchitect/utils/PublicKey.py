@@ -0,0 +1,87 @@
+#
+# PublicKey.py
+#
+# Local public key operations of asymmetric KMS keys (RSA / ECC)
+# https://docs.aws.amazon.com/kms/latest/developerguide/symmetric-asymmetric.html
+#
+# The public key of an asymmetric KMS key is not secret: it is fetched once with kms.get_public_key and the
+# encryption & signature verification run locally, only decrypt & sign (private key operations) go to KMS.
+# The ciphertexts & signatures are interchangeable with the ones of the KMS API.
+#
+# Requires the cryptography package (pip install cryptography), imported by Kms on first use of a public key.
+#
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+
+_HASHES = {"SHA_1": hashes.SHA1, "SHA_256": hashes.SHA256, "SHA_384": hashes.SHA384, "SHA_512": hashes.SHA512}
+
+
+def _hash(algorithm):
+    # the hash is the suffix of the KMS algorithm name, e.g. RSASSA_PSS_SHA_256
+    for suffix, hashClass in _HASHES.items():
+        if algorithm.endswith(suffix):
+            return hashClass()
+    raise ValueError(f"Unsupported algorithm {algorithm}")
+
+
+class PublicKey:
+    def __init__(self, response):
+        """
+        :param response: Response of kms.get_public_key
+        """
+        self.keyId = response["KeyId"]
+        self.keySpec = response.get("KeySpec")
+        self.keyUsage = response.get("KeyUsage")
+        self.encryptionAlgorithms = response.get("EncryptionAlgorithms", [])
+        self.signingAlgorithms = response.get("SigningAlgorithms", [])
+        self.key = serialization.load_der_public_key(response["PublicKey"])
+
+    def _algorithm(self, algorithm, supported, usage):
+        if self.keyUsage is not None and self.keyUsage != usage:
+            raise ValueError(f"Key {self.keyId} has usage {self.keyUsage}, not {usage}")
+        algorithm = algorithm or (supported[0] if supported else None)
+        if algorithm is None or (supported and algorithm not in supported):
+            raise ValueError(f"Algorithm {algorithm} not supported by key {self.keyId}")
+        return algorithm
+
+    def encrypt(self, plainText, algorithm=None):
+        """
+        :param algorithm: RSAES_OAEP_SHA_1 or RSAES_OAEP_SHA_256, default to the first one supported by the key
+        :return: Ciphertext for kms.decrypt with the same EncryptionAlgorithm
+        """
+        algorithm = self._algorithm(algorithm, self.encryptionAlgorithms, "ENCRYPT_DECRYPT")
+        if not isinstance(self.key, rsa.RSAPublicKey) or not algorithm.startswith("RSAES_OAEP"):
+            raise ValueError(f"Local encryption with {algorithm} is not supported")
+        if isinstance(plainText, str):
+            plainText = plainText.encode()
+        hashAlgorithm = _hash(algorithm)
+        return self.key.encrypt(plainText, padding.OAEP(mgf=padding.MGF1(hashAlgorithm), algorithm=hashAlgorithm,
+                                                        label=None))
+
+    def verify(self, message, signature, algorithm=None):
+        """
+        :param message: The raw message signed by kms.sign (MessageType RAW)
+        :param algorithm: RSASSA_PSS_*, RSASSA_PKCS1_V1_5_* or ECDSA_*, default to the first one supported by the key
+        :return: True if the signature is valid
+        """
+        algorithm = self._algorithm(algorithm, self.signingAlgorithms, "SIGN_VERIFY")
+        if isinstance(message, str):
+            message = message.encode()
+        hashAlgorithm = _hash(algorithm)
+        try:
+            if algorithm.startswith("RSASSA_PSS"):
+                # KMS uses a salt as long as the digest
+                self.key.verify(signature, message, padding.PSS(mgf=padding.MGF1(hashAlgorithm),
+                                                                salt_length=hashAlgorithm.digest_size), hashAlgorithm)
+            elif algorithm.startswith("RSASSA_PKCS1_V1_5"):
+                self.key.verify(signature, message, padding.PKCS1v15(), hashAlgorithm)
+            elif algorithm.startswith("ECDSA"):
+                # DER encoded signature, as returned by kms.sign
+                self.key.verify(signature, message, ec.ECDSA(hashAlgorithm))
+            else:
+                raise ValueError(f"Local verification with {algorithm} is not supported")
+        except InvalidSignature:
+            return False
+        return True
@@ -0,0 +1,63 @@
+#
+# RateLimiter.py
+#
+# Token bucket to keep bulk API calls under a request quota
+#
+# KMS throttles the cryptographic operations (Encrypt, Decrypt, GenerateDataKey, ReEncrypt...) with a request rate
+# quota shared by all the callers of the account & region. Bulk operations acquire a token per request so a large
+# batch runs at the quota instead of bursting into ThrottlingException & retries. sharedLimiter() returns the one
+# bucket of an account & region, so the Kms configs of a process draw from the same quota.
+# https://docs.aws.amazon.com/kms/latest/developerguide/requests-per-second.html
+#
+
+import time
+import threading
+
+# default shared quota of the symmetric cryptographic operations, some regions allow 10,000 to 100,000
+KMS_CRYPTO_RATE = 5500
+
+_sharedLimiters = {}   # (account id, region) -> RateLimiter, see sharedLimiter()
+_sharedLock = threading.Lock()
+
+
+def sharedLimiter(accountId, region, rate=KMS_CRYPTO_RATE):
+    """
+    Limiter of the quota of an account & region, created on first use and shared by all its callers in the process
+    """
+    with _sharedLock:
+        limiter = _sharedLimiters.get((accountId, region))
+        if limiter is None:
+            limiter = _sharedLimiters[(accountId, region)] = RateLimiter(rate)
+        return limiter
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Requests per second
+        :param burst: Requests allowed at once after an idle period, default to one second of requests
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Block until the tokens are available
+
+        :return: Seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,229 @@
+#
+# Recorder.py
+#
+# Capture/replay of AWS API calls for offline tests & benchmarks
+#
+# In record mode every request/response pair going through the client hooks (see ClientHooks.py) is appended to
+# a compact JSON lines file (gzip'ed if the file name ends with .gz). In replay mode the HTTP requests are
+# short-circuited and answered from the recording, in the recorded order for identical requests, optionally
+# with the recorded latencies to get realistic timings in benchmarks.
+#
+# File layout: first line is a header with the region & account of the recording, followed by one line per call
+#   {"s": service, "o": operation, "k": hash of the parameters, "h": http status, "t": latency, "r": response}
+#
+
+import os
+import io
+import gzip
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+import ClientHooks
+from Config import Config
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+class ReplayError(Exception):
+    pass
+
+
+#
+# JSON helpers for the botocore types that aren't serializable (datetime, bytes & streaming bodies)
+#
+def _encode(o):
+    if isinstance(o, datetime):
+        return {"__dt__": o.isoformat()}
+    if isinstance(o, (bytes, bytearray)):
+        return {"__b64__": base64.b64encode(o).decode()}
+    if isinstance(o, StreamingBody):
+        # only readable once, the recorder swaps in a copy before encoding
+        raise TypeError("StreamingBody must be buffered before encoding")
+    return str(o)
+
+def _decode(d):
+    if "__dt__" in d:
+        return datetime.fromisoformat(d["__dt__"])
+    if "__b64__" in d:
+        return base64.b64decode(d["__b64__"])
+    if "__stream__" in d:
+        data = base64.b64decode(d["__stream__"])
+        return StreamingBody(io.BytesIO(data), len(data))
+    return d
+
+def paramsKey(params):
+    """
+    Stable hash of the API parameters, used to match a replayed request with the recording
+    """
+    canonical = json.dumps(params, sort_keys=True, default=_encode, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class Recorder:
+    RECORD = "record"
+    REPLAY = "replay"
+    OFF = "off"
+
+    def __init__(self, path, mode=REPLAY, latency=False, latencyScale=1.0):
+        """
+        :param path: Recording file, .gz suffix to compress it
+        :param mode: Recorder.RECORD, Recorder.REPLAY or Recorder.OFF (pass-through to AWS)
+        :param latency: Replay with the recorded latencies
+        :param latencyScale: Multiplier of the recorded latencies
+        """
+        if mode not in (Recorder.RECORD, Recorder.REPLAY, Recorder.OFF):
+            raise ValueError(f"Unknown recorder mode {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latencyScale = latencyScale
+        self.header = {}
+        self.entries = []      # recorded entries (record mode)
+        self.queues = defaultdict(deque)   # (service, operation, key) -> entries (replay mode)
+        self.lock = threading.Lock()
+        self.previousSession = None
+
+    @staticmethod
+    def fromEnvironment(path, default=REPLAY):
+        """
+        Create the recorder with the mode from RECORDER_MODE (record|replay|off) and the latency option
+        from RECORDER_LATENCY (1 to replay the recorded latencies)
+        """
+        mode = os.environ.get("RECORDER_MODE", default)
+        latency = os.environ.get("RECORDER_LATENCY", "0") not in ("", "0", "false")
+        return Recorder(path, mode=mode, latency=latency)
+
+    def _open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self):
+        with self._open("r") as f:
+            lines = [line for line in f if line.strip()]
+        if len(lines) == 0:
+            raise ReplayError(f"Empty recording {self.path}")
+        self.header = json.loads(lines[0])
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ReplayError(f"Unsupported recording version {self.header.get('version')} in {self.path}")
+        self.queues.clear()
+        for line in lines[1:]:
+            # the response is decoded on every replay, each caller gets its own copy
+            entry = json.loads(line)
+            self.queues[(entry["s"], entry["o"], entry["k"])].append(entry)
+        logger.info("Loaded %d recorded calls from %s", len(lines) - 1, self.path)
+
+    def save(self):
+        session = boto3.DEFAULT_SESSION or boto3.session.Session()
+        region = session.region_name
+        if region is None and len(self.entries) > 0:
+            region = self.entries[0]["region"]
+        header = {"version": FORMAT_VERSION, "region": region}
+        header.update(self.header)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._open("w") as f:
+            f.write(json.dumps(header) + "\n")
+            for entry in self.entries:
+                entry = {k: v for k, v in entry.items() if k != "region"}
+                f.write(json.dumps(entry, default=_encode, separators=(",", ":")) + "\n")
+        logger.info("Saved %d recorded calls to %s", len(self.entries), self.path)
+
+    def start(self):
+        if self.mode == Recorder.OFF:
+            return self
+        if self.mode == Recorder.REPLAY:
+            self.load()
+            # answer everything from the recording: fixed region & dummy credentials avoid the
+            # credential provider chain (and its network lookups) when the clients are created
+            self.previousSession = boto3.DEFAULT_SESSION
+            boto3.setup_default_session(region_name=self.header.get("region"),
+                                        aws_access_key_id="replay",
+                                        aws_secret_access_key="replay")
+        ClientHooks.install()
+        ClientHooks.addListener(self)
+        self._resetIdentity()
+        return self
+
+    def stop(self):
+        if self.mode == Recorder.OFF:
+            return
+        ClientHooks.removeListener(self)
+        if self.mode == Recorder.RECORD:
+            self.save()
+        else:
+            boto3.DEFAULT_SESSION = self.previousSession
+        self._resetIdentity()
+
+    # account & region are cached process-wide, drop them so they come from the recording (or live again)
+    @staticmethod
+    def _resetIdentity():
+        Config._accountId = None
+        Config._region = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    #
+    # ClientHooks listener callbacks
+    #
+    def onRequest(self, call):
+        # hash the parameters before botocore injects defaults into them
+        call.key = paramsKey(call.params)
+
+    def onSend(self, call):
+        if self.mode != Recorder.REPLAY:
+            return None
+        with self.lock:
+            queue = self.queues.get((call.service, call.operation, call.key))
+            if not queue:
+                raise ReplayError(f"No recorded response for {call.service}.{call.operation} {call.params}")
+            # keep the last response around so repeated identical calls (e.g. a re-list) are deterministic
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+        if self.latency and entry.get("t"):
+            time.sleep(entry["t"] * self.latencyScale)
+        parsed = json.loads(json.dumps(entry["r"]), object_hook=_decode)
+        return AWSResponse(None, entry["h"], {}, None), parsed
+
+    def onResponse(self, call, http, parsed):
+        if self.mode != Recorder.RECORD or call.replayed:
+            return
+        response = {}
+        for name, value in parsed.items():
+            if isinstance(value, StreamingBody):
+                # buffer the body so both the caller and the recording can read it
+                data = value.read()
+                parsed[name] = StreamingBody(io.BytesIO(data), len(data))
+                value = {"__stream__": base64.b64encode(data).decode()}
+            elif name == "ResponseMetadata":
+                # the http headers make up most of the size and aren't used by the callers
+                value = {k: v for k, v in value.items() if k != "HTTPHeaders"}
+            response[name] = value
+        entry = {
+            "s": call.service,
+            "o": call.operation,
+            "k": call.key,
+            "h": http.status_code,
+            "t": round(call.latency, 4),
+            "r": response,
+            "region": call.region,   # only kept for the header
+        }
+        with self.lock:
+            self.entries.append(entry)
@@ -0,0 +1,69 @@
+#
+# Resolver.py
+#
+# Project scoped cache of the account id, region and name -> ARN of the project resources
+#
+# Shared by all the config objects of a Project, the JSON encoder (ArnRef) and user code, so a resource is looked up
+# at most once per project. The cache is filled opportunistically from the list & create responses of every config
+# (see Config.addResource / Config.actionKey). The account is the one of the project session (e.g. the assumed role),
+# not the process-wide Config.accountId() of the default credentials.
+#
+
+import threading
+
+import ClientHooks
+from Config import Config
+
+
+class Resolver:
+    def __init__(self, session=None, accountId=None, region=None):
+        """
+        :param session: boto3 Session of the project, None for the default session
+        :param accountId: Account id if already known (e.g. from the assumed role credentials)
+        :param region: Region of the project, default to the session region
+        """
+        self.session = session
+        self._accountId = accountId
+        self._region = region
+        self.arns = {}   # (config class name, resource name) -> ARN
+        self.lock = threading.Lock()
+
+    def accountId(self):
+        if self._accountId is None:
+            if self.session is None:
+                accountId = Config.accountId()
+            else:
+                accountId = ClientHooks.attach(self.session.client("sts")).get_caller_identity().get("Account")
+            with self.lock:
+                self._accountId = accountId
+        return self._accountId
+
+    def region(self):
+        if self._region is None:
+            if self.session is not None and self.session.region_name is not None:
+                self._region = self.session.region_name
+            else:
+                self._region = Config.region()
+        return self._region
+
+    def put(self, configClass, name, arn):
+        if arn is not None:
+            with self.lock:
+                self.arns[(configClass.__name__, name)] = arn
+
+    def get(self, configClass, name):
+        return self.arns.get((configClass.__name__, name))
+
+    def forget(self, configClass, name):
+        with self.lock:
+            self.arns.pop((configClass.__name__, name), None)
+
+    def arn(self, configObj, name):
+        """
+        ARN of the named resource of the config object, from the cache or resolved (and cached) by the config object
+        """
+        arn = self.get(type(configObj), name)
+        if arn is None:
+            arn = configObj.getArn(name)
+            self.put(type(configObj), name, arn)
+        return arn
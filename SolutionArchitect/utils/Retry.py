@@ -0,0 +1,92 @@
+#
+# Retry.py
+#
+# Retry with tight jittered backoff for eventually consistent AWS state
+#
+# IAM is eventually consistent: a role/policy that was just created (or attached) is not usable right away by
+# sts.assume_role or lambda.create_function. Instead of a worst-case fixed sleep, the dependent call itself is
+# the readiness probe - it is retried on the specific propagation error with a short, jittered backoff so the
+# dependent step starts the moment the role becomes usable.
+# https://docs.aws.amazon.com/IAM/latest/UserGuide/troubleshoot_general.html#troubleshoot_general_eventual-consistency
+#
+
+import time
+import random
+import logging
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+
+def isClientError(*codes, message=None):
+    """
+    Build a predicate matching ClientError with one of the error codes (and the message fragment if given)
+    """
+    def predicate(e):
+        if not isinstance(e, ClientError):
+            return False
+        error = e.response.get("Error", {})
+        if codes and error.get("Code") not in codes:
+            return False
+        return message is None or message.lower() in error.get("Message", "").lower()
+    return predicate
+
+
+def anyOf(*predicates):
+    return lambda e: any(p(e) for p in predicates)
+
+
+# sts.assume_role on a role this process just created, before it (or its trust policy) has propagated. Only retried
+# right after the create (IamRole.waitUntilAssumable): otherwise AccessDenied is a permanent denial (trust policy,
+# caller w/o sts:AssumeRole) and must fail at once
+newRolePropagation = isClientError("AccessDenied")
+
+# errors reported while a new role / policy attachment hasn't propagated yet
+iamPropagation = anyOf(
+    # lambda create_function: "The role defined for the function cannot be assumed by Lambda."
+    isClientError("InvalidParameterValueException", message="cannot be assumed"),
+    # lambda create_event_source_mapping: "The provided execution role does not have permissions to call ..."
+    isClientError("InvalidParameterValueException", message="execution role"),
+)
+
+
+def retry(fn, retryable, timeout=60.0, baseDelay=0.1, maxDelay=2.0, description=None):
+    """
+    Call fn() until it succeeds, retrying the errors accepted by retryable with jittered exponential backoff
+
+    :param fn: The call to make, no arguments
+    :param retryable: Predicate on the exception, True to retry
+    :param timeout: Give up (re-raise the last error) after this many seconds
+    :param baseDelay: First backoff delay in seconds
+    :param maxDelay: Cap of the backoff delay
+    :param description: Name of the operation for logging
+    :return: The result of fn()
+    """
+    deadline = time.monotonic() + timeout
+    delay = baseDelay
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if not retryable(e):
+                raise
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error("Giving up %s after %d attempts: %s", description or fn, attempt, e)
+                raise
+            # full jitter keeps concurrent waiters from probing in lock-step
+            sleep = min(random.uniform(0, delay), remaining)
+            logger.info("Retrying %s in %.2fs (attempt %d): %s", description or fn, sleep, attempt, e)
+            time.sleep(sleep)
+            delay = min(delay * 2, maxDelay)
+            attempt += 1
+
+
+def untilPropagated(fn, timeout=60.0, description=None, retryable=iamPropagation):
+    """
+    Retry fn() while IAM changes are propagating
+
+    :param retryable: Propagation errors to retry, e.g. newRolePropagation to probe a role that was just created
+    """
+    return retry(fn, retryable, timeout=timeout, description=description)
@@ -0,0 +1,199 @@
+#
+# RoleCredentials.py
+#
+# Cached & auto-refreshing credentials of an assumed IAM role
+#
+# * The temporary credentials from sts.assume_role are cached on disk, keyed by role, session name & the caller
+#   (account, or access key of the base credentials), so a new process (e.g. the next run of a lab runner) reuses
+#   them w/o any STS or IAM call while they are valid
+# * The role ARN is synthesized from the account & role name (no iam list_roles), the account is kept in the
+#   cache entry so a warm start doesn't need sts.get_caller_identity either
+# * A background timer renews the credentials before they expire, the boto3 session picks them up through
+#   botocore's RefreshableCredentials w/o blocking the API calls
+# * The regional STS endpoint is used, to avoid the latency (and single point of failure) of the global endpoint
+#
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+
+import boto3
+import botocore.session
+from botocore.credentials import CredentialProvider, RefreshableCredentials
+
+import Arn
+import ClientHooks
+from Config import Config
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".aws", "solution-architect", "credentials")
+REFRESH_MARGIN = timedelta(minutes=20)   # renew in the background this long before the expiry
+MIN_VALIDITY = timedelta(minutes=5)      # cached credentials closer to the expiry are not reused
+
+
+# credential provider of the assumed role sessions, ahead of the environment & profile providers
+class AssumedRoleProvider(CredentialProvider):
+    METHOD = "solution-architect-assume-role"
+    CANONICAL_NAME = "SolutionArchitectAssumeRole"
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+
+class RoleCredentials:
+    def __init__(self, roleName, sessionName, region=None, duration=3600, cacheDir=CACHE_DIR, accountId=None):
+        """
+        :param roleName: Name of the role to assume (in the account of the caller unless accountId is given),
+                         or the role ARN e.g. for a role in another account
+        :param sessionName: RoleSessionName, part of the cache key
+        :param region: Region of the STS endpoint & of the returned session
+        :param duration: DurationSeconds of the assumed role session
+        :param cacheDir: Directory of the credential cache, None to disable the disk cache
+        """
+        self.arn = None
+        if roleName.startswith("arn:"):
+            self.arn = roleName
+            parts = Arn.parse(roleName)
+            accountId, roleName = parts["AccountId"], parts["Name"]
+        self.roleName = roleName
+        self.sessionName = sessionName
+        self.region = region if region is not None else Config.region()
+        self.duration = duration
+        self.cacheDir = cacheDir
+        self.accountId = accountId
+        # key on the arguments & the caller, the account resolved on a cold start must not change the cache entry.
+        # W/o an account, the access key of the base credentials tells the callers apart w/o an STS call, so a switch
+        # of profile or credentials to another account doesn't reuse the credentials of the previous one
+        caller = accountId if accountId is not None else self.callerKey()
+        self.cacheKey = hashlib.sha1(f"{caller}|{roleName}|{sessionName}".encode()).hexdigest()
+        self.lock = threading.Lock()
+        self.current = None   # cache entry of the current credentials
+        self.timer = None
+
+    @staticmethod
+    def callerKey():
+        credentials = boto3.Session().get_credentials()
+        return "" if credentials is None else credentials.access_key
+
+    def cachePath(self):
+        return os.path.join(self.cacheDir, f"{self.cacheKey}.json")
+
+    def _load(self):
+        if self.cacheDir is None:
+            return None
+        try:
+            with open(self.cachePath(), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._remaining(entry) < MIN_VALIDITY:
+            return None
+        return entry
+
+    def _save(self, entry):
+        if self.cacheDir is None:
+            return
+        os.makedirs(self.cacheDir, mode=0o700, exist_ok=True)
+        # credentials are secrets: owner read/write only, replaced atomically
+        path = self.cachePath()
+        tmpPath = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmpPath, path)
+
+    @staticmethod
+    def _remaining(entry):
+        return datetime.fromisoformat(entry["Expiration"]) - datetime.now(timezone.utc)
+
+    def roleArn(self):
+        if self.arn is not None:
+            return self.arn
+        if self.accountId is None:
+            self.accountId = Config.accountId()
+        return Arn.iamRole(self.accountId, self.roleName)
+
+    def _assume(self):
+        sts = ClientHooks.attach(boto3.client("sts", region_name=self.region,
+                                              endpoint_url=f"https://sts.{self.region}.amazonaws.com"))
+        roleArn = self.roleArn()
+        # not retried: the role exists before the project runs, an AccessDenied is a permanent denial
+        # (a role created in the same run is awaited by IamRole.waitUntilAssumable)
+        response = sts.assume_role(RoleArn=roleArn, RoleSessionName=self.sessionName, DurationSeconds=self.duration)
+        credentials = response["Credentials"]
+        entry = {
+            "RoleArn": roleArn,
+            "AccountId": self.accountId,
+            "AccessKeyId": credentials["AccessKeyId"],
+            "SecretAccessKey": credentials["SecretAccessKey"],
+            "SessionToken": credentials["SessionToken"],
+            "Expiration": credentials["Expiration"].astimezone(timezone.utc).isoformat(),
+        }
+        self._save(entry)
+        logger.info("Assumed role %s, expires at %s", roleArn, entry["Expiration"])
+        return entry
+
+    def _scheduleRefresh(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        delay = (self._remaining(self.current) - REFRESH_MARGIN).total_seconds()
+        self.timer = threading.Timer(max(delay, 0), self._backgroundRefresh)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _backgroundRefresh(self):
+        try:
+            with self.lock:
+                self.current = self._assume()
+                self._scheduleRefresh()
+        except Exception as e:
+            # the next API call will retry synchronously through RefreshableCredentials
+            logger.warning("Background refresh of role %s failed: %s", self.roleName, e)
+
+    def get(self):
+        """
+        Current credentials, from memory, the disk cache or sts.assume_role (in that order)
+
+        :return: The cache entry with AccessKeyId, SecretAccessKey, SessionToken, Expiration, RoleArn & AccountId
+        """
+        with self.lock:
+            if self.current is None or self._remaining(self.current) < MIN_VALIDITY:
+                self.current = self._load() or self._assume()
+                self.accountId = self.current["AccountId"]
+                self._scheduleRefresh()
+            return self.current
+
+    # refresh callback of botocore's RefreshableCredentials
+    def _metadata(self):
+        entry = self.get()
+        return {
+            "access_key": entry["AccessKeyId"],
+            "secret_key": entry["SecretAccessKey"],
+            "token": entry["SessionToken"],
+            "expiry_time": entry["Expiration"],
+        }
+
+    def session(self):
+        """
+        boto3 Session using the assumed role credentials, renewed automatically
+        """
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=self._metadata(),
+            refresh_using=self._metadata,
+            method="solution-architect-assume-role")
+        botocoreSession = botocore.session.get_session()
+        botocoreSession.get_component("credential_provider").insert_before("env", AssumedRoleProvider(credentials))
+        return boto3.Session(botocore_session=botocoreSession, region_name=self.region)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
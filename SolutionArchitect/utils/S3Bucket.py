@@ -0,0 +1,179 @@
+#
+# S3Bucket.py
+#
+# Class to manage S3 buckets encrypted with a KMS key (SSE-KMS) via boto3
+# https://docs.aws.amazon.com/AmazonS3/latest/userguide/bucket-key.html
+#
+# With SSE-KMS every object write/read calls KMS for a data key (one request per object, KMS quota & cost).
+# An S3 Bucket Key is a bucket level key derived from the KMS key: S3 generates the data keys locally and only
+# calls KMS when the bucket key is renewed, which cuts the KMS requests by orders of magnitude for the data lake labs.
+#
+#   "c4w1-data-001": {                     # bucket names are lowercase
+#       "KmsKey": {"$arn": "Kms/Key-001"},   # key of the project (reference), or key ARN / alias ARN
+#       "BucketKeyEnabled": true,           # optional, default true
+#       "Region": "us-west-2",              # optional, default to the region of the session
+#       "Tags": [{"Key": ..., "Value": ...}]
+#   }
+#
+# putObject() checks the bucket uses SSE-KMS with a bucket key before writing, and writes with the same settings.
+#
+
+import sys
+import logging
+from botocore.exceptions import ClientError
+
+from Config import Config, Status, ArnRef, Deferred
+import Arn
+from StructLog import compact
+
+logger = logging.getLogger(__name__)
+
+# objects per delete_objects request
+DELETE_BATCH = 1000
+
+
+class S3Bucket(Config):
+    arnType = "s3:bucket"
+
+    def __init__(self, inputMap=None, session=None):
+        super().__init__("s3", inputMap=inputMap, session=session)
+        self.encryption = {}   # bucket -> default encryption rule, see getEncryption()
+
+    def do_list(self):
+        try:
+            for bucket in self.botoClient.list_buckets()['Buckets']:
+                attribute = {
+                    'Arn': Arn.build(self.arnType, bucket['Name'], None),
+                    'CreationDate': bucket['CreationDate'],
+                }
+                self.addResource(bucket['Name'], attribute)
+            return Status.SUCCESS, self.resourceMap
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    # key id of the definition: a reference to a key of the project, or a key / alias ARN
+    @staticmethod
+    def kmsKeyId(keyConfig):
+        keyId = keyConfig['KmsKey']
+        return keyId.resolve() if isinstance(keyId, (ArnRef, Deferred)) else keyId
+
+    def do_create(self, client, key, keyConfig):
+        try:
+            logger.info("do_create bucket: %s, %s", key, compact(keyConfig))
+            region = keyConfig.get('Region', self.getRegion())
+            # us-east-1 is the default location and must not be given as a location constraint
+            location = {} if region == 'us-east-1' else {'CreateBucketConfiguration': {'LocationConstraint': region}}
+            response = client.create_bucket(Bucket=key, **location)
+
+            rule = {
+                'ApplyServerSideEncryptionByDefault': {
+                    'SSEAlgorithm': 'aws:kms',
+                    'KMSMasterKeyID': self.kmsKeyId(keyConfig),
+                },
+                'BucketKeyEnabled': keyConfig.get('BucketKeyEnabled', True),
+            }
+            client.put_bucket_encryption(Bucket=key, ServerSideEncryptionConfiguration={'Rules': [rule]})
+            with self.lock:
+                self.encryption[key] = rule
+
+            tags = self.resourceTags(key, keyConfig.get('Tags'))
+            if tags:
+                client.put_bucket_tagging(Bucket=key, Tagging={'TagSet': tags})
+            logger.info("Created bucket %s with KMS key %s", key, rule['ApplyServerSideEncryptionByDefault']['KMSMasterKeyID'])
+            # create_bucket has no ARN in the response, it's synthesized (see Config.getArn)
+            return Status.SUCCESS, response
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    def do_delete(self, client, key, keyConfig):
+        try:
+            # a bucket must be empty to be deleted
+            for page in client.get_paginator('list_object_versions').paginate(Bucket=key):
+                objects = [{'Key': o['Key'], 'VersionId': o['VersionId']}
+                           for o in page.get('Versions', []) + page.get('DeleteMarkers', [])]
+                for start in range(0, len(objects), DELETE_BATCH):
+                    client.delete_objects(Bucket=key, Delete={'Objects': objects[start:start + DELETE_BATCH], 'Quiet': True})
+            response = client.delete_bucket(Bucket=key)
+            with self.lock:
+                self.encryption.pop(key, None)
+            logger.info("Deleted bucket %s", key)
+            return Status.SUCCESS, response
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    def getEncryption(self, bucket):
+        """
+        Default encryption rule of the bucket, fetched once with get_bucket_encryption (known w/o call for the
+        buckets created by this config)
+        """
+        with self.lock:
+            if bucket in self.encryption:
+                return self.encryption[bucket]
+        response = self.botoClient.get_bucket_encryption(Bucket=bucket)
+        rule = response['ServerSideEncryptionConfiguration']['Rules'][0]
+        with self.lock:
+            self.encryption[bucket] = rule
+        return rule
+
+    def putObject(self, bucket, key, body, **params):
+        """
+        Write an object encrypted with the KMS key & the bucket key of the bucket default encryption. The default
+        encryption is checked before the write and the SSE-KMS parameters are sent explicitly, so the object is
+        either stored with the bucket key or not stored at all
+
+        :param params: Other put_object parameters, e.g. ContentType
+        :return: The put_object response, or None if the bucket doesn't use SSE-KMS with a bucket key or the write failed
+        """
+        try:
+            rule = self.getEncryption(bucket)
+        except ClientError as e:
+            logger.error(e)
+            return None
+        default = rule.get('ApplyServerSideEncryptionByDefault', {})
+        if default.get('SSEAlgorithm') != 'aws:kms' or not rule.get('BucketKeyEnabled', False):
+            logger.error("Bucket %s encrypts with %s, bucket key %s - each access would call KMS", bucket,
+                         default.get('SSEAlgorithm'), rule.get('BucketKeyEnabled', False))
+            return None
+        encryption = {'ServerSideEncryption': 'aws:kms', 'BucketKeyEnabled': True}
+        if default.get('KMSMasterKeyID'):
+            encryption['SSEKMSKeyId'] = default['KMSMasterKeyID']
+        try:
+            return self.botoClient.put_object(Bucket=bucket, Key=key, Body=body, **{**params, **encryption})
+        except ClientError as e:
+            logger.error(e)
+            return None
+
+    def getObject(self, bucket, key):
+        try:
+            return self.botoClient.get_object(Bucket=bucket, Key=key)['Body'].read()
+        except ClientError as e:
+            logger.error(e)
+            return None
+
+
+#if this .py is executed directly on the command line
+def main(argv):
+    # argv[0] is the script name, print remaining arguments separated by space without the bracket
+    print("Running :", " ".join(argv[0:]))
+
+    # if no additonal arguments are passed, print usage help
+    if len(argv) != 2 or argv[1] not in ["create", "delete", "list"]:
+        print(f"Usage: python3 {argv[0]} <create|delete|list> ")
+        return
+    else:
+        # if additional arguments are passed, proceed with the action
+        bucket = S3Bucket()
+        action = argv[1]
+        if action == "create":
+            bucket.create()
+        elif action == "delete":
+            bucket.delete()
+        elif action == "list":
+            print(bucket.list())
+
+
+if __name__ == "__main__":
+    main(sys.argv)
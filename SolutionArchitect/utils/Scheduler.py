@@ -0,0 +1,156 @@
+#
+# Scheduler.py
+#
+# Run a dependency graph of tasks with a thread pool
+#
+# Each node is started as soon as all its dependencies have completed successfully, so independent nodes
+# (e.g. a KMS key and an unrelated IAM policy) run at the same time. The tasks return (Status, result) like the
+# config operations. Once a task fails no new task is started (the in-flight tasks complete), matching the
+# stop-on-first-failure behavior of the serial Project operations.
+#
+# orderedMap() is the flat counterpart for bulk calls (e.g. Kms.encryptMany): a bounded window of independent calls
+# in flight over a stream of items, with the results in the input order.
+#
+
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from Config import Status
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+
+class CycleError(ValueError):
+    pass
+
+
+class Scheduler:
+    def __init__(self, maxWorkers=DEFAULT_WORKERS, failFast=True):
+        self.maxWorkers = maxWorkers
+        self.failFast = failFast
+        self.tasks = {}         # node -> callable returning (Status, result)
+        self.dependencies = {}  # node -> set of nodes it depends on
+        self.timings = {}       # node -> seconds spent in the task
+
+    def add(self, node, task, dependencies=()):
+        self.tasks[node] = task
+        self.dependencies.setdefault(node, set()).update(dependencies)
+
+    def addDependency(self, node, dependency):
+        self.dependencies.setdefault(node, set()).add(dependency)
+
+    def reversed(self):
+        """
+        Scheduler with the same tasks & reversed edges, e.g. to tear down in reverse dependency order
+        """
+        other = Scheduler(self.maxWorkers, self.failFast)
+        for node, task in self.tasks.items():
+            other.add(node, task)
+        for node, dependencies in self.dependencies.items():
+            for dependency in dependencies:
+                if dependency in self.tasks:
+                    other.addDependency(dependency, node)
+        return other
+
+    def order(self):
+        """
+        Topological order of the nodes (dependencies first)
+
+        :raises CycleError: if the dependencies contain a cycle
+        """
+        pending = {node: self._deps(node) for node in self.tasks}
+        order = []
+        while pending:
+            ready = [node for node, deps in pending.items() if not deps]
+            if not ready:
+                raise CycleError(f"Dependency cycle between {list(pending.keys())}")
+            for node in ready:
+                order.append(node)
+                del pending[node]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    # dependencies of the node within the graph, references to nodes outside the graph are already satisfied
+    def _deps(self, node):
+        return {d for d in self.dependencies.get(node, ()) if d in self.tasks and d != node}
+
+    def _timed(self, node):
+        start = time.perf_counter()
+        try:
+            return self.tasks[node]()
+        finally:
+            self.timings[node] = time.perf_counter() - start
+
+    def run(self):
+        """
+        Execute the tasks, in parallel as allowed by the dependencies
+
+        :return: dictionary of node -> (Status, result), nodes that were not started are absent
+        """
+        self.order()   # validate before starting anything
+        remaining = {node: self._deps(node) for node in self.tasks}
+        dependents = {node: set() for node in self.tasks}
+        for node, deps in remaining.items():
+            for dep in deps:
+                dependents[dep].add(node)
+
+        results = {}
+        failed = False
+        with ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix="scheduler") as executor:
+            running = {}
+            def submitReady():
+                for node in [n for n, deps in remaining.items() if not deps]:
+                    del remaining[node]
+                    running[executor.submit(self._timed, node)] = node
+
+            submitReady()
+            while running:
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    try:
+                        status, result = future.result()
+                    except Exception as e:
+                        logger.exception("Task %s raised an exception", node)
+                        status, result = Status.FAILED, e
+                    results[node] = (status, result)
+                    if status == Status.FAILED:
+                        failed = True
+                        continue
+                    for dependent in dependents[node]:
+                        if dependent in remaining:
+                            remaining[dependent].discard(node)
+                if not (failed and self.failFast):
+                    submitReady()
+
+        for node in remaining:
+            logger.warning("Skipped %s due to failed dependencies", node)
+        return results
+
+
+def orderedMap(fn, items, maxWorkers=DEFAULT_WORKERS, window=None):
+    """
+    fn(item) for each item with a thread pool, yielded in the input order
+
+    The items are consumed lazily and at most window calls (default 2 x maxWorkers) are in flight, so a stream
+    of any length is processed in constant memory. An exception of fn is raised when its result is reached.
+    """
+    window = window or 2 * maxWorkers
+    with ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="pipeline") as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # the consumer stopped early (or fn raised), don't start the calls still queued
+            for future in pending:
+                future.cancel()
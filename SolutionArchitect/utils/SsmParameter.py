@@ -0,0 +1,148 @@
+#
+# SsmParameter.py
+#
+# Class to manage SSM Parameter Store parameters (configuration values & secrets) via boto3
+# https://docs.aws.amazon.com/systems-manager/latest/userguide/systems-manager-parameter-store.html
+#
+#   "/c4w1/db/password": {
+#       "Value": "...",
+#       "Type": "SecureString",              # String, StringList or SecureString
+#       "KmsKey": {"$arn": "Kms/Key-001"},   # optional, key of a SecureString, default to the AWS managed aws/ssm key
+#       "Description": "...",                # optional
+#       "Tags": [{"Key": ..., "Value": ...}]
+#   }
+#
+# Reads go through a ParameterCache (TTL, background refresh, batched get_parameters), Secrets Manager secrets are
+# read through their parameter reference: getValue("/aws/reference/secretsmanager/<secret id>")
+#
+
+import sys
+import logging
+from botocore.exceptions import ClientError
+
+from Config import Config, Status, ArnRef, Deferred
+import Arn
+from ParameterCache import ParameterCache, ParameterNotFound, DEFAULT_TTL
+from StructLog import compact
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(value):
+    return value.resolve() if isinstance(value, (ArnRef, Deferred)) else value
+
+
+class SsmParameter(Config):
+    arnType = "ssm:parameter"
+
+    def __init__(self, inputMap=None, session=None, ttl=DEFAULT_TTL):
+        """
+        :param ttl: Seconds the values read by getValue() are cached
+        """
+        super().__init__("ssm", inputMap=inputMap, session=session)
+        self.ttl = ttl
+        self.cache = None   # see getCache()
+
+    def do_list(self):
+        try:
+            for page in self.botoClient.get_paginator('describe_parameters').paginate():
+                for parameter in page['Parameters']:
+                    attribute = {
+                        'Arn': Arn.ssmParameter(self.getAccountId(), self.getRegion(), parameter['Name']),
+                        'Type': parameter['Type'],
+                        'Version': parameter.get('Version'),
+                    }
+                    self.addResource(parameter['Name'], attribute)
+            return Status.SUCCESS, self.resourceMap
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    def do_create(self, client, key, keyConfig):
+        try:
+            # the value is not logged, it may be a secret
+            logger.info("do_create parameter: %s, %s", key, compact({k: v for k, v in keyConfig.items() if k != 'Value'}))
+            params = {
+                'Name': key,
+                'Value': _resolve(keyConfig['Value']),
+                'Type': keyConfig.get('Type', 'String'),
+            }
+            if 'KmsKey' in keyConfig:
+                params['KeyId'] = _resolve(keyConfig['KmsKey'])
+            if 'Description' in keyConfig:
+                params['Description'] = keyConfig['Description']
+            tags = self.resourceTags(key, keyConfig.get('Tags'))
+            if tags:
+                params['Tags'] = tags
+            response = client.put_parameter(**params)
+            self.getCache().invalidate(key)
+            logger.info("Created parameter %s version %s", key, response.get('Version'))
+            return Status.SUCCESS, response
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    def do_delete(self, client, key, keyConfig):
+        try:
+            response = client.delete_parameter(Name=key)
+            self.getCache().invalidate(key)
+            logger.info("Deleted parameter %s", key)
+            return Status.SUCCESS, response
+        except ClientError as e:
+            logger.error(e)
+            return Status.FAILED, e
+
+    def getCache(self):
+        with self.lock:
+            if self.cache is None:
+                self.cache = ParameterCache(self.botoClient, ttl=self.ttl)
+            return self.cache
+
+    def getValue(self, name):
+        """
+        Value of a parameter (decrypted) or of a Secrets Manager secret reference, from memory within the TTL
+
+        :return: The value, or None on error
+        """
+        try:
+            return self.getCache().get(name)
+        except (ClientError, ParameterNotFound) as e:
+            logger.error(e)
+            return None
+
+    def getValues(self, names):
+        """
+        Values of several parameters, the ones not cached are fetched in batches of 10
+
+        :return: dictionary of name -> value, or None on error
+        """
+        try:
+            return self.getCache().getMany(names)
+        except (ClientError, ParameterNotFound) as e:
+            logger.error(e)
+            return None
+
+
+#if this .py is executed directly on the command line
+def main(argv):
+    # argv[0] is the script name, print remaining arguments separated by space without the bracket
+    print("Running :", " ".join(argv[0:]))
+
+    # if no additonal arguments are passed, print usage help
+    if len(argv) != 2 or argv[1] not in ["create", "delete", "list"]:
+        print(f"Usage: python3 {argv[0]} <create|delete|list> ")
+        return
+    else:
+        # if additional arguments are passed, proceed with the action
+        parameter = SsmParameter()
+        action = argv[1]
+        if action == "create":
+            parameter.create()
+        elif action == "delete":
+            parameter.delete()
+        elif action == "list":
+            print(parameter.list())
+
+
+if __name__ == "__main__":
+    main(sys.argv)
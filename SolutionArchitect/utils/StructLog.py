@@ -0,0 +1,140 @@
+#
+# StructLog.py
+#
+# Logging setup for bulk operations - keep formatting & I/O off the hot path
+#
+# * configure() routes the log records through a queue to a background thread, which lays out (timestamp, level...)
+#   & writes them. The calling thread only renders the message of the enabled records with its arguments, before
+#   the caller can mutate them, so the log calls use lazy %-style arguments instead of f-strings to cost nothing
+#   when the level is disabled: logger.info("Created key %s", key)
+# * compact() wraps configs & responses so they are only rendered when the record is emitted, and rendered as
+#   a one-line summary in summary mode instead of dumping the entire structure
+# * fields() renders key=value pairs for structured, grep-friendly messages
+#
+
+import sys
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(threadName)s %(name)s %(message)s"
+
+_listener = None
+_summary = False
+_exceptionFormatter = logging.Formatter()
+
+
+#
+# Queue handler that defers the layout of the records to the listener thread
+# (the standard QueueHandler formats the whole record in the calling thread)
+#
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the arguments (configs, responses) may be mutated once the call returns, render the message & the
+        # exception now and hand the listener plain strings
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exceptionFormatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure(level=logging.INFO, summary=False, stream=None, fmt=DEFAULT_FORMAT):
+    """
+    Setup the root logger with a queue based handler, records are formatted & written by a background thread
+
+    :param level: The root logging level
+    :param summary: Compact per-key summary instead of full configs & responses
+    :param stream: Output stream, default to stderr
+    :return: The QueueListener running the background thread
+    """
+    global _listener, _summary
+    _summary = summary
+    if _listener is not None:
+        # already configured, only adjust the options
+        logging.getLogger().setLevel(level)
+        return _listener
+
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt))
+
+    logQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DeferredQueueHandler(logQueue))
+
+    _listener = logging.handlers.QueueListener(logQueue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return _listener
+
+
+def shutdown():
+    """
+    Flush the pending records and stop the background thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def summaryMode():
+    return _summary
+
+
+#
+# Lazy rendering of a config definition or an API response
+#
+class _Compact:
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        if not _summary:
+            return str(self.obj)
+        return summarize(self.obj)
+
+
+def summarize(obj):
+    """
+    One-line summary of a config definition or an API response
+    """
+    if isinstance(obj, dict):
+        meta = obj.get("ResponseMetadata")
+        if isinstance(meta, dict):
+            # API response : status & request id are enough to trace the call
+            return f"<response {meta.get('HTTPStatusCode')} {meta.get('RequestId')}>"
+        keys = list(obj.keys())
+        shown = ", ".join(str(k) for k in keys[:4])
+        more = f", +{len(keys) - 4}" if len(keys) > 4 else ""
+        return f"<{len(keys)} keys: {shown}{more}>"
+    if isinstance(obj, (list, tuple, set)):
+        return f"<{len(obj)} items>"
+    if isinstance(obj, (bytes, bytearray)):
+        return f"<{len(obj)} bytes>"
+    text = str(obj)
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+def compact(obj):
+    return _Compact(obj)
+
+
+class _Fields:
+    def __init__(self, items):
+        self.items = items
+
+    def __str__(self):
+        return " ".join(f"{k}={summarize(v) if _summary else v}" for k, v in self.items.items())
+
+
+def fields(**items):
+    """
+    Lazy key=value rendering, e.g. logger.info("%s", fields(action="create", key=key))
+    """
+    return _Fields(items)
@@ -0,0 +1,107 @@
+import unittest
+import boto3
+from botocore.stub import Stubber
+
+from Config import Config, Status
+from IamPolicy import IamPolicy
+from IamRole import IamRole
+from Kms import Kms
+from ApiBudget import api_budget, ApiBudgetExceeded
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+
+policy_definition = {
+    "Common-UnitTest-IamPolicy-001" : {
+        "Version": "2012-10-17",
+        "Statement": [{"Effect": "Allow", "Action": ["s3:ListBucket"], "Resource": ["*"]}]
+    }
+}
+
+def keyEntry(keyId):
+    return {"KeyId": keyId, "KeyArn": f"arn:aws:kms:{REGION}:{ACCOUNT_ID}:key/{keyId}"}
+
+def aliasEntry(name, keyId):
+    return {"AliasName": f"alias/{name}", "AliasArn": f"arn:aws:kms:{REGION}:{ACCOUNT_ID}:alias/{name}", "TargetKeyId": keyId}
+
+
+# Pin the number of API calls of the config operations - the AWS responses are stubbed
+class apiBudgetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.session = boto3.Session(region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test")
+        Config._accountId = ACCOUNT_ID
+        Config._region = REGION
+
+    @classmethod
+    def tearDownClass(cls):
+        Config._accountId = None
+        Config._region = None
+
+    def test_budget_exceeded(self):
+        kms = Kms(session=self.session)
+        with Stubber(kms.botoClient) as stubber:
+            for _ in range(2):
+                stubber.add_response("list_aliases", {"Aliases": []}, {})
+                stubber.add_response("list_keys", {"Keys": []}, {})
+            with self.assertRaises(ApiBudgetExceeded):
+                with api_budget(kms={"list_keys": 1}):
+                    kms.list()
+                    kms.list()
+
+    def test_budget_getArn(self):
+        # IAM ARNs of the defined resources are synthesized w/o any lookup
+        role = IamRole({"Common-UnitTest-IamRole-001": {}}, session=self.session)
+        policy = IamPolicy(policy_definition, session=self.session)
+        with api_budget(iam={"*": 0}, sts={"*": 0}):
+            self.assertEqual(role.getArn("Common-UnitTest-IamRole-001"), f"arn:aws:iam::{ACCOUNT_ID}:role/Common-UnitTest-IamRole-001")
+            self.assertEqual(policy.getArn("Common-UnitTest-IamPolicy-001"), f"arn:aws:iam::{ACCOUNT_ID}:policy/Common-UnitTest-IamPolicy-001")
+
+        # other roles may live under a path, they are looked up
+        serviceRoleArn = f"arn:aws:iam::{ACCOUNT_ID}:role/service-role/Lambda-Execution"
+        with Stubber(role.botoClient) as stubber:
+            stubber.add_response("list_roles", {"Roles": [{"Path": "/service-role/", "RoleName": "Lambda-Execution",
+                                                           "RoleId": "AROAEXAMPLE000000000001", "Arn": serviceRoleArn,
+                                                           "CreateDate": "2024-01-01T00:00:00Z"}]})
+            with api_budget(iam={"ListRoles": 1, "*": 1}):
+                self.assertEqual(role.getArn("Lambda-Execution"), serviceRoleArn)
+
+    def test_budget_kms_list(self):
+        kms = Kms(session=self.session)
+        with Stubber(kms.botoClient) as stubber:
+            # one alias sweep joined to the keys, independent of the number of keys
+            stubber.add_response("list_aliases", {"Aliases": [aliasEntry("Key-001", "1111")]}, {})
+            stubber.add_response("list_keys", {"Keys": [keyEntry("1111"), keyEntry("2222")]}, {})
+            with api_budget(kms={"ListKeys": 1, "ListAliases": 1}):
+                status, _ = kms.list()
+                self.assertEqual(status, Status.SUCCESS)
+                # resolved from the resource map w/o a re-list
+                self.assertEqual(kms.getArn("Key-001"), keyEntry("1111")["KeyArn"])
+                self.assertEqual(kms.getArn("2222"), keyEntry("2222")["KeyArn"])
+
+            # the metadata is described on first use only
+            stubber.add_response("describe_key", {"KeyMetadata": {"KeyId": "1111", "KeyState": "Enabled"}},
+                                 {"KeyId": keyEntry("1111")["KeyArn"]})
+            with api_budget(kms={"DescribeKey": 1, "ListKeys": 0}):
+                self.assertEqual(kms.getKeyMetadata("Key-001")["KeyState"], "Enabled")
+                self.assertEqual(kms.getKeyMetadata("Key-001")["KeyState"], "Enabled")
+
+    def test_budget_create_delete(self):
+        policy = IamPolicy(policy_definition, session=self.session)
+        name = "Common-UnitTest-IamPolicy-001"
+        arn = f"arn:aws:iam::{ACCOUNT_ID}:policy/{name}"
+        with Stubber(policy.botoClient) as stubber:
+            stubber.add_response("list_policies", {"Policies": []}, {})
+            stubber.add_response("create_policy", {"Policy": {"PolicyName": name, "Arn": arn}})
+            with api_budget(iam={"ListPolicies": 1, "CreatePolicy": 1, "*": 2}):
+                status, result = policy.create()
+                self.assertEqual(result["SuccessKeys"], [name])
+
+            stubber.add_response("list_policies", {"Policies": [{"PolicyName": name, "Arn": arn, "PolicyId": "ANPAEXAMPLE000000000001", "Path": "/"}]}, {})
+            stubber.add_response("delete_policy", {}, {"PolicyArn": arn})
+            with api_budget(iam={"ListPolicies": 1, "DeletePolicy": 1, "*": 2}):
+                status, result = policy.delete()
+                self.assertEqual(result["SuccessKeys"], [name])
+
+if __name__ == "__main__":
+    unittest.main()
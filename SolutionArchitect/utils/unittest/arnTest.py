@@ -0,0 +1,41 @@
+import unittest
+import Arn
+
+class arnTest(unittest.TestCase):
+
+    def test_arn_iam(self):
+        self.assertEqual(Arn.iamRole("123456789012", "Role-001"), "arn:aws:iam::123456789012:role/Role-001")
+        self.assertEqual(Arn.iamPolicy("123456789012", "Policy-001"), "arn:aws:iam::123456789012:policy/Policy-001")
+        self.assertEqual(Arn.awsManagedPolicy("service-role/AmazonAPIGatewayPushToCloudWatchLogs"),
+                         "arn:aws:iam::aws:policy/service-role/AmazonAPIGatewayPushToCloudWatchLogs")
+
+    def test_arn_regional(self):
+        self.assertEqual(Arn.snsTopic("123456789012", "us-east-1", "POC1-Topic"), "arn:aws:sns:us-east-1:123456789012:POC1-Topic")
+        self.assertEqual(Arn.sqsQueue("123456789012", "us-east-1", "POC1-Queue"), "arn:aws:sqs:us-east-1:123456789012:POC1-Queue")
+        self.assertEqual(Arn.dynamodbTable("123456789012", "us-east-1", "POC1_orders"), "arn:aws:dynamodb:us-east-1:123456789012:table/POC1_orders")
+        # both forms of the alias name are accepted
+        self.assertEqual(Arn.kmsAlias("123456789012", "us-west-2", "alias/Key-001"), "arn:aws:kms:us-west-2:123456789012:alias/Key-001")
+        self.assertEqual(Arn.kmsAlias("123456789012", "us-west-2", "Key-001"), "arn:aws:kms:us-west-2:123456789012:alias/Key-001")
+        # hierarchical & flat parameter names
+        self.assertEqual(Arn.ssmParameter("123456789012", "us-east-1", "/c4w1/db/password"), "arn:aws:ssm:us-east-1:123456789012:parameter/c4w1/db/password")
+        self.assertEqual(Arn.ssmParameter("123456789012", "us-east-1", "Flag"), "arn:aws:ssm:us-east-1:123456789012:parameter/Flag")
+
+    def test_arn_unsupported(self):
+        # opaque ids can't be synthesized, regional ARNs require the region
+        self.assertFalse(Arn.supported("kms:key"))
+        with self.assertRaises(ValueError):
+            Arn.build("kms:key", "Key-001", "123456789012", "us-east-1")
+        with self.assertRaises(ValueError):
+            Arn.build("sns:topic", "POC1-Topic", "123456789012")
+
+    def test_arn_parse(self):
+        parsed = Arn.parse("arn:aws:iam::123456789012:role/service-role/Role-001")
+        self.assertEqual(parsed["Service"], "iam")
+        self.assertEqual(parsed["ResourceType"], "role")
+        self.assertEqual(parsed["Name"], "Role-001")
+        parsed = Arn.parse(Arn.snsTopic("123456789012", "us-east-1", "POC1-Topic"))
+        self.assertEqual(parsed["Region"], "us-east-1")
+        self.assertEqual(parsed["Name"], "POC1-Topic")
+
+if __name__ == "__main__":
+    unittest.main()
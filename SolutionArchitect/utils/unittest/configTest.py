@@ -1,5 +1,7 @@
+import os
 import unittest
 from Config import Config, Status
+from Recorder import Recorder
 # import UnknownServiceError exception from botocore
 from botocore.exceptions import UnknownServiceError
 
@@ -8,6 +10,9 @@ class configTest(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         print("setUpClass")
+        # replay the recorded AWS responses, RECORDER_MODE=record|off to run against AWS
+        cls.recorder = Recorder.fromEnvironment(os.path.join(os.path.dirname(__file__), "cassettes", "configTest.jsonl"))
+        cls.recorder.start()
         # sample config JSON to drive the various functionalities for the
         # config base class
         cls.config_definition = {
@@ -24,6 +29,10 @@ class configTest(unittest.TestCase):
         }
         cls.testConfig = Config(botoName="s3", inputMap=cls.config_definition)
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.recorder.stop()
+
     def test_config_base(self):
         # supply dummy botoName - config isn't proper to instantiate any service - expects UnknownServiceError
         with self.assertRaises(UnknownServiceError):
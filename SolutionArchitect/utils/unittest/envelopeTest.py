@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import unittest
+import boto3
+from botocore.stub import Stubber
+from botocore.exceptions import ClientError
+
+from Envelope import Envelope, EnvelopeError
+from ApiBudget import api_budget
+
+KEY_ARN = "arn:aws:kms:us-east-1:123456789012:key/1111"
+
+class envelopeTest(unittest.TestCase):
+    def setUp(self):
+        session = boto3.Session(region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        self.client = session.client("kms")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def addDataKey(self, encryptedKey=b"encrypted-data-key-1", context=None):
+        dataKey = os.urandom(32)
+        self.stubber.add_response("generate_data_key", {"Plaintext": dataKey, "CiphertextBlob": encryptedKey, "KeyId": KEY_ARN},
+                                  {"KeyId": KEY_ARN, "KeySpec": "AES_256", "EncryptionContext": context or {}})
+        return dataKey
+
+    def test_cached_data_key(self):
+        envelope = Envelope(self.client)
+        dataKey = self.addDataKey(context={"Table": "Orders"})
+        # one KMS call per side for many records
+        with api_budget(kms={"GenerateDataKey": 1, "*": 1}):
+            messages = [envelope.encrypt(KEY_ARN, f"record {i}", {"Table": "Orders"}) for i in range(1000)]
+        self.stubber.add_response("decrypt", {"Plaintext": dataKey, "KeyId": KEY_ARN},
+                                  {"CiphertextBlob": b"encrypted-data-key-1", "EncryptionContext": {"Table": "Orders"}})
+        with api_budget(kms={"Decrypt": 1, "*": 1}):
+            decrypter = Envelope(self.client)
+            plainTexts = [decrypter.decrypt(m, {"Table": "Orders"}) for m in messages]
+        self.assertEqual(plainTexts, [f"record {i}".encode() for i in range(1000)])
+        self.stubber.assert_no_pending_responses()
+
+    def test_cache_limits(self):
+        envelope = Envelope(self.client, maxMessages=2)
+        self.addDataKey(b"encrypted-data-key-1")
+        self.addDataKey(b"encrypted-data-key-2")
+        messages = [envelope.encrypt(KEY_ARN, b"x" * 10000) for _ in range(3)]
+        self.assertEqual([m[6:26] for m in messages], [b"encrypted-data-key-1"] * 2 + [b"encrypted-data-key-2"])
+        self.stubber.assert_no_pending_responses()
+
+    def test_tampering(self):
+        envelope = Envelope(self.client)
+        dataKey = self.addDataKey(context={"Purpose": "test"})
+        message = envelope.encrypt(KEY_ARN, "secret", {"Purpose": "test"})
+        self.stubber.add_response("decrypt", {"Plaintext": dataKey})
+        with self.assertRaises(EnvelopeError):
+            envelope.decrypt(message[:-1] + bytes([message[-1] ^ 1]), {"Purpose": "test"})
+        # the encryption context is bound to the data key by KMS
+        self.stubber.add_client_error("decrypt", "InvalidCiphertextException")
+        with self.assertRaises(ClientError):
+            envelope.decrypt(message, {"Purpose": "other"})
+        with self.assertRaises(EnvelopeError):
+            envelope.decrypt(b"not an envelope")
+
+    def test_stream(self):
+        envelope = Envelope(self.client)
+        dataKey = self.addDataKey()
+        plainText = os.urandom(10 * 1000 + 7)
+        encrypted = io.BytesIO()
+        self.assertEqual(envelope.encryptStream(KEY_ARN, io.BytesIO(plainText), encrypted, frameSize=1000), len(plainText))
+        self.stubber.add_response("decrypt", {"Plaintext": dataKey})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plain.bin")
+            self.assertEqual(envelope.decryptStream(io.BytesIO(encrypted.getvalue()), path), len(plainText))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), plainText)
+        self.stubber.assert_no_pending_responses()
+
+    def test_stream_truncated(self):
+        envelope = Envelope(self.client)
+        dataKey = self.addDataKey()
+        self.stubber.add_response("decrypt", {"Plaintext": dataKey})
+        encrypted = io.BytesIO()
+        envelope.encryptStream(KEY_ARN, io.BytesIO(b"x" * 3000), encrypted, frameSize=1000)
+        frame = 5 + 1000 + 16
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plain.bin")
+            # dropping the last frame: the previous one isn't flagged final
+            with self.assertRaises(EnvelopeError):
+                envelope.decryptStream(io.BytesIO(encrypted.getvalue()[:-frame]), path)
+            # swapping two frames fails the sequence number
+            data = encrypted.getvalue()
+            headerSize = len(data) - 3 * frame
+            swapped = data[:headerSize] + data[headerSize + frame:headerSize + 2 * frame] + data[headerSize:headerSize + frame] + data[-frame:]
+            with self.assertRaises(EnvelopeError):
+                envelope.decryptStream(io.BytesIO(swapped), path)
+            # data after the final frame is rejected, not silently ignored
+            with self.assertRaises(EnvelopeError):
+                envelope.decryptStream(io.BytesIO(data + data[headerSize:headerSize + frame]), path)
+            self.assertEqual(os.listdir(directory), [])
+
+if __name__ == "__main__":
+    unittest.main()
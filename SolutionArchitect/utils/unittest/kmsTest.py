@@ -0,0 +1,234 @@
+import io
+import os
+import time
+import random
+import threading
+import unittest
+import boto3
+from botocore.awsrequest import AWSResponse
+try:
+    # optional dependency, only the public key tests need it
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+import ClientHooks
+from Config import Status
+from Kms import Kms
+from RateLimiter import RateLimiter, sharedLimiter
+from ApiBudget import api_budget
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+KEY_ARN = f"arn:aws:kms:{REGION}:{ACCOUNT_ID}:key/1111"
+
+# answers the kms cryptographic operations w/o any HTTP request, with a random latency
+class FakeKms:
+    def __init__(self, latency=0.01):
+        self.latency = latency
+        self.keyState = "Enabled"
+        self.responses = {}   # operation -> parsed response of the other operations
+        self.multiRegion = None   # MultiRegionConfiguration of the key, None for a single region key
+        self.describeDenied = False   # caller w/o kms:DescribeKey
+        self.calls = []
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.lock = threading.Lock()
+
+    def onSend(self, call):
+        if call.service != "kms":
+            return None
+        with self.lock:
+            self.calls.append((call.operation, call.region, call.params.get("KeyId")))
+        if call.operation == "DescribeKey" and self.describeDenied:
+            return AWSResponse(None, 400, {}, None), {"Error": {"Code": "AccessDeniedException", "Message": "Denied"}}
+        if call.operation == "DescribeKey":
+            metadata = {"KeyId": "1111", "Arn": KEY_ARN, "KeyState": self.keyState, "Enabled": self.keyState == "Enabled"}
+            if self.multiRegion is not None:
+                metadata.update({"MultiRegion": True, "MultiRegionConfiguration": self.multiRegion})
+            return AWSResponse(None, 200, {}, None), {"KeyMetadata": metadata}
+        if call.operation in self.responses:
+            return AWSResponse(None, 200, {}, None), self.responses[call.operation]
+        if call.operation not in ("Encrypt", "Decrypt"):
+            return None
+        with self.lock:
+            self.inFlight += 1
+            self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        time.sleep(random.uniform(0, self.latency))
+        with self.lock:
+            self.inFlight -= 1
+        if call.operation == "Encrypt":
+            parsed = {"CiphertextBlob": b"ct:" + call.params["Plaintext"], "KeyId": call.params["KeyId"]}
+        else:
+            # the KeyId is optional for symmetric ciphertexts (e.g. the data keys of Envelope)
+            parsed = {"Plaintext": call.params["CiphertextBlob"][3:], "KeyId": call.params.get("KeyId", KEY_ARN)}
+        return AWSResponse(None, 200, {}, None), parsed
+
+class kmsTest(unittest.TestCase):
+    def setUp(self):
+        session = boto3.Session(region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test")
+        self.kms = Kms(session=session)
+        self.kms.addResource("Key-001", {"Arn": KEY_ARN, "KeyId": "1111"})
+        self.fake = FakeKms()
+        ClientHooks.addListener(self.fake)
+
+    def tearDown(self):
+        ClientHooks.removeListener(self.fake)
+
+    def test_encrypt_many_ordered(self):
+        values = (f"value {i}" for i in range(200))
+        with api_budget(kms={"Encrypt": 200, "DescribeKey": 1, "*": 201}):
+            cipherTexts = list(self.kms.encryptMany("Key-001", values, maxWorkers=8))
+        self.assertEqual(cipherTexts, [f"ct:value {i}".encode() for i in range(200)])
+        self.assertGreater(self.fake.maxInFlight, 1)
+        self.assertLessEqual(self.fake.maxInFlight, 8)
+        plainTexts = list(self.kms.decryptMany("Key-001", iter(cipherTexts)))
+        self.assertEqual(plainTexts, [f"value {i}".encode() for i in range(200)])
+
+    def test_rate_limited(self):
+        limiter = RateLimiter(rate=100, burst=10)
+        start = time.monotonic()
+        list(self.kms.encryptMany("Key-001", [b"x"] * 30, limiter=limiter))
+        # 10 requests of the burst, then 20 at 100 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_shared_limiter(self):
+        # one bucket per account & region, whatever the Kms config
+        other = Kms(session=boto3.Session(region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test"))
+        self.assertIs(self.kms.keyLimiter(KEY_ARN), other.keyLimiter(KEY_ARN))
+        self.assertIs(self.kms.keyLimiter(KEY_ARN), sharedLimiter(ACCOUNT_ID, REGION))
+        self.assertIsNot(self.kms.keyLimiter(KEY_ARN.replace(REGION, "us-west-2")), sharedLimiter(ACCOUNT_ID, REGION))
+
+    def test_key_metadata_cache(self):
+        # described once, then the crypto calls resolve the key w/o any extra call
+        with api_budget(kms={"DescribeKey": 1, "Encrypt": 3, "*": 4}):
+            for _ in range(3):
+                self.assertEqual(self.kms.encrypt("Key-001", b"a"), b"ct:a")
+        # expired metadata is described again
+        self.kms.metadataTtl = 0
+        self.fake.keyState = "Disabled"
+        with api_budget(kms={"DescribeKey": 1, "*": 1}):
+            self.assertIsNone(self.kms.encrypt("Key-001", b"a"))
+        # disabled key rejected locally within the TTL
+        self.kms.metadataTtl = 300
+        with api_budget(kms={"*": 0}):
+            self.assertIsNone(self.kms.encrypt("Key-001", b"a"))
+            self.assertEqual(list(self.kms.encryptMany("Key-001", [b"a", b"b"])), [None, None])
+
+    def test_describe_denied(self):
+        # a role granted kms:Encrypt only still encrypts, the denied describe_key isn't repeated within the TTL
+        self.fake.describeDenied = True
+        with api_budget(kms={"DescribeKey": 1, "Encrypt": 4, "*": 5}):
+            for _ in range(3):
+                self.assertEqual(self.kms.encrypt("Key-001", b"a"), b"ct:a")
+            self.assertEqual(list(self.kms.encryptMany("Key-001", [b"b"])), [b"ct:b"])
+
+    @unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography not installed")
+    def test_public_key(self):
+        rsaKey = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        der = rsaKey.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.fake.responses["GetPublicKey"] = {"KeyId": KEY_ARN, "PublicKey": der, "KeySpec": "RSA_2048",
+                                               "KeyUsage": "ENCRYPT_DECRYPT", "EncryptionAlgorithms": ["RSAES_OAEP_SHA_256"]}
+        # the public key is fetched once, the encryptions are local
+        with api_budget(kms={"DescribeKey": 1, "GetPublicKey": 1, "*": 2}):
+            cipherTexts = [self.kms.encryptPublic("Key-001", f"message {i}") for i in range(10)]
+        sha256 = hashes.SHA256()
+        oaep = padding.OAEP(mgf=padding.MGF1(sha256), algorithm=sha256, label=None)
+        self.assertEqual(rsaKey.decrypt(cipherTexts[3], oaep), b"message 3")
+
+    @unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography not installed")
+    def test_verify_local(self):
+        ecKey = ec.generate_private_key(ec.SECP256R1())
+        der = ecKey.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.fake.responses["GetPublicKey"] = {"KeyId": KEY_ARN, "PublicKey": der, "KeySpec": "ECC_NIST_P256",
+                                               "KeyUsage": "SIGN_VERIFY", "SigningAlgorithms": ["ECDSA_SHA_256"]}
+        signature = ecKey.sign(b"message", ec.ECDSA(hashes.SHA256()))
+        with api_budget(kms={"DescribeKey": 1, "GetPublicKey": 1, "*": 2}):
+            for _ in range(10):
+                self.assertTrue(self.kms.verify("Key-001", b"message", signature))
+            self.assertFalse(self.kms.verify("Key-001", b"tampered", signature))
+
+    @unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography not installed")
+    def test_public_key_wrong_usage(self):
+        ecKey = ec.generate_private_key(ec.SECP256R1())
+        der = ecKey.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.fake.responses["GetPublicKey"] = {"KeyId": KEY_ARN, "PublicKey": der, "KeySpec": "ECC_NIST_P256",
+                                               "KeyUsage": "SIGN_VERIFY", "SigningAlgorithms": ["ECDSA_SHA_256"]}
+        # documented as None / False, not raised
+        self.assertIsNone(self.kms.encryptPublic("Key-001", "message"))
+        self.assertFalse(self.kms.verify("Key-001", b"message", b"signature", "RSASSA_PSS_SHA_256"))
+
+    def test_sign_symmetric_key(self):
+        # the metadata of a symmetric key has no SigningAlgorithms, nothing is sent to KMS
+        with api_budget(kms={"Sign": 0}):
+            self.assertIsNone(self.kms.sign("Key-001", b"message"))
+
+    def test_multi_region_routing(self):
+        replicaArn = KEY_ARN.replace(REGION, "us-west-2")
+        self.fake.multiRegion = {"MultiRegionKeyType": "PRIMARY", "PrimaryKey": {"Arn": KEY_ARN, "Region": REGION},
+                                 "ReplicaKeys": [{"Arn": replicaArn, "Region": "us-west-2"}]}
+        # running in us-west-2: the crypto calls go to the local replica
+        self.kms.routingRegion = "us-west-2"
+        self.assertEqual(self.kms.encrypt("Key-001", b"a"), b"ct:a")
+        self.assertEqual(list(self.kms.decryptMany("Key-001", [b"ct:a"])), [b"a"])
+        self.assertEqual(self.fake.calls, [("DescribeKey", REGION, KEY_ARN), ("Encrypt", "us-west-2", replicaArn),
+                                           ("Decrypt", "us-west-2", replicaArn)])
+        # no replica in the local region: the primary
+        self.fake.calls = []
+        self.kms.routingRegion = "eu-west-1"
+        self.kms.encrypt("Key-001", b"a")
+        self.assertEqual(self.fake.calls, [("Encrypt", REGION, KEY_ARN)])
+
+    @unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography not installed")
+    def test_multi_region_envelope(self):
+        replicaArn = KEY_ARN.replace(REGION, "us-west-2")
+        self.fake.multiRegion = {"MultiRegionKeyType": "PRIMARY", "PrimaryKey": {"Arn": KEY_ARN, "Region": REGION},
+                                 "ReplicaKeys": [{"Arn": replicaArn, "Region": "us-west-2"}]}
+        dataKey = os.urandom(32)
+        self.fake.responses["GenerateDataKey"] = {"Plaintext": dataKey, "CiphertextBlob": b"ct:" + dataKey, "KeyId": replicaArn}
+        self.kms.routingRegion = "us-west-2"
+        message = self.kms.encryptEnvelope("Key-001", b"message")
+        encrypted = io.BytesIO()
+        self.kms.encryptStream("Key-001", io.BytesIO(b"stream"), encrypted)
+        self.assertEqual(self.kms.decryptEnvelope(message, keyName="Key-001"), b"message")
+        # the data keys are generated & decrypted by the local replica, one envelope per regional client
+        self.assertEqual([call[:2] for call in self.fake.calls],
+                         [("DescribeKey", REGION), ("GenerateDataKey", "us-west-2"), ("GenerateDataKey", "us-west-2"),
+                          ("Decrypt", "us-west-2")])
+        self.assertEqual(list(self.kms.envelopes), ["us-west-2"])
+
+    def test_multi_region_create(self):
+        replicaArn = KEY_ARN.replace(REGION, "us-west-2")
+        self.fake.responses.update({
+            "CreateKey": {"KeyMetadata": {"KeyId": "mrk-1", "Arn": KEY_ARN, "KeyState": "Enabled", "MultiRegion": True}},
+            "CreateAlias": {},
+            "ReplicateKey": {"ReplicaKeyMetadata": {"KeyId": "mrk-1", "Arn": replicaArn}}})
+        status, _ = self.kms.do_create(self.kms.botoClient, "Key-002", {
+            "Description": "", "KeyUsage": "ENCRYPT_DECRYPT", "Origin": "AWS_KMS", "Replicas": ["us-west-2"]})
+        self.assertEqual(status, Status.SUCCESS)
+        self.assertEqual(self.fake.calls, [("CreateKey", REGION, None), ("CreateAlias", REGION, None),
+                                           ("ReplicateKey", REGION, KEY_ARN), ("CreateAlias", "us-west-2", None)])
+        # the replica is known w/o describe_key
+        self.assertEqual(self.kms.keyMetadata[KEY_ARN][0]["MultiRegionConfiguration"]["ReplicaKeys"],
+                         [{"Arn": replicaArn, "Region": "us-west-2"}])
+
+    def test_multi_region_delete(self):
+        replicaArn = KEY_ARN.replace(REGION, "us-west-2")
+        self.fake.multiRegion = {"MultiRegionKeyType": "PRIMARY", "PrimaryKey": {"Arn": KEY_ARN, "Region": REGION},
+                                 "ReplicaKeys": [{"Arn": replicaArn, "Region": "us-west-2"}]}
+        self.fake.responses["ScheduleKeyDeletion"] = {"KeyId": KEY_ARN, "KeyState": "PendingDeletion"}
+        status, _ = self.kms.do_delete(self.kms.botoClient, "Key-001", {"Replicas": ["us-west-2"]})
+        self.assertEqual(status, Status.SUCCESS)
+        # the replicas first
+        self.assertEqual(self.fake.calls, [("DescribeKey", REGION, KEY_ARN), ("ScheduleKeyDeletion", "us-west-2", replicaArn),
+                                           ("ScheduleKeyDeletion", REGION, KEY_ARN)])
+
+    def test_unknown_key(self):
+        with api_budget(kms={"Encrypt": 0}):
+            self.kms.getArn = lambda name: None
+            self.assertEqual(list(self.kms.encryptMany("Key-404", [b"a", b"b"])), [None, None])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import time
+import unittest
+import boto3
+from botocore.stub import Stubber
+from botocore.exceptions import EndpointConnectionError
+
+from ParameterCache import ParameterCache, ParameterNotFound
+from SsmParameter import SsmParameter
+from ApiBudget import api_budget
+
+REGION = "us-east-1"
+
+def parameter(name, value="value"):
+    return {"Name": name, "Value": f"{value}-{name}", "Type": "SecureString", "Version": 1}
+
+class parameterCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.session = boto3.Session(region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test")
+        self.client = self.session.client("ssm")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def addBatch(self, names, value="value"):
+        self.stubber.add_response("get_parameters", {"Parameters": [parameter(n, value) for n in names]},
+                                  {"Names": names, "WithDecryption": True})
+
+    def test_batched_and_cached(self):
+        cache = ParameterCache(self.client, background=False)
+        names = [f"/app/p{i}" for i in range(25)]
+        for start in range(0, 25, 10):
+            self.addBatch(names[start:start + 10])
+        values = cache.getMany(names)
+        self.assertEqual(values["/app/p24"], "value-/app/p24")
+        # from memory afterwards
+        with api_budget(ssm={"*": 0}):
+            for _ in range(100):
+                self.assertEqual(cache.get("/app/p3"), "value-/app/p3")
+        self.stubber.assert_no_pending_responses()
+
+    def test_ttl_and_refresh(self):
+        cache = ParameterCache(self.client, ttl=0.2, background=False)
+        self.addBatch(["/app/a"])
+        self.assertEqual(cache.get("/app/a"), "value-/app/a")
+        self.assertEqual(cache.refreshDue(), 0)
+        # refreshed ahead of the expiry, the read doesn't wait on the network
+        time.sleep(0.16)
+        self.addBatch(["/app/a"], "new")
+        self.assertEqual(cache.refreshDue(), 1)
+        with api_budget(ssm={"*": 0}):
+            self.assertEqual(cache.get("/app/a"), "new-/app/a")
+        # expired: fetched again by the read
+        time.sleep(0.25)
+        self.addBatch(["/app/a"], "newer")
+        self.assertEqual(cache.get("/app/a"), "newer-/app/a")
+        self.stubber.assert_no_pending_responses()
+
+    def test_invalidate_during_refresh(self):
+        cache = ParameterCache(self.client, ttl=0.2, background=False)
+        self.addBatch(["/app/a", "/app/b"])
+        cache.getMany(["/app/a", "/app/b"])
+        time.sleep(0.16)
+        # /app/a is updated (e.g. by put_parameter) while the refresh fetches the previous value
+        fetch = cache._fetch
+        def fetchThenInvalidate(names):
+            result = fetch(names)
+            cache.invalidate("/app/a")
+            return result
+        cache._fetch = fetchThenInvalidate
+        self.addBatch(["/app/a", "/app/b"], "old")
+        cache.refreshDue()
+        self.assertNotIn("/app/a", cache.entries)
+        self.addBatch(["/app/a"], "new")
+        with api_budget(ssm={"GetParameters": 1}):
+            self.assertEqual(cache.get("/app/a"), "new-/app/a")
+            self.assertEqual(cache.get("/app/b"), "old-/app/b")
+        self.stubber.assert_no_pending_responses()
+
+    def test_refresh_network_error(self):
+        cache = ParameterCache(self.client, ttl=0.04)
+        self.addBatch(["/app/a"])
+        cache.get("/app/a")
+        # the first background refresh fails on the network, the loop keeps going
+        refreshed = []
+        def fetch(names):
+            refreshed.append(names)
+            if len(refreshed) == 1:
+                raise EndpointConnectionError(endpoint_url="https://ssm.us-east-1.amazonaws.com")
+            return {name: parameter(name, "new") for name in names}, []
+        cache._fetch = fetch
+        try:
+            deadline = time.monotonic() + 2
+            while len(refreshed) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            cache.stop()
+        self.assertGreaterEqual(len(refreshed), 2)
+        self.assertEqual(cache.entries["/app/a"]["Value"], "new-/app/a")
+
+    def test_secret_reference_and_missing(self):
+        cache = ParameterCache(self.client, background=False)
+        secret = "/aws/reference/secretsmanager/api-key"
+        self.stubber.add_response("get_parameter", {"Parameter": parameter(secret)}, {"Name": secret, "WithDecryption": True})
+        self.assertEqual(cache.get(secret), f"value-{secret}")
+        self.stubber.add_response("get_parameters", {"Parameters": [], "InvalidParameters": ["/app/missing"]},
+                                  {"Names": ["/app/missing"], "WithDecryption": True})
+        with self.assertRaises(ParameterNotFound):
+            cache.get("/app/missing")
+
+    def test_config_create_invalidates(self):
+        ssm = SsmParameter({"/app/a": {"Value": "v2", "Type": "SecureString"}}, session=self.session)
+        ssm.cache = ParameterCache(self.client, background=False)
+        self.addBatch(["/app/a"])
+        self.assertEqual(ssm.getValue("/app/a"), "value-/app/a")
+        self.stubber.add_response("put_parameter", {"Version": 2},
+                                  {"Name": "/app/a", "Value": "v2", "Type": "SecureString"})
+        status, _ = ssm.do_create(self.client, "/app/a", ssm.configMap["/app/a"])
+        self.assertEqual(status.name, "SUCCESS")
+        self.addBatch(["/app/a"], "v2")
+        self.assertEqual(ssm.getValue("/app/a"), "v2-/app/a")
+        self.stubber.assert_no_pending_responses()
+
+if __name__ == "__main__":
+    unittest.main()
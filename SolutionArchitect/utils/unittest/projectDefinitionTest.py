@@ -0,0 +1,92 @@
+import os
+import json
+import tempfile
+import unittest
+import boto3
+from botocore.stub import Stubber
+
+from Config import Config, Status, ArnRef, Deferred
+from ApiBudget import ApiCounter
+from IamPolicy import IamPolicy
+from IamRole import IamRole
+from Kms import Kms
+import ProjectDefinition
+import ProjectState
+
+ACCOUNT_ID = "123456789012"
+
+definition = {
+    "Project": "Unit-Test",
+    "Configs": {
+        "IamRole": {"Role-001": {"PrincipalType": "AWS", "AWS": {"$accountId": True},
+                                 "UserPolicies": ["Policy-001"], "AWSPolicies": []}},
+        "IamPolicy": {"Policy-001": {"Version": "2012-10-17", "Statement": [
+            {"Effect": "Allow", "Action": ["kms:Encrypt"], "Resource": [{"$arn": "Kms/Key-001"}]}]}},
+        "Kms": {"Key-001": {"Description": "", "KeyUsage": "ENCRYPT_DECRYPT", "Origin": "AWS_KMS"}},
+    }
+}
+
+class projectDefinitionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        boto3.setup_default_session(region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        Config._accountId = ACCOUNT_ID
+
+    @classmethod
+    def tearDownClass(cls):
+        boto3.DEFAULT_SESSION = None
+        Config._accountId = None
+
+    def write(self, name, text):
+        path = os.path.join(tempfile.mkdtemp(), name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_load_json(self):
+        path = self.write("project.json", json.dumps(definition))
+        # loading the definition doesn't make any API call, the references are deferred
+        with ApiCounter() as counter:
+            project = ProjectDefinition.fromFile(path)
+        self.assertEqual(counter.total(), 0)
+        resource = project.configs[IamPolicy][1]["Policy-001"]["Statement"][0]["Resource"][0]
+        self.assertIsInstance(resource, ArnRef)
+        self.assertEqual((resource.service, resource.name), (Kms, "Key-001"))
+        self.assertIsInstance(project.configs[IamRole][1]["Role-001"]["AWS"], Deferred)
+        self.assertEqual(Config.convertJson(project.configs[IamRole][1]["Role-001"]["AWS"]), f'"{ACCOUNT_ID}"')
+
+    def test_state_path(self):
+        # "State": true keeps the state out of the source tree, a relative path is next to the definition
+        project = ProjectDefinition.build(dict(definition, State=True), "/src/lab")
+        self.assertEqual(project.state.path, ProjectState.defaultPath("Unit-Test"))
+        self.assertTrue(project.state.path.startswith(os.path.expanduser("~")))
+        project = ProjectDefinition.build(dict(definition, State="lab.state.json"), "/src/lab")
+        self.assertEqual(project.state.path, "/src/lab/lab.state.json")
+        self.assertIsNone(ProjectDefinition.build(definition).state)
+
+    @unittest.skipUnless(__import__("importlib").util.find_spec("yaml"), "PyYAML not installed")
+    def test_load_yaml(self):
+        path = self.write("project.yaml", "Project: Unit-Test\nConfigs:\n  Kms:\n    Key-001:\n      Description: yaml\n")
+        project = ProjectDefinition.fromFile(path)
+        self.assertEqual(project.configs[Kms][1], {"Key-001": {"Description": "yaml"}})
+
+    def test_plan(self):
+        project = ProjectDefinition.build(definition)
+        stubbers = [Stubber(project.getConfig(IamRole).botoClient), Stubber(project.getConfig(IamPolicy).botoClient),
+                    Stubber(project.getConfig(Kms).botoClient)]
+        stubbers[0].add_response("list_roles", {"Roles": []})
+        stubbers[1].add_response("list_policies", {"Policies": [{"PolicyName": "Policy-001",
+                                                                  "PolicyId": "ANPAEXAMPLE000000000001", "Path": "/",
+                                                                  "Arn": f"arn:aws:iam::{ACCOUNT_ID}:policy/Policy-001"}]})
+        stubbers[2].add_response("list_aliases", {"Aliases": []})
+        stubbers[2].add_response("list_keys", {"Keys": []})
+        for stubber in stubbers:
+            stubber.activate()
+        status, plan = project.plan()
+        self.assertEqual(status, Status.SUCCESS)
+        self.assertEqual(plan["Create"], [(Kms, "Key-001"), (IamRole, "Role-001")])
+        self.assertEqual(plan["Exists"], [(IamPolicy, "Policy-001")])
+        self.assertEqual(project.phases.phases["refresh"]["ApiCalls"], 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+import os
+import time
+import json
+import tempfile
+import unittest
+import boto3
+from botocore.stub import Stubber
+
+from Config import Config, Status
+from Project import Project
+from ProjectState import ProjectState
+from datetime import datetime
+from IamPolicy import IamPolicy
+from IamRole import IamRole
+from Kms import Kms
+from ApiBudget import api_budget
+
+ACCOUNT_ID = "123456789012"
+REGIONS = ["us-east-1", "eu-west-1"]
+
+def keyArn(region, keyId):
+    return f"arn:aws:kms:{region}:{ACCOUNT_ID}:key/{keyId}"
+
+# configs with a slow listing, to observe the parallel Project.list (IAM is listed, not swept)
+class SlowList(Config):
+    def __init__(self, inputMap=None, session=None):
+        super().__init__("iam", inputMap=inputMap, session=session)
+
+    def do_list(self):
+        time.sleep(0.3)
+        self.addResource(f"{type(self).__name__}-001", {"Arn": f"arn:aws:iam::{ACCOUNT_ID}:role/{type(self).__name__}-001"})
+        return Status.SUCCESS, self.resourceMap
+
+class SlowRoles(SlowList):
+    pass
+
+class SlowPolicies(SlowList):
+    pass
+
+class FailingList(SlowList):
+    def do_list(self):
+        return Status.FAILED, "Access denied"
+
+class projectTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.environ = dict(os.environ)
+        os.environ.update({"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"})
+        Config._accountId = ACCOUNT_ID
+
+    @classmethod
+    def tearDownClass(cls):
+        os.environ.clear()
+        os.environ.update(cls.environ)
+        Config._accountId = None
+
+    def test_fan_out(self):
+        project = Project("Unit-Test", targets=[(None, region) for region in REGIONS])
+        self.assertEqual(sorted(project.targets), sorted(f"default@{region}" for region in REGIONS))
+        project.addConfig(Kms, {"Key-001": {}})
+        project.addConfig(IamPolicy, {"Policy-001": {"Version": "2012-10-17", "Statement": [
+            {"Effect": "Allow", "Action": ["kms:Encrypt"], "Resource": [Project.getConfigArn(project, Kms, "Key-001")]}]}})
+
+        stubbers = []
+        for region in REGIONS:
+            kms = project.targets[f"default@{region}"].getConfig(Kms)
+            self.assertEqual(kms.getRegion(), region)
+            stubber = Stubber(kms.botoClient)
+            stubber.add_response("list_aliases", {"Aliases": [{"AliasName": "alias/Key-001", "TargetKeyId": f"{region}-key",
+                                                               "AliasArn": f"arn:aws:kms:{region}:{ACCOUNT_ID}:alias/Key-001"}]})
+            stubber.add_response("list_keys", {"Keys": [{"KeyId": f"{region}-key", "KeyArn": keyArn(region, f"{region}-key")}]})
+            stubber.activate()
+            stubbers.append(stubber)
+
+        status, results = project.list(Kms)
+        self.assertEqual(status, Status.SUCCESS)
+        for region in REGIONS:
+            label = f"default@{region}"
+            self.assertEqual(results[label], ["Key-001"])
+            # metrics are kept per target
+            self.assertEqual(project.metrics[label]["ApiCalls"], {"kms": {"ListAliases": 1, "ListKeys": 1}})
+            # the references of the definitions resolve within the target
+            policy = project.targets[label].getConfig(IamPolicy)
+            self.assertEqual(Config.convertJson(policy.configMap["Policy-001"]["Statement"][0]["Resource"]),
+                             f'["{keyArn(region, region + "-key")}"]')
+        for stubber in stubbers:
+            stubber.assert_no_pending_responses()
+
+    def test_state(self):
+        boto3.setup_default_session(region_name="us-east-1")
+        statePath = os.path.join(tempfile.mkdtemp(), "state.json")
+        definition = {"Policy-001": {"Version": "2012-10-17", "Statement": []}}
+        policy = {"PolicyName": "Policy-001", "PolicyId": "ANPAEXAMPLE000000000001", "Path": "/",
+                  "Arn": f"arn:aws:iam::{ACCOUNT_ID}:policy/Policy-001"}
+        try:
+            project = Project("Unit-Test", statePath=statePath)
+            project.addConfig(IamPolicy, definition)
+            stubber = Stubber(project.getConfig(IamPolicy).botoClient)
+            stubber.add_response("list_policies", {"Policies": []})
+            stubber.add_response("create_policy", {"Policy": policy})
+            stubber.add_response("list_policies", {"Policies": [policy]})   # identifiers of the new policy
+            with stubber:
+                status, _ = project.create()
+            self.assertEqual(status, Status.SUCCESS)
+
+            # re-apply of the unchanged definition: no API call at all
+            project = Project("Unit-Test", statePath=statePath)
+            project.addConfig(IamPolicy, definition)
+            with api_budget(iam={"*": 0}, sts={"*": 0}):
+                status, _ = project.create()
+            self.assertEqual(status, Status.NO_OP)
+            self.assertEqual(project.getConfig(IamPolicy).getArn("Policy-001"), policy["Arn"])
+
+            # a changed definition is not trusted from the state, the policy is listed again
+            changed = {"Policy-001": {"Version": "2012-10-17", "Statement": [
+                {"Effect": "Allow", "Action": ["kms:Encrypt"], "Resource": [Project.getConfigArn(project, Kms, "Key-001")]}]}}
+            project = Project("Unit-Test", statePath=statePath)
+            project.addConfig(IamPolicy, changed)
+            stubber = Stubber(project.getConfig(IamPolicy).botoClient)
+            stubber.add_response("list_policies", {"Policies": [policy]})
+            with stubber:
+                status, results = project.create()
+            self.assertEqual(status, Status.NO_OP)   # exists already, nothing applied
+            # the state keeps the hash of the applied definition, the drift shows on the next run
+            state = ProjectState(statePath)
+            self.assertTrue(state.isFresh(IamPolicy, "Policy-001", definition["Policy-001"]))
+            self.assertFalse(state.isFresh(IamPolicy, "Policy-001", changed["Policy-001"]))
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+    def test_state_existing(self):
+        # the resources existed before the first apply: adopted in the state, the re-apply doesn't list again
+        boto3.setup_default_session(region_name="us-east-1")
+        statePath = os.path.join(tempfile.mkdtemp(), "state.json")
+        definition = {"Policy-001": {"Version": "2012-10-17", "Statement": []}}
+        policy = {"PolicyName": "Policy-001", "PolicyId": "ANPAEXAMPLE000000000001", "Path": "/",
+                  "Arn": f"arn:aws:iam::{ACCOUNT_ID}:policy/Policy-001"}
+        try:
+            project = Project("Unit-Test", statePath=statePath)
+            project.addConfig(IamPolicy, definition)
+            stubber = Stubber(project.getConfig(IamPolicy).botoClient)
+            stubber.add_response("list_policies", {"Policies": [policy]})
+            with stubber:
+                status, _ = project.create()
+            self.assertEqual(status, Status.NO_OP)
+            self.assertTrue(ProjectState(statePath).isFresh(IamPolicy, "Policy-001", definition["Policy-001"]))
+
+            project = Project("Unit-Test", statePath=statePath)
+            project.addConfig(IamPolicy, definition)
+            with api_budget(iam={"*": 0}, sts={"*": 0}):
+                status, _ = project.create()
+            self.assertEqual(status, Status.NO_OP)
+            self.assertEqual(project.getConfig(IamPolicy).getArn("Policy-001"), policy["Arn"])
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+    def test_discover(self):
+        boto3.setup_default_session(region_name="us-east-1")
+        try:
+            project = Project("Unit-Test")
+            project.addConfig(Kms, {"Key-001": {"Description": "", "KeyUsage": "ENCRYPT_DECRYPT", "Origin": "AWS_KMS",
+                                                "Tags": [{"TagKey": "Environment", "TagValue": "UnitTest"}]}})
+            project.addConfig(IamPolicy, {"Policy-001": {"Version": "2012-10-17", "Statement": []}})
+
+            # the created resources carry the project marker tags
+            kms = project.getConfig(Kms)
+            stubber = Stubber(kms.botoClient)
+            stubber.add_response("create_key", {"KeyMetadata": {"KeyId": "key-001", "Arn": keyArn("us-east-1", "key-001")}},
+                                 {"Description": "", "KeyUsage": "ENCRYPT_DECRYPT", "Origin": "AWS_KMS", "KeySpec": "SYMMETRIC_DEFAULT", "Tags": [
+                                     {"TagKey": "Environment", "TagValue": "UnitTest"},
+                                     {"TagKey": "Project", "TagValue": "Unit-Test"},
+                                     {"TagKey": "ProjectResource", "TagValue": "Key-001"}]})
+            stubber.add_response("create_alias", {}, {"AliasName": "alias/Key-001", "TargetKeyId": "key-001"})
+            with stubber:
+                kms.do_create(kms.botoClient, "Key-001", project.configs[Kms][1]["Key-001"])
+
+            # one tagging sweep for KMS, IAM is listed
+            tagging = Stubber(project.getTaggingClient())
+            tagging.add_response("get_resources", {"ResourceTagMappingList": [{
+                "ResourceARN": keyArn("us-east-1", "key-001"),
+                "Tags": [{"Key": "Project", "Value": "Unit-Test"}, {"Key": "ProjectResource", "Value": "Key-001"}]}]},
+                {"TagFilters": [{"Key": "Project", "Values": ["Unit-Test"]}], "ResourceTypeFilters": ["kms"]})
+            iam = Stubber(project.getConfig(IamPolicy).botoClient)
+            iam.add_response("list_policies", {"Policies": []})
+            with tagging, iam, api_budget(kms={"*": 0}):
+                status, results = project.list()
+            self.assertEqual(status, Status.SUCCESS)
+            self.assertEqual({service: list(results.resources(service)) for service in ["Kms", "IamPolicy"]},
+                             {"Kms": ["Key-001"], "IamPolicy": []})
+            self.assertEqual(kms.resourceMap["Key-001"]["KeyId"], "key-001")
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+    def test_resolver(self):
+        boto3.setup_default_session(region_name="us-east-1")
+        policyArn = f"arn:aws:iam::{ACCOUNT_ID}:policy/team/Policy-001"
+        roleArn = f"arn:aws:iam::{ACCOUNT_ID}:role/Role-001"
+        try:
+            project = Project("Unit-Test")
+            project.addConfig(IamPolicy, {"Policy-001": {"Version": "2012-10-17", "Statement": []}})
+            project.addConfig(IamRole, {"Role-001": {"PrincipalType": "AWS", "AWS": ACCOUNT_ID,
+                                                     "UserPolicies": ["Policy-001"], "AWSPolicies": []}})
+            policies = Stubber(project.getConfig(IamPolicy).botoClient)
+            policies.add_response("list_policies", {"Policies": []})
+            policies.add_response("create_policy", {"Policy": {"PolicyName": "Policy-001", "Arn": policyArn}})
+            roles = Stubber(project.getConfig(IamRole).botoClient)
+            roles.add_response("list_roles", {"Roles": []})
+            roles.add_response("create_role", {"Role": {"Path": "/", "RoleName": "Role-001", "RoleId": "AROAEXAMPLE000000001",
+                                                        "Arn": roleArn, "CreateDate": datetime(2024, 1, 1)}})
+            # the policy ARN comes from the create response, not from a synthesized (default path) ARN
+            roles.add_response("attach_role_policy", {}, {"RoleName": "Role-001", "PolicyArn": policyArn})
+            with policies, roles:
+                status, _ = project.create()
+            self.assertEqual(status, Status.SUCCESS)
+
+            # resolved from the cache, no further lookup
+            with api_budget(iam={"*": 0}, sts={"*": 0}):
+                self.assertEqual(project.getArn(IamRole, "Role-001"), roleArn)
+                self.assertEqual(project.getArn(IamPolicy, "Policy-001"), policyArn)
+                self.assertEqual(project.resolver.accountId(), ACCOUNT_ID)
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+    def test_list_inventory(self):
+        boto3.setup_default_session(region_name="us-east-1")
+        try:
+            project = Project("Unit-Test")
+            project.addConfig(SlowRoles)
+            project.addConfig(SlowPolicies, {"SlowPolicies-001": {}, "SlowPolicies-002": {}})
+            start = time.perf_counter()
+            status, inventory = project.list()
+            # the latency is the one of the slowest service, not the sum
+            self.assertLess(time.perf_counter() - start, 0.55)
+            self.assertEqual(status, Status.SUCCESS)
+            self.assertEqual(list(inventory.resources("SlowRoles")), ["SlowRoles-001"])
+            self.assertEqual(list(inventory.resources("SlowPolicies")), ["SlowPolicies-001"])
+            self.assertEqual(list(inventory.summary()["Resources"]), [1, 1])
+            self.assertGreaterEqual(json.loads(inventory.toJson())["SlowRoles"]["Seconds"], 0.3)
+            self.assertIn("SlowPolicies-001", inventory.table())
+
+            project.addConfig(FailingList)
+            status, inventory = project.list()
+            self.assertEqual(status, Status.FAILED)
+            self.assertEqual(inventory.toDict()["FailingList"]["Error"], "Access denied")
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import boto3
+from botocore.stub import Stubber
+from botocore.exceptions import ClientError
+
+import ClientHooks
+from Recorder import Recorder, ReplayError
+
+class recorderTest(unittest.TestCase):
+    # define static setUp method
+    @classmethod
+    def setUpClass(cls):
+        cls.tempDir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tempDir.name, "recording.jsonl.gz")
+
+        # record a couple of stubbed calls - the stubber stands in for AWS
+        recorder = Recorder(cls.path, mode=Recorder.RECORD)
+        with recorder:
+            client = ClientHooks.attach(boto3.client("kms", region_name="us-east-1",
+                                                     aws_access_key_id="test", aws_secret_access_key="test"))
+            with Stubber(client) as stubber:
+                stubber.add_response("list_aliases", {"Aliases": [{"AliasName": "alias/Key-001", "TargetKeyId": "1234"}]}, {})
+                stubber.add_response("encrypt", {"CiphertextBlob": b"\x00\x01cipher", "KeyId": "1234"},
+                                     {"KeyId": "alias/Key-001", "Plaintext": b"Hello"})
+                stubber.add_client_error("describe_key", service_error_code="NotFoundException",
+                                         http_status_code=400, expected_params={"KeyId": "alias/Missing"})
+                client.list_aliases()
+                client.encrypt(KeyId="alias/Key-001", Plaintext=b"Hello")
+                try:
+                    client.describe_key(KeyId="alias/Missing")
+                except ClientError:
+                    pass   # error responses are recorded as well
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tempDir.cleanup()
+
+    def test_recorder_replay(self):
+        with Recorder(self.path, mode=Recorder.REPLAY):
+            # clients created during the replay inherit the hooks from the default session
+            client = boto3.client("kms")
+            self.assertEqual(client.list_aliases()["Aliases"][0]["AliasName"], "alias/Key-001")
+            # bytes survive the round trip through the recording
+            self.assertEqual(client.encrypt(KeyId="alias/Key-001", Plaintext=b"Hello")["CiphertextBlob"], b"\x00\x01cipher")
+
+    def test_recorder_replay_error(self):
+        with Recorder(self.path, mode=Recorder.REPLAY):
+            client = boto3.client("kms")
+            with self.assertRaises(client.exceptions.NotFoundException):
+                client.describe_key(KeyId="alias/Missing")
+
+    def test_recorder_replay_miss(self):
+        with Recorder(self.path, mode=Recorder.REPLAY):
+            client = boto3.client("kms")
+            # different parameters than the recording
+            with self.assertRaises(ReplayError):
+                client.encrypt(KeyId="alias/Key-001", Plaintext=b"Bye")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from botocore.exceptions import ClientError
+
+import Retry
+
+def clientError(code, message=""):
+    return ClientError({"Error": {"Code": code, "Message": message}}, "AssumeRole")
+
+class retryTest(unittest.TestCase):
+
+    def test_retry_until_propagated(self):
+        attempts = []
+        def assumeRole():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise clientError("AccessDenied", "not authorized to perform: sts:AssumeRole")
+            return "credentials"
+        self.assertEqual(Retry.retry(assumeRole, Retry.newRolePropagation, baseDelay=0.001), "credentials")
+        self.assertEqual(len(attempts), 3)
+
+    def test_retry_lambda_role(self):
+        self.assertTrue(Retry.iamPropagation(clientError("InvalidParameterValueException",
+                                                         "The role defined for the function cannot be assumed by Lambda.")))
+        # other invalid parameters are not a propagation issue
+        self.assertFalse(Retry.iamPropagation(clientError("InvalidParameterValueException", "Unsupported runtime")))
+        # AccessDenied is only a propagation issue right after the role was created
+        self.assertFalse(Retry.iamPropagation(clientError("AccessDenied")))
+
+    def test_retry_not_retryable(self):
+        attempts = []
+        def createFunction():
+            attempts.append(1)
+            raise clientError("ResourceConflictException")
+        with self.assertRaises(ClientError):
+            Retry.retry(createFunction, Retry.iamPropagation, baseDelay=0.001)
+        self.assertEqual(len(attempts), 1)
+
+    def test_retry_timeout(self):
+        def assumeRole():
+            raise clientError("AccessDenied")
+        with self.assertRaises(ClientError):
+            Retry.retry(assumeRole, Retry.newRolePropagation, timeout=0.05, baseDelay=0.001, maxDelay=0.01)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timezone, timedelta
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+
+import ClientHooks
+from ApiBudget import ApiCounter
+from RoleCredentials import RoleCredentials
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+
+# answers sts.assume_role w/o any HTTP request
+class FakeSts:
+    def __init__(self):
+        self.calls = []
+        self.denied = False
+
+    def onSend(self, call):
+        if call.operation != "AssumeRole":
+            return None
+        self.calls.append(call)
+        if self.denied:
+            return AWSResponse(None, 403, {}, None), {"Error": {"Code": "AccessDenied", "Message": "not authorized"}}
+        expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+        return AWSResponse(None, 200, {}, None), {"Credentials": {
+            "AccessKeyId": "ASIAEXAMPLE", "SecretAccessKey": "secret", "SessionToken": "token", "Expiration": expiration}}
+
+class roleCredentialsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cacheDir = self.directory.name
+        self.environment = mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"})
+        self.environment.start()
+        self.sts = FakeSts()
+        ClientHooks.addListener(self.sts)
+
+    def tearDown(self):
+        ClientHooks.removeListener(self.sts)
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def test_cold_then_warm(self):
+        cold = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir, accountId=ACCOUNT_ID)
+        session = cold.session()
+        cold.stop()
+        self.assertEqual(len(self.sts.calls), 1)
+        self.assertEqual(self.sts.calls[0].params["RoleArn"], f"arn:aws:iam::{ACCOUNT_ID}:role/Role-001")
+        self.assertEqual(session.get_credentials().access_key, "ASIAEXAMPLE")
+        self.assertEqual(os.stat(cold.cachePath()).st_mode & 0o777, 0o600)
+
+        # a new process finds the credentials on disk: no STS / IAM call at all
+        with ApiCounter() as counter:
+            warm = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir, accountId=ACCOUNT_ID)
+            self.assertEqual(warm.session().get_credentials().secret_key, "secret")
+            warm.stop()
+        self.assertEqual(counter.total(), 0)
+
+    def test_expired_cache(self):
+        credentials = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir, accountId=ACCOUNT_ID)
+        with open(credentials.cachePath(), "w") as f:
+            json.dump({"RoleArn": "arn", "AccountId": ACCOUNT_ID, "AccessKeyId": "OLD", "SecretAccessKey": "old",
+                       "SessionToken": "old", "Expiration": datetime.now(timezone.utc).isoformat()}, f)
+        self.assertEqual(credentials.get()["AccessKeyId"], "ASIAEXAMPLE")
+        credentials.stop()
+        self.assertEqual(len(self.sts.calls), 1)
+
+    def test_cache_per_caller(self):
+        # w/o account id, the credentials of another caller (e.g. a profile of another account) are not reused
+        first = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir)
+        with mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "other"}):
+            other = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir)
+        self.assertNotEqual(first.cachePath(), other.cachePath())
+        self.assertEqual(first.cachePath(), RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir).cachePath())
+
+    def test_session_provider(self):
+        credentials = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir, accountId=ACCOUNT_ID)
+        session = credentials.session()
+        credentials.stop()
+        # the assumed role credentials take precedence over the environment ones
+        self.assertEqual(session.get_credentials().access_key, "ASIAEXAMPLE")
+        self.assertEqual(session.get_credentials().method, "solution-architect-assume-role")
+
+    def test_denied_fails_fast(self):
+        # a permanent denial (trust policy, caller w/o sts:AssumeRole) isn't retried as IAM propagation
+        self.sts.denied = True
+        credentials = RoleCredentials("Role-001", "Unit-Test", region=REGION, cacheDir=self.cacheDir, accountId=ACCOUNT_ID)
+        start = time.monotonic()
+        with self.assertRaises(ClientError):
+            credentials.get()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(len(self.sts.calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import boto3
+from botocore.stub import Stubber
+
+from Config import Status, ArnRef
+from Kms import Kms
+from S3Bucket import S3Bucket
+from ApiBudget import api_budget
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+KEY_ARN = f"arn:aws:kms:{REGION}:{ACCOUNT_ID}:key/1111"
+
+class s3BucketTest(unittest.TestCase):
+    def setUp(self):
+        session = boto3.Session(region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test")
+        self.definition = {"bucket-001": {"KmsKey": ArnRef(lambda service, name: KEY_ARN, Kms, "Key-001")}}
+        self.bucket = S3Bucket(self.definition, session=session)
+        self.stubber = Stubber(self.bucket.botoClient)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_create_with_bucket_key(self):
+        rule = {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "aws:kms", "KMSMasterKeyID": KEY_ARN},
+                "BucketKeyEnabled": True}
+        self.stubber.add_response("create_bucket", {}, {"Bucket": "bucket-001"})
+        self.stubber.add_response("put_bucket_encryption", {},
+                                  {"Bucket": "bucket-001", "ServerSideEncryptionConfiguration": {"Rules": [rule]}})
+        status, _ = self.bucket.do_create(self.bucket.botoClient, "bucket-001", self.definition["bucket-001"])
+        self.assertEqual(status, Status.SUCCESS)
+        # the dependency on the key is inferred from the reference
+        self.assertEqual(self.bucket.getDependencies("bucket-001", self.definition["bucket-001"]), [(Kms, "Key-001")])
+
+        # the encryption of the created bucket is known, only put_object is called, with the bucket key
+        self.stubber.add_response("put_object", {"ServerSideEncryption": "aws:kms", "SSEKMSKeyId": KEY_ARN,
+                                                 "BucketKeyEnabled": True},
+                                  {"Bucket": "bucket-001", "Key": "data/1.json", "Body": b"{}", "ContentType": "application/json",
+                                   "ServerSideEncryption": "aws:kms", "SSEKMSKeyId": KEY_ARN, "BucketKeyEnabled": True})
+        with api_budget(s3={"*": 1}):
+            self.assertIsNotNone(self.bucket.putObject("bucket-001", "data/1.json", b"{}", ContentType="application/json"))
+        self.stubber.assert_no_pending_responses()
+
+    def test_put_without_bucket_key(self):
+        # checked before the write, nothing is stored
+        self.stubber.add_response("get_bucket_encryption", {"ServerSideEncryptionConfiguration": {"Rules": [
+            {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "aws:kms", "KMSMasterKeyID": KEY_ARN}}]}},
+            {"Bucket": "other-bucket"})
+        self.assertIsNone(self.bucket.putObject("other-bucket", "data/1.json", b"{}"))
+        self.stubber.assert_no_pending_responses()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import threading
+import unittest
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+from Config import Status, Action
+from Scheduler import Scheduler, CycleError
+from Project import Project
+from IamPolicy import IamPolicy
+from IamRole import IamRole
+from Kms import Kms
+
+class schedulerTest(unittest.TestCase):
+
+    def test_scheduler_parallel(self):
+        # two independent nodes run at the same time, the dependent one after both
+        barrier = threading.Barrier(2, timeout=5)
+        finished = []
+        def independent(name):
+            barrier.wait()   # deadlocks (times out) if the nodes were serialized
+            finished.append(name)
+            return Status.SUCCESS, name
+        def dependent():
+            self.assertEqual(sorted(finished), ["a", "b"])
+            return Status.SUCCESS, "c"
+
+        scheduler = Scheduler(maxWorkers=4)
+        scheduler.add("a", lambda: independent("a"))
+        scheduler.add("b", lambda: independent("b"))
+        scheduler.add("c", dependent, ["a", "b", "outside-of-graph"])
+        results = scheduler.run()
+        self.assertEqual(results["c"], (Status.SUCCESS, "c"))
+
+    def test_concurrent_relist(self):
+        # getArn of keys processed concurrently: one re-list at a time, no resource map changing under a listing
+        kms = Kms(session=boto3.Session(region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"))
+        listing = {"Active": 0, "Max": 0}
+        def do_list():
+            listing["Active"] += 1
+            listing["Max"] = max(listing["Max"], listing["Active"])
+            for index in range(50):
+                kms.addResource(f"Key-{index:03d}", {"Arn": f"arn:aws:kms:us-east-1:123456789012:key/{index}"})
+                time.sleep(0.001)
+            listing["Active"] -= 1
+            return Status.SUCCESS, kms.resourceMap
+        kms.do_list = do_list
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            arns = list(executor.map(kms.getArn, [f"Key-{index:03d}" for index in range(0, 50, 5)]))
+        self.assertEqual(listing["Max"], 1)
+        self.assertEqual(arns[1], "arn:aws:kms:us-east-1:123456789012:key/5")
+
+    def test_scheduler_failure(self):
+        scheduler = Scheduler()
+        scheduler.add("a", lambda: (Status.FAILED, "error"))
+        scheduler.add("b", lambda: (Status.SUCCESS, "b"), ["a"])
+        results = scheduler.run()
+        self.assertEqual(results["a"][0], Status.FAILED)
+        self.assertNotIn("b", results)
+
+    def test_scheduler_reversed(self):
+        scheduler = Scheduler()
+        scheduler.add("policy", lambda: (Status.SUCCESS, None))
+        scheduler.add("role", lambda: (Status.SUCCESS, None), ["policy"])
+        self.assertEqual(scheduler.order(), ["policy", "role"])
+        self.assertEqual(scheduler.reversed().order(), ["role", "policy"])
+
+    def test_scheduler_cycle(self):
+        scheduler = Scheduler()
+        scheduler.add("a", lambda: (Status.SUCCESS, None), ["b"])
+        scheduler.add("b", lambda: (Status.SUCCESS, None), ["a"])
+        with self.assertRaises(CycleError):
+            scheduler.run()
+
+    def test_project_dependencies(self):
+        # the order of addConfig doesn't matter, the references in the definitions do
+        boto3.setup_default_session(region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+        try:
+            project = Project("Unit-Test")
+            project.addConfig(IamRole, {
+                "Role-001": {"PrincipalType": "AWS", "AWS": "123456789012", "UserPolicies": ["Policy-001"], "AWSPolicies": []},
+            })
+            project.addConfig(IamPolicy, {
+                "Policy-001": {"Version": "2012-10-17", "Statement": [
+                    {"Effect": "Allow", "Action": ["kms:Encrypt"], "Resource": [Project.getConfigArn(project, Kms, "Key-001")]}]},
+                "Policy-002": {"Version": "2012-10-17", "Statement": []},
+            })
+            project.addConfig(Kms, {"Key-001": {}})
+            order = project.buildSchedule(Action.CREATE).order()
+            self.assertLess(order.index((Kms, "Key-001")), order.index((IamPolicy, "Policy-001")))
+            self.assertLess(order.index((IamPolicy, "Policy-001")), order.index((IamRole, "Role-001")))
+            # unrelated keys are ready right away
+            self.assertLess(order.index((IamPolicy, "Policy-002")), order.index((IamRole, "Role-001")))
+
+            # teardown runs the other way around: the role is detached/deleted before its policy & the key
+            order = project.buildSchedule(Action.DELETE).reversed().order()
+            self.assertLess(order.index((IamRole, "Role-001")), order.index((IamPolicy, "Policy-001")))
+            self.assertLess(order.index((IamPolicy, "Policy-001")), order.index((Kms, "Key-001")))
+        finally:
+            boto3.DEFAULT_SESSION = None
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import queue
+import logging
+import unittest
+
+from StructLog import DeferredQueueHandler, compact
+
+class structLogTest(unittest.TestCase):
+    def setUp(self):
+        # records stay in the queue until the test formats them, like a busy listener thread
+        self.queue = queue.SimpleQueue()
+        self.logger = logging.getLogger("structLogTest")
+        self.logger.propagate = False
+        self.logger.addHandler(DeferredQueueHandler(self.queue))
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def emitted(self):
+        formatter = logging.Formatter("%(levelname)s %(message)s")
+        return [formatter.format(self.queue.get()) for _ in range(self.queue.qsize())]
+
+    def test_arguments_rendered_when_logged(self):
+        config = {"KeyUsage": "ENCRYPT_DECRYPT"}
+        self.logger.warning("do_create kms key: %s", compact(config))
+        # the caller mutates the config before the listener gets to the record
+        config["KeyUsage"] = "SIGN_VERIFY"
+        self.assertEqual(self.emitted(), ["WARNING do_create kms key: {'KeyUsage': 'ENCRYPT_DECRYPT'}"])
+
+    def test_exception_rendered_when_logged(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("failed %s", "create")
+        [output] = self.emitted()
+        self.assertTrue(output.startswith("ERROR failed create\nTraceback"))
+        self.assertTrue(output.endswith("ValueError: boom"))
+
+if __name__ == "__main__":
+    unittest.main()